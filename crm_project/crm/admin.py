@@ -5,17 +5,19 @@ from django.urls import reverse, path
 from django.http import HttpResponseRedirect
 from django.shortcuts import render, redirect
 from django.contrib import messages
+from django.core.files.storage import default_storage
 from django.template.response import TemplateResponse
 from django.utils import timezone
 from django.db import models
 from django.db.models import Q, Count
 from .models import (
-    Customer, Course, Enrollment, Conference, ConferenceRegistration, 
+    Customer, CustomerProfile, Course, Enrollment, Conference, ConferenceRegistration, 
     CommunicationLog, CustomerCommunicationPreference, YouTubeMessage
     # EmailTemplate, EmailCampaign, EmailLog, EmailSubscription  # Temporarily commented out
 )
 from .communication_services import CommunicationManager
 from .csv_import_handler import CSVImportHandler
+from .uploads import read_text
 
 class CustomerCommunicationPreferenceInline(admin.TabularInline):
     model = CustomerCommunicationPreference
@@ -23,6 +25,26 @@ class CustomerCommunicationPreferenceInline(admin.TabularInline):
     fields = ['communication_type', 'priority', 'is_active', 'notes']
     ordering = ['priority', 'communication_type']
 
+class CustomerProfileInline(admin.StackedInline):
+    model = CustomerProfile
+    can_delete = False
+    verbose_name_plural = 'Profile (emergency contact, social media, notes)'
+    fieldsets = (
+        ('Emergency Contact', {
+            'fields': ('emergency_contact_name', 'emergency_contact_relationship',
+                       'emergency_contact_phone', 'emergency_contact_email')
+        }),
+        ('Social Media', {
+            'fields': ('linkedin_profile', 'facebook_profile', 'twitter_handle', 'instagram_handle')
+        }),
+        ('Secondary Address', {
+            'fields': ('address_secondary',)
+        }),
+        ('Notes', {
+            'fields': ('internal_notes', 'special_requirements')
+        }),
+    )
+
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
     list_display = [
@@ -38,7 +60,7 @@ class CustomerAdmin(admin.ModelAdmin):
         'company_primary', 'company_secondary', 'phone_primary', 'phone_secondary'
     ]
     readonly_fields = ['id', 'created_at', 'updated_at']
-    inlines = [CustomerCommunicationPreferenceInline]
+    inlines = [CustomerProfileInline, CustomerCommunicationPreferenceInline]
     
     fieldsets = (
         ('Personal Information', {
@@ -54,7 +76,7 @@ class CustomerAdmin(admin.ModelAdmin):
             'fields': ('whatsapp_number', 'wechat_id')
         }),
         ('Social Media', {
-            'fields': ('linkedin_profile', 'facebook_profile', 'twitter_handle', 'instagram_handle', 'youtube_handle', 'youtube_channel_url'),
+            'fields': ('youtube_handle', 'youtube_channel_url'),
             'classes': ('collapse',)
         }),
         ('Professional Information', {
@@ -66,7 +88,7 @@ class CustomerAdmin(admin.ModelAdmin):
             )
         }),
         ('Addresses', {
-            'fields': ('address_primary', 'address_secondary'),
+            'fields': ('address_primary',),
             'classes': ('collapse',)
         }),
         ('Learning Preferences', {
@@ -128,24 +150,18 @@ class CustomerAdmin(admin.ModelAdmin):
             return redirect('admin:crm_customer_import_csv')
         
         csv_file = request.FILES['csv_file']
-        try:
-            csv_content = csv_file.read().decode('utf-8-sig')
-        except UnicodeDecodeError:
-            try:
-                csv_content = csv_file.read().decode('latin-1')
-            except UnicodeDecodeError:
-                messages.error(request, 'Unable to decode CSV file. Please ensure it is UTF-8 or Latin-1 encoded.')
-                return redirect('admin:crm_customer_import_csv')
         
         import_handler = CSVImportHandler()
-        preview_result = import_handler.preview_import(csv_content, max_rows=10)
+        preview_result = import_handler.preview_upload(csv_file, max_rows=10)
         
         if 'error' in preview_result:
             messages.error(request, f"Preview error: {preview_result['error']}")
             return redirect('admin:crm_customer_import_csv')
         
-        # Store CSV content in session for import
-        request.session['csv_content'] = csv_content
+        # Keep the upload in storage for the import step rather than the whole file in the session
+        self._discard_csv_upload(request)
+        csv_file.seek(0)
+        request.session['csv_upload'] = default_storage.save(f'csv_imports/{csv_file.name}', csv_file)
         request.session['field_mapping'] = preview_result.get('field_mapping', {})
         request.session['default_source'] = request.POST.get('default_source', 'csv_import')
         
@@ -160,14 +176,17 @@ class CustomerAdmin(admin.ModelAdmin):
     
     def _handle_csv_import(self, request):
         """Handle actual CSV import"""
-        csv_content = request.session.get('csv_content')
+        csv_upload = request.session.get('csv_upload')
         field_mapping = request.session.get('field_mapping')
         default_source = request.session.get('default_source', 'csv_import')
         
-        if not csv_content:
+        if not csv_upload or not default_storage.exists(csv_upload):
             messages.error(request, 'No CSV data found. Please upload and preview first.')
             return redirect('admin:crm_customer_import_csv')
         
+        with default_storage.open(csv_upload, 'rb') as upload:
+            csv_content = read_text(upload)
+        
         import_handler = CSVImportHandler()
         result = import_handler.import_csv(csv_content, field_mapping, default_source=default_source)
         
@@ -189,24 +208,23 @@ class CustomerAdmin(admin.ModelAdmin):
                     messages.error(request, error)
         
         # Clear session data
-        request.session.pop('csv_content', None)
+        self._discard_csv_upload(request)
         request.session.pop('field_mapping', None)
         request.session.pop('default_source', None)
         
         return redirect('admin:crm_customer_changelist')
     
+    def _discard_csv_upload(self, request):
+        """Delete the stored upload of an earlier preview, if any"""
+        csv_upload = request.session.pop('csv_upload', None)
+        if csv_upload and default_storage.exists(csv_upload):
+            default_storage.delete(csv_upload)
+    
     def diagnose_csv_view(self, request):
         """Diagnostic view for CSV files"""
         if request.method == 'POST' and 'csv_file' in request.FILES:
             csv_file = request.FILES['csv_file']
-            try:
-                csv_content = csv_file.read().decode('utf-8-sig')
-            except UnicodeDecodeError:
-                try:
-                    csv_content = csv_file.read().decode('latin-1')
-                except UnicodeDecodeError:
-                    messages.error(request, 'Unable to decode CSV file. Please ensure it is UTF-8 or Latin-1 encoded.')
-                    return redirect('admin:crm_customer_diagnose_csv')
+            csv_content = read_text(csv_file)
             
             # Simple diagnostic without chardet dependency
             result = self._simple_csv_diagnostic(csv_content, csv_file.name)
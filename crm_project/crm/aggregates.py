@@ -0,0 +1,144 @@
+# aggregates.py - Customer segment counts over several groupings in one query
+import hashlib
+import json
+import logging
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection as default_connection
+
+from .conditional import collection_version
+
+logger = logging.getLogger('crm.performance')
+
+CUSTOMER_DIMENSIONS = ('customer_type', 'status', 'customer_centre', 'service_subscribed', 'country_region', 'source')
+KEY_PREFIX = 'crm:aggregates'
+MAX_GROUPING_SETS = 16
+
+
+def supports_grouping_sets(connection=None) -> bool:
+    """GROUP BY GROUPING SETS with GROUPING() (PostgreSQL 9.5+); elsewhere UNION ALL is used"""
+    connection = connection or default_connection
+    return connection.vendor == 'postgresql'
+
+
+def normalize_grouping_sets(grouping_sets: Iterable[Iterable[str]]) -> List[Tuple[str, ...]]:
+    """Validate dimension names and put each set in canonical order, dropping duplicates"""
+    normalized = []
+    for grouping in grouping_sets:
+        unknown = set(grouping) - set(CUSTOMER_DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown dimension(s): {', '.join(sorted(unknown))}")
+        canonical = tuple(dim for dim in CUSTOMER_DIMENSIONS if dim in grouping)
+        if canonical not in normalized:
+            normalized.append(canonical)
+    if not normalized:
+        normalized.append(())
+    if len(normalized) > MAX_GROUPING_SETS:
+        raise ValueError(f"At most {MAX_GROUPING_SETS} grouping sets per request")
+    return normalized
+
+
+def _grouping_mask(grouping: Sequence[str], columns: Sequence[str]) -> int:
+    """Same bitmask as SQL GROUPING(columns...): a set bit marks a column rolled up"""
+    mask = 0
+    for column in columns:
+        mask = (mask << 1) | (0 if column in grouping else 1)
+    return mask
+
+
+def _build_sql(inner_sql: str, columns: Sequence[str], grouping_sets: Sequence[Tuple[str, ...]], connection):
+    """(sql, params multiplier) for counting `inner_sql` rows per grouping set"""
+    qn = connection.ops.quote_name
+    if supports_grouping_sets(connection):
+        selected = ', '.join(qn(column) for column in columns)
+        mask = f"GROUPING({selected})" if columns else '0'
+        sets = ', '.join('(' + ', '.join(qn(dim) for dim in grouping) + ')' for grouping in grouping_sets)
+        select = f"{selected}, " if columns else ''
+        return f"SELECT {select}{mask}, COUNT(*) FROM ({inner_sql}) segment GROUP BY GROUPING SETS ({sets})", 1
+
+    # One branch per grouping set; the subquery is repeated but still a single round-trip
+    branches = []
+    for grouping in grouping_sets:
+        select = [qn(column) if column in grouping else f"NULL AS {qn(column)}" for column in columns]
+        select += [str(_grouping_mask(grouping, columns)), 'COUNT(*)']
+        group_by = f" GROUP BY {', '.join(qn(dim) for dim in grouping)}" if grouping else ''
+        branches.append(f"SELECT {', '.join(select)} FROM ({inner_sql}) segment{group_by}")
+    return ' UNION ALL '.join(branches), len(branches)
+
+
+def segment_counts(grouping_sets: Iterable[Iterable[str]], queryset=None, use_cache: bool = True) -> List[Dict]:
+    """
+    Customer counts for several groupings at once, e.g. [(), ('status',), ('customer_type', 'status')].
+
+    Every grouping set is answered by a single query. Results are cached
+    against the customers collection version, so any customer write (signals
+    or bulk API) makes the next call recount.
+    """
+    from .models import Customer
+
+    grouping_sets = normalize_grouping_sets(grouping_sets)
+    queryset = Customer.objects.all() if queryset is None else queryset
+    columns = [dim for dim in CUSTOMER_DIMENSIONS if any(dim in grouping for grouping in grouping_sets)]
+    inner_sql, inner_params = queryset.order_by().values(*columns or ['pk']).query.sql_with_params()
+
+    cache_key = None
+    if use_cache:
+        fingerprint = json.dumps([grouping_sets, inner_sql, [str(p) for p in inner_params]])
+        digest = hashlib.md5(fingerprint.encode()).hexdigest()
+        cache_key = f"{KEY_PREFIX}:{collection_version('customers')}:{digest}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    connection = default_connection
+    sql, repeat = _build_sql(inner_sql, columns, grouping_sets, connection)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, tuple(inner_params) * repeat)
+        rows = cursor.fetchall()
+
+    by_mask = {_grouping_mask(grouping, columns): grouping for grouping in grouping_sets}
+    results = []
+    for row in rows:
+        values, mask, count = row[:len(columns)], row[len(columns)], row[len(columns) + 1]
+        grouping = by_mask[mask]
+        results.append({
+            'group': list(grouping),
+            'values': {column: value for column, value in zip(columns, values) if column in grouping},
+            'count': count,
+        })
+    results.sort(key=lambda result: (grouping_sets.index(tuple(result['group'])), -result['count']))
+
+    if cache_key is not None:
+        cache.set(cache_key, results, settings.CACHE_TTL['dashboard_stats'])
+    return results
+
+
+def counts_for(results: List[Dict], *grouping: str) -> List[Dict]:
+    """Rows of one grouping set, largest first"""
+    return [result for result in results if tuple(result['group']) == grouping]
+
+
+def total_for(results: List[Dict], **values) -> int:
+    """Count of the row matching exactly these dimension values (no kwargs: the grand total)"""
+    grouping = tuple(dim for dim in CUSTOMER_DIMENSIONS if dim in values)
+    for result in counts_for(results, *grouping):
+        if result['values'] == values:
+            return result['count']
+    return 0
+
+
+def choice_labels(dimension: str) -> Dict[str, str]:
+    from .models import Customer
+    return {value: str(label) for value, label in Customer._meta.get_field(dimension).flatchoices}
+
+
+def label_results(results: List[Dict]) -> List[Dict]:
+    """Add display labels for choice dimensions"""
+    labels = {dim: choice_labels(dim) for dim in CUSTOMER_DIMENSIONS}
+    for result in results:
+        result['labels'] = {
+            dim: labels[dim].get(value, value) for dim, value in result['values'].items()
+        }
+    return results
@@ -0,0 +1,445 @@
+# bulk.py - Batch create/update/delete of customers for API integrations and scripts
+import json
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import BaseParser
+
+from .cache_utils import coalesced_invalidation, invalidate_customer_cache
+from .conditional import bump_collection_version
+from .models import Customer, CustomerProfile
+
+logger = logging.getLogger(__name__)
+
+# Items accepted in one bulk request
+MAX_BULK_ITEMS = getattr(settings, 'CUSTOMER_BULK_MAX_ITEMS', 5000)
+
+# Fields Customer.clean()/save() may fill in, written alongside the submitted ones
+DERIVED_FIELDS = (
+    'first_name', 'last_name', 'status', 'preferred_communication_method',
+    'email_primary', 'youtube_handle', 'youtube_channel_url',
+    'phone_primary_country_code', 'phone_secondary_country_code',
+    'whatsapp_country_code', 'fax_country_code',
+)
+
+# Fields with a lower() unique constraint, and how errors name them
+UNIQUE_FIELDS = {'email_primary': 'Email', 'youtube_handle': 'YouTube handle'}
+
+# Customers per INSERT/UPDATE batch in CustomerBulkWriter
+WRITE_BATCH_SIZE = 500
+
+
+class NDJSONParser(BaseParser):
+    """Newline-delimited JSON, one object per line, read line by line from the stream"""
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if len(items) >= MAX_BULK_ITEMS:
+                raise ParseError(f'At most {MAX_BULK_ITEMS} items per request')
+            try:
+                items.append(json.loads(line.decode(encoding)))
+            except ValueError as e:
+                raise ParseError(f'Line {line_number}: {e}')
+        return items
+
+
+def bulk_items(data) -> List:
+    """The list of items in a bulk payload (a JSON array, NDJSON, or {"items": [...]})"""
+    if isinstance(data, dict):
+        data = data.get('items')
+    if not isinstance(data, list):
+        raise ValidationError({'detail': 'Expected a list of items'})
+    if len(data) > MAX_BULK_ITEMS:
+        raise ValidationError({'detail': f'At most {MAX_BULK_ITEMS} items per request'})
+    return data
+
+
+def _django_errors(error: DjangoValidationError) -> Dict:
+    if hasattr(error, 'message_dict'):
+        return error.message_dict
+    return {'non_field_errors': error.messages}
+
+
+class CustomerBulkProcessor:
+    """
+    Validate and write a batch of customers with a fixed number of queries.
+
+    Field validation reuses one serializer instance for every item. Email
+    and YouTube-handle collisions are looked up with a single query over the
+    whole batch (plus an in-batch duplicate check), updates
+    load their targets with one query, and writes go through
+    bulk_create/bulk_update, with one more of each for CustomerProfile rows
+    when profile attributes are submitted. Valid items are written even when
+    others fail; every item gets a result entry in input order.
+    """
+
+    def __init__(self, serializer_class, context=None):
+        self.serializer_class = serializer_class
+        self.context = context or {}
+
+    def _validate(self, items, partial=False):
+        """(index, validated attrs) pairs, recording failures in self.results"""
+        validator = self.serializer_class(context=self.context, partial=partial)
+        validated = []
+        for index, item in enumerate(items):
+            if index in self.results:
+                continue
+            if not isinstance(item, dict):
+                self._fail(index, {'non_field_errors': ['Expected an object']})
+                continue
+            data = {key: value for key, value in item.items() if key != 'id'}
+            try:
+                validated.append((index, validator.run_validation(data)))
+            except ValidationError as e:
+                self._fail(index, e.detail)
+        return validated
+
+    def _fail(self, index, errors):
+        self.results[index] = {'index': index, 'status': 'error', 'errors': errors}
+
+    def _check_unique(self, customers):
+        """
+        One query for email/handle collisions with existing customers, plus duplicates within the batch.
+
+        This only gives per-item errors; the lower() unique constraints are
+        what actually keep concurrent writers from inserting duplicates.
+        """
+        values = {
+            field: {index: getattr(customer, field).lower() for index, customer in customers if getattr(customer, field)}
+            for field in UNIQUE_FIELDS
+        }
+        if not any(values.values()):
+            return
+        own_ids = [customer.pk for _, customer in customers if not customer._state.adding]
+        rows = (
+            Customer.objects.alias(email_lower=Lower('email_primary'), handle_lower=Lower('youtube_handle'))
+            .filter(
+                Q(email_lower__in=set(values['email_primary'].values()))
+                | Q(handle_lower__in=set(values['youtube_handle'].values()))
+            )
+            .exclude(pk__in=own_ids)
+            .order_by()
+            .values_list('id', 'email_primary', 'youtube_handle')
+        )
+        taken = {field: {} for field in UNIQUE_FIELDS}
+        for customer_id, email, handle in rows:
+            for field, value in (('email_primary', email), ('youtube_handle', handle)):
+                if value:
+                    taken[field][value.lower()] = customer_id
+
+        for field, label in UNIQUE_FIELDS.items():
+            seen = {}
+            for index, value in values[field].items():
+                if index in self.results:
+                    continue
+                if value in taken[field]:
+                    self._fail(index, {field: [f'{label} "{value}" is already used by customer {taken[field][value]}']})
+                elif value in seen:
+                    self._fail(index, {field: [f'{label} "{value}" is repeated in this batch (item {seen[value]})']})
+                else:
+                    seen[value] = index
+
+    def _write(self, customers, write):
+        """Run `write` atomically; a concurrent duplicate fails the batch's items instead of the request"""
+        try:
+            with transaction.atomic():
+                write()
+        except IntegrityError as e:
+            errors = Customer.unique_violation(e)
+            if errors is None:
+                raise
+            logger.info(f"Bulk write lost a uniqueness race: {e}")
+            for index, _ in customers:
+                self._fail(index, {'non_field_errors': [
+                    f"Conflicts with a concurrent write ({', '.join(errors)}); nothing in this batch was saved"
+                ]})
+            return False
+        return True
+
+    def _prepare(self, customers):
+        """Apply the normalisation clean() and save() would, without their per-row queries"""
+        prepared = []
+        for index, customer in customers:
+            try:
+                customer.normalize_unique_fields()
+                customer.normalize_youtube_fields()
+            except DjangoValidationError as e:
+                self._fail(index, _django_errors(e))
+                continue
+            prepared.append((index, customer))
+        self._check_unique(prepared)
+
+        ready = []
+        for index, customer in prepared:
+            if index in self.results:
+                continue
+            if not customer.youtube_handle and customer.youtube_channel_url:
+                customer.youtube_handle = customer.handle_from_channel_url()
+            ready.append((index, customer))
+        Customer.assign_country_codes([customer for _, customer in ready])
+        return ready
+
+    def create(self, items) -> List[Dict]:
+        self.results = {}
+        customers = [(index, Customer(**attrs)) for index, attrs in self._validate(items)]
+        customers = self._prepare(customers)
+
+        def write():
+            Customer.objects.bulk_create([customer for _, customer in customers])
+            write_profiles([customer for _, customer in customers], Customer.PROFILE_FIELDS)
+
+        if customers and self._write(customers, write):
+            for index, customer in customers:
+                self.results[index] = {'index': index, 'status': 'created', 'id': str(customer.pk)}
+            customers_changed()
+        return self._ordered(items)
+
+    def update(self, items) -> List[Dict]:
+        """Partial updates; every item must carry the customer's `id`"""
+        self.results = {}
+        ids = self._parse_ids((index, item.get('id') if isinstance(item, dict) else None) for index, item in enumerate(items))
+        targets = Customer.objects.select_related('profile').in_bulk(set(ids.values()))
+        existing = {str(pk): customer for pk, customer in targets.items()}
+        for index, item_id in ids.items():
+            if item_id not in existing:
+                self._fail(index, {'id': ['Customer not found.']})
+
+        fields = set(DERIVED_FIELDS)
+        profile_fields = set()
+        customers = []
+        for index, attrs in self._validate(items, partial=True):
+            customer = existing[ids[index]]
+            for attr, value in attrs.items():
+                setattr(customer, attr, value)
+                (profile_fields if attr in Customer.PROFILE_FIELDS else fields).add(attr)
+            customers.append((index, customer))
+        customers = self._prepare(customers)
+
+        if customers:
+            now = timezone.now()
+            for _, customer in customers:
+                customer.updated_at = now  # bulk_update skips auto_now
+            fields.add('updated_at')
+
+            def write():
+                Customer.objects.bulk_update([customer for _, customer in customers], sorted(fields))
+                write_profiles([customer for _, customer in customers], sorted(profile_fields))
+
+            if self._write(customers, write):
+                for index, customer in customers:
+                    self.results[index] = {'index': index, 'status': 'updated', 'id': str(customer.pk)}
+                customers_changed()
+        return self._ordered(items)
+
+    def delete(self, ids) -> List[Dict]:
+        """Deletes cascade and send post_delete per row, so signal receivers run as usual"""
+        self.results = {}
+        wanted = self._parse_ids(enumerate(ids))
+
+        with transaction.atomic():
+            queryset = Customer.objects.filter(pk__in=set(wanted.values()))
+            found = {str(pk) for pk in queryset.values_list('pk', flat=True)}
+            if found:
+                queryset.delete()
+        for index, item_id in wanted.items():
+            if item_id in found:
+                self.results[index] = {'index': index, 'status': 'deleted', 'id': item_id}
+            else:
+                self._fail(index, {'id': ['Customer not found.']})
+        return self._ordered(ids)
+
+    def _parse_ids(self, pairs) -> Dict[int, str]:
+        """{index: normalised id} for well-formed ids, failing the rest"""
+        ids = {}
+        for index, item_id in pairs:
+            if not item_id:
+                self._fail(index, {'id': ['This field is required.']})
+                continue
+            try:
+                ids[index] = str(Customer._meta.pk.to_python(item_id))
+            except DjangoValidationError:
+                self._fail(index, {'id': ['Not a valid UUID.']})
+        return ids
+
+    def _ordered(self, items) -> List[Dict]:
+        return [self.results[index] for index in range(len(items))]
+
+
+def write_profiles(customers, fields):
+    """Insert new profiles and update existing ones for customers whose profile attributes were set"""
+    profiles = [customer.get_profile() for customer in customers if customer.profile_changed]
+    if not profiles:
+        return
+    new = [profile for profile in profiles if profile._state.adding]
+    existing = [profile for profile in profiles if not profile._state.adding]
+    if new:
+        CustomerProfile.objects.bulk_create(new)
+    if existing:
+        CustomerProfile.objects.bulk_update(existing, fields)
+    for customer in customers:
+        customer._profile_changed = False
+
+
+def customers_changed():
+    """bulk_create/bulk_update don't send post_save; do what its receivers would, once"""
+    invalidate_customer_cache(sender=Customer)
+    bump_collection_version('customers')
+
+
+def prepare_customers(customers):
+    """The derivations Customer.save() applies, done for a whole batch in one pass"""
+    for customer in customers:
+        customer.normalize_unique_fields()
+    Customer.assign_country_codes(customers)
+
+
+class CustomerBulkWriter:
+    """
+    Batch customer writes for imports and maintenance scripts.
+
+        with CustomerBulkWriter() as writer:
+            for row in rows:
+                writer.add(Customer(**row))
+            writer.update(customer, ['status'])
+
+    Queued customers get save()'s derivations (trimmed email/handle, country
+    codes) in one pass per batch and are written with bulk_create or
+    bulk_update, CustomerProfile rows included. Cache invalidation and the
+    collection version bump run once on exit, also for plain save() calls
+    made inside the block. A batch that hits a duplicate email or YouTube
+    handle is retried row by row, so only the conflicting customers are
+    skipped; they end up in `failed` with their field errors.
+
+    Only counts of written customers are kept. Callers that need to match
+    results back to their own records pass `on_flush`, which is called with
+    each written batch and that batch's (customer, errors) failures, so they
+    can let go of the batch once it is reported.
+
+    Pending writes are discarded if the block raises. Callers validate
+    (full_clean) before queueing, as they would before save().
+    """
+
+    def __init__(self, batch_size: int = WRITE_BATCH_SIZE, on_flush: Optional[Callable[[List[Customer], List], None]] = None):
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self.created = 0
+        self.updated = 0
+        self.failed: List = []  # (customer, {field: [message]})
+        self._creates: List[Customer] = []
+        self._updates: Dict[tuple, List[Customer]] = defaultdict(list)
+        self._deferral = None
+
+    def __enter__(self):
+        self._deferral = coalesced_invalidation()
+        self._deferral.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.flush()
+            if self.created or self.updated:
+                customers_changed()
+        finally:
+            self._deferral.__exit__(exc_type, exc, tb)
+        return False
+
+    def add(self, customer: Customer):
+        """Queue a new customer for insertion"""
+        self._creates.append(customer)
+        if len(self._creates) >= self.batch_size:
+            self._flush_creates()
+
+    def add_all(self, customers: Iterable[Customer]):
+        for customer in customers:
+            self.add(customer)
+
+    def update(self, customer: Customer, fields: Iterable[str]):
+        """Queue changed `fields` of an existing customer (profile attributes included)"""
+        key = tuple(sorted(set(fields)))
+        self._updates[key].append(customer)
+        if len(self._updates[key]) >= self.batch_size:
+            self._flush_updates(key)
+
+    def flush(self):
+        self._flush_creates()
+        for key in list(self._updates):
+            self._flush_updates(key)
+
+    def _flush_creates(self):
+        customers, self._creates = self._creates, []
+        if not customers:
+            return
+        prepare_customers(customers)
+        try:
+            with transaction.atomic():
+                Customer.objects.bulk_create(customers)
+                write_profiles(customers, Customer.PROFILE_FIELDS)
+        except IntegrityError as e:
+            if Customer.unique_violation(e) is None:
+                raise
+            for customer in customers:
+                customer._state.adding = True  # bulk_create marks rows saved batch by batch
+            failures = self._row_by_row(customers, lambda customer: customer.save(force_insert=True))
+        else:
+            failures = []
+        self.created += len(customers) - len(failures)
+        self._flushed(customers, failures)
+
+    def _flush_updates(self, key):
+        customers = self._updates.pop(key, [])
+        if not customers:
+            return
+        prepare_customers(customers)
+        profile_fields = [name for name in key if name in Customer.PROFILE_FIELDS]
+        fields = {name for name in key if name not in Customer.PROFILE_FIELDS}
+        fields.update(UNIQUE_FIELDS, (code_field for code_field, _ in Customer.COUNTRY_CODE_FIELDS), ['updated_at'])
+        now = timezone.now()
+        for customer in customers:
+            customer.updated_at = now  # bulk_update skips auto_now
+        try:
+            with transaction.atomic():
+                Customer.objects.bulk_update(customers, sorted(fields))
+                write_profiles(customers, profile_fields)
+        except IntegrityError as e:
+            if Customer.unique_violation(e) is None:
+                raise
+            failures = self._row_by_row(customers, lambda customer: customer.save(update_fields=list(key) + sorted(fields)))
+        else:
+            failures = []
+        self.updated += len(customers) - len(failures)
+        self._flushed(customers, failures)
+
+    def _flushed(self, customers, failures):
+        self.failed.extend(failures)
+        if self.on_flush is not None:
+            self.on_flush(customers, failures)
+
+    def _row_by_row(self, customers, save) -> List:
+        """Save each customer in its own savepoint, returning the unique-constraint failures"""
+        failures = []
+        for customer in customers:
+            try:
+                with transaction.atomic():
+                    save(customer)
+            except IntegrityError as e:
+                errors = Customer.unique_violation(e)
+                if errors is None:
+                    raise
+                failures.append((customer, errors))
+        return failures
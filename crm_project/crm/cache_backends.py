@@ -0,0 +1,156 @@
+# cache_backends.py - Cache backends that report hit/miss ratios and latency per key prefix
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.module_loading import import_string
+
+from .metrics import registry
+
+# Distinct prefixes tracked before the rest are reported as "other"
+MAX_PREFIXES = 100
+
+_MISSING = object()
+_request_stats = contextvars.ContextVar('cache_request_stats', default=None)
+
+_prefixes = set()
+_prefixes_lock = threading.Lock()
+
+
+class CacheStats:
+    """Cache reads made while handling one request"""
+
+    __slots__ = ('hits', 'misses', 'duration')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.duration = 0.0
+
+    @property
+    def total(self):
+        return self.hits + self.misses
+
+
+@contextmanager
+def track_cache_stats():
+    """Collect CacheStats for the current thread/task only (no global patching)"""
+    stats = CacheStats()
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+def key_prefix(key) -> str:
+    """Group keys by their first segment ("customer_stats_total" -> "customer_stats")"""
+    key = str(key)
+    if ':' in key:
+        prefix = key.split(':', 1)[0]
+    else:
+        prefix = key.rsplit('_', 1)[0]
+    prefix = prefix.replace('|', '_') or 'default'
+    if prefix in _prefixes:
+        return prefix
+    with _prefixes_lock:
+        if len(_prefixes) >= MAX_PREFIXES:
+            return 'other'
+        _prefixes.add(prefix)
+    return prefix
+
+
+class InstrumentedCacheMixin:
+    """
+    Count cache reads as hits or misses and time every operation.
+
+    A private sentinel is passed as the default, so cached falsy values
+    (0, '', [], False) count as hits.
+    """
+
+    # Whether the backend fetches many keys in one call rather than via get()
+    native_get_many = True
+
+    def _record(self, key, result, duration, hits=0, misses=0):
+        registry.record_cache(key_prefix(key), result, duration)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.hits += hits
+            stats.misses += misses
+            stats.duration += duration
+
+    def get(self, key, default=None, version=None, **kwargs):
+        started = time.perf_counter()
+        value = super().get(key, _MISSING, version=version, **kwargs)
+        duration = time.perf_counter() - started
+        if value is _MISSING:
+            self._record(key, 'miss', duration, misses=1)
+            return default
+        self._record(key, 'hit', duration, hits=1)
+        return value
+
+    def get_many(self, keys, version=None, **kwargs):
+        if not self.native_get_many:
+            # BaseCache.get_many loops over self.get(), which already records each key
+            return super().get_many(keys, version=version, **kwargs)
+        keys = list(keys)
+        started = time.perf_counter()
+        values = super().get_many(keys, version=version, **kwargs)
+        # Share the round-trip time between the keys it served
+        duration = (time.perf_counter() - started) / max(len(keys), 1)
+        for key in keys:
+            if key in values:
+                self._record(key, 'hit', duration, hits=1)
+            else:
+                self._record(key, 'miss', duration, misses=1)
+        return values
+
+    def set(self, key, value, timeout=None, version=None, **kwargs):
+        started = time.perf_counter()
+        result = super().set(key, value, timeout=timeout, version=version, **kwargs)
+        self._record(key, 'write', time.perf_counter() - started)
+        return result
+
+    def add(self, key, value, timeout=None, version=None, **kwargs):
+        started = time.perf_counter()
+        result = super().add(key, value, timeout=timeout, version=version, **kwargs)
+        self._record(key, 'write', time.perf_counter() - started)
+        return result
+
+    def delete(self, key, version=None, **kwargs):
+        started = time.perf_counter()
+        result = super().delete(key, version=version, **kwargs)
+        self._record(key, 'delete', time.perf_counter() - started)
+        return result
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    native_get_many = False
+
+
+try:
+    from django_redis.cache import RedisCache
+except ImportError:  # django_redis is optional for local development
+    RedisCache = None
+else:
+    class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+        pass
+
+
+@lru_cache(maxsize=None)
+def _is_redis_backend(backend: str) -> bool:
+    if RedisCache is None or not backend:
+        return False
+    try:
+        return issubclass(import_string(backend), RedisCache)
+    except ImportError:
+        return False
+
+
+def uses_redis(alias: str = 'default') -> bool:
+    """True when the cache alias is backed by django_redis (instrumented or not)"""
+    return _is_redis_backend(settings.CACHES.get(alias, {}).get('BACKEND', ''))
@@ -2,13 +2,17 @@
 from django.core.cache import cache
 from django.conf import settings
 from django.db.models import QuerySet
+from contextlib import contextmanager
 from functools import wraps
 import hashlib
 import json
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+_deferred = threading.local()
+
 class CacheManager:
     """Advanced cache management for CRM system"""
     
@@ -54,10 +58,11 @@ class CacheManager:
     
     @staticmethod
     def invalidate_pattern(pattern):
-        """Invalidate cache keys matching a pattern"""
+        """Invalidate cache keys matching a pattern (django_redis only; other backends can't match keys)"""
         try:
-            # This is a simple implementation - in production consider Redis with pattern matching
-            cache.delete_many([f"{pattern}*"])
+            if not hasattr(cache, 'delete_pattern'):
+                return
+            cache.delete_pattern(f"{pattern}*")
             logger.info(f"Invalidated cache pattern: {pattern}")
         except Exception as e:
             logger.error(f"Failed to invalidate cache pattern: {e}")
@@ -117,22 +122,19 @@ class CacheWarmer:
     def warm_customer_stats():
         """Pre-warm customer statistics cache"""
         from .models import Customer
+        from .aggregates import segment_counts, total_for
         
         try:
-            # Warm up common customer queries
-            cache_key = "customer_stats_total"
-            total_customers = Customer.objects.count()
-            cache.set(cache_key, total_customers, settings.CACHE_TTL['dashboard_stats'])
-            
-            cache_key = "customer_stats_active"
-            active_customers = Customer.objects.filter(status='active').count()
-            cache.set(cache_key, active_customers, settings.CACHE_TTL['dashboard_stats'])
-            
-            cache_key = "customer_stats_by_type"
-            stats_by_type = {}
-            for customer_type, _ in Customer.CUSTOMER_TYPES:
-                stats_by_type[customer_type] = Customer.objects.filter(customer_type=customer_type).count()
-            cache.set(cache_key, stats_by_type, settings.CACHE_TTL['dashboard_stats'])
+            # Total, per-status and per-type counts come from one grouped query
+            results = segment_counts([(), ('status',), ('customer_type',)], use_cache=False)
+            cache.set_many({
+                "customer_stats_total": total_for(results),
+                "customer_stats_active": total_for(results, status='active'),
+                "customer_stats_by_type": {
+                    customer_type: total_for(results, customer_type=customer_type)
+                    for customer_type, _ in Customer.CUSTOMER_TYPES
+                },
+            }, settings.CACHE_TTL['dashboard_stats'])
             
             logger.info("Customer stats cache warmed successfully")
             
@@ -158,6 +160,34 @@ class CacheWarmer:
         except Exception as e:
             logger.error(f"Failed to warm country codes cache: {e}")
 
+@contextmanager
+def coalesced_invalidation():
+    """
+    Hold back cache invalidation triggered inside the block and run each
+    distinct invalidation once on exit, so a loop of saves costs one round
+    of cache deletes instead of one per row. Nested blocks join the outer one.
+    """
+    if getattr(_deferred, 'pending', None) is not None:
+        yield
+        return
+    _deferred.pending = {}
+    try:
+        yield
+    finally:
+        pending, _deferred.pending = _deferred.pending, None
+        for func in pending.values():
+            func()
+
+
+def run_or_defer(key, func):
+    """Run `func` now, or once at the end of the enclosing coalesced_invalidation() block"""
+    pending = getattr(_deferred, 'pending', None)
+    if pending is None:
+        func()
+    else:
+        pending.setdefault(key, func)
+
+
 # Cache invalidation signals
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
@@ -165,6 +195,10 @@ from django.dispatch import receiver
 @receiver([post_save, post_delete], sender='crm.Customer')
 def invalidate_customer_cache(sender, **kwargs):
     """Invalidate customer-related cache on model changes"""
+    run_or_defer('customer_cache', _invalidate_customer_cache)
+
+
+def _invalidate_customer_cache():
     try:
         cache.delete_many([
             'customer_stats_total',
@@ -172,8 +206,8 @@ def invalidate_customer_cache(sender, **kwargs):
             'customer_stats_by_type'
         ])
         
-        # Invalidate customer search cache pattern
-        CacheManager.invalidate_pattern('customer_search')
+        # customer_search results are left to their 5-minute TTL: matching
+        # their keys would mean a Redis SCAN per save
         
         logger.info("Customer cache invalidated")
         
@@ -0,0 +1,118 @@
+# changes.py - Incremental customer change feed ordered by (updated_at, id), with tombstones
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .serializers import serialize_values, values_plan
+
+logger = logging.getLogger(__name__)
+
+# Rows changed this recently are held back: a transaction that commits late
+# with an older updated_at would otherwise land behind a client's cursor
+SETTLE_SECONDS = getattr(settings, 'CHANGE_FEED_SETTLE_SECONDS', 5)
+# Tombstones are kept this long; older cursors must resync from scratch
+TOMBSTONE_RETENTION_DAYS = getattr(settings, 'CHANGE_FEED_TOMBSTONE_DAYS', 90)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class CursorExpired(Exception):
+    """The cursor predates retained tombstones, so deletions may have been missed"""
+
+
+def _micros(moment: datetime) -> int:
+    # Exact integer arithmetic: a float timestamp can be off by a microsecond
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def _moment(micros: int) -> datetime:
+    return EPOCH + timedelta(microseconds=micros)
+
+
+def make_cursor(moment: datetime, object_id) -> str:
+    """Same "<microseconds>_<id>" shape as timeline cursors"""
+    return f"{_micros(moment)}_{object_id}"
+
+
+def parse_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Split a cursor into (moment, id); raises ValueError when malformed"""
+    micros, _, object_id = cursor.partition('_')
+    return _moment(int(micros)), str(uuid.UUID(object_id))
+
+
+def tombstone_horizon() -> datetime:
+    return timezone.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+
+
+def _after(queryset, time_field: str, id_field: str, since: Optional[Tuple[datetime, str]]):
+    """Keyset filter: rows strictly after the cursor in (time, id) order"""
+    if since is None:
+        return queryset
+    moment, object_id = since
+    return queryset.filter(
+        Q(**{f'{time_field}__gt': moment}) | Q(**{time_field: moment, f'{id_field}__gt': object_id})
+    )
+
+
+def customer_changes(serializer, since: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+    """
+    One page of customer changes after `since`.
+
+    Upserts are rendered from values() rows through `serializer`'s fast-path
+    plan (so `?fields=` applies). Each source is read with one keyset query of
+    at most limit + 1 rows on its (time, id) index, then the two are merged.
+    """
+    from .models import Customer, CustomerTombstone
+
+    after = parse_cursor(since) if since else None
+    if after is not None and after[0] < tombstone_horizon():
+        raise CursorExpired(since)
+
+    settled = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    plan = values_plan(serializer)
+    columns = set(plan[0]) | {'id', 'updated_at'}
+
+    rows = list(
+        _after(Customer.objects.filter(updated_at__lte=settled), 'updated_at', 'id', after)
+        .order_by('updated_at', 'id')
+        .values(*columns)[:limit + 1]
+    )
+    tombstones = list(
+        _after(CustomerTombstone.objects.filter(deleted_at__lte=settled), 'deleted_at', 'customer_id', after)
+        .order_by('deleted_at', 'customer_id')
+        .values_list('customer_id', 'deleted_at')[:limit + 1]
+    )
+
+    changes: List[Tuple[datetime, str, Dict[str, Any]]] = []
+    for row, data in zip(rows, serialize_values(rows, plan)):
+        changes.append((row['updated_at'], str(row['id']), {
+            'type': 'upsert', 'id': str(row['id']), 'changed_at': row['updated_at'].isoformat(), 'data': data,
+        }))
+    for customer_id, deleted_at in tombstones:
+        changes.append((deleted_at, str(customer_id), {
+            'type': 'delete', 'id': str(customer_id), 'changed_at': deleted_at.isoformat(),
+        }))
+    changes.sort(key=lambda change: (change[0], change[1]))
+
+    page = changes[:limit]
+    if page:
+        cursor = make_cursor(page[-1][0], page[-1][1])
+    else:
+        cursor = since
+    return {
+        'results': [change for _, _, change in page],
+        'cursor': cursor,
+        'has_more': len(changes) > limit,
+    }
+
+
+def purge_tombstones():
+    """Delete tombstones past their retention (batched, like the log tables)"""
+    from .models import CustomerTombstone
+    from .retention import delete_in_batches
+    return delete_in_batches(CustomerTombstone.objects.filter(deleted_at__lt=tombstone_horizon()))
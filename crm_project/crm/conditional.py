@@ -0,0 +1,127 @@
+# conditional.py - ETag / Last-Modified conditional GET for API resources
+import hashlib
+import logging
+import time
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+logger = logging.getLogger('crm.performance')
+
+VERSION_KEY_PREFIX = 'crm:collection_version'
+RESPONSE_KEY_PREFIX = 'crm:conditional'
+
+
+def collection_version(name: str) -> float:
+    """
+    Change stamp of a collection: the time of its last recorded write.
+
+    A missing stamp (cold or evicted cache) starts at "now", so clients
+    holding validators from before the eviction simply refetch once.
+    """
+    key = f"{VERSION_KEY_PREFIX}:{name}"
+    version = cache.get(key)
+    if version is None:
+        version = time.time()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_collection_version(*names: str):
+    """Invalidate every validator of the named collections (called from signals)"""
+    now = time.time()
+    try:
+        cache.set_many({f"{VERSION_KEY_PREFIX}:{name}": now for name in names}, None)
+    except Exception as e:
+        # Stale validators would serve 304s for changed data; drop the stamps instead
+        logger.error(f"Failed to bump collection versions {names}: {e}")
+        cache.delete_many([f"{VERSION_KEY_PREFIX}:{name}" for name in names])
+
+
+class ConditionalGetMixin:
+    """
+    Answer `If-None-Match` / `If-Modified-Since` on list and retrieve with 304.
+
+    `conditional_collection` names the version stamp bumped whenever the
+    collection changes (see signals.py). `last_modified_field` optionally names
+    a model column for Last-Modified: one row lookup for retrieve, one
+    `MAX()` over the filtered queryset for list. The 304 is returned before the
+    serializer runs. With `conditional_cache_timeout`, full responses are also
+    cached under their ETag, which can never serve stale data.
+
+    Writes made with queryset.update() bypass signals and must bump the
+    version themselves.
+    """
+
+    conditional_collection = None
+    last_modified_field = None
+    conditional_cache_timeout = None
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(request, super().list, False, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, super().retrieve, True, *args, **kwargs)
+
+    def get_last_modified(self, detail: bool):
+        if self.last_modified_field is None:
+            return None
+        field = self.last_modified_field
+        if detail:
+            lookup = self.lookup_url_kwarg or self.lookup_field
+            queryset = self.get_queryset().filter(**{self.lookup_field: self.kwargs[lookup]})
+            return queryset.order_by().values_list(field, flat=True).first()
+        return self.filter_queryset(self.get_queryset()).order_by().aggregate(latest=Max(field))['latest']
+
+    def get_validators(self, request, detail: bool):
+        """(ETag, Last-Modified timestamp) for this request, or (None, None) to skip"""
+        changed = self.get_last_modified(detail)
+        if detail and self.last_modified_field is not None:
+            if changed is None:
+                return None, None  # let retrieve() raise the 404
+            version = None  # the row's own timestamp is the validator
+        else:
+            version = collection_version(self.conditional_collection) if self.conditional_collection else None
+
+        stamps = [changed.timestamp()] if changed is not None else []
+        if version is not None:
+            stamps.append(version)
+        if not stamps:
+            return None, None
+
+        # Representation depends on the query string (?fields=, filters, page) and the media type
+        raw = f"{version}|{changed}|{request.get_full_path()}|{request.accepted_media_type}"
+        etag = f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+        return etag, int(max(stamps))
+
+    def _conditional(self, request, handler, detail, *args, **kwargs):
+        etag, last_modified = self.get_validators(request, detail)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            response = not_modified
+        else:
+            response = self._cached_response(etag, handler, request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def _cached_response(self, etag, handler, request, *args, **kwargs):
+        if not self.conditional_cache_timeout:
+            return handler(request, *args, **kwargs)
+        key = f"{RESPONSE_KEY_PREFIX}:{type(self).__name__}:{etag[1:-1]}"
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.conditional_cache_timeout)
+        return response
+
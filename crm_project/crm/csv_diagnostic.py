@@ -6,15 +6,9 @@ Helps diagnose issues with CSV files before import
 
 import csv
 import io
+import os
 import re
-from typing import Dict, List, Any
-
-# Optional chardet import with fallback
-try:
-    import chardet
-    HAS_CHARDET = True
-except ImportError:
-    HAS_CHARDET = False
+from typing import Dict, List, Any, Optional
 
 class CSVDiagnostic:
     """Diagnostic tool for CSV import issues"""
@@ -24,31 +18,38 @@ class CSVDiagnostic:
         self.warnings = []
         self.info = []
     
-    def analyze_file(self, file_path_or_content: str, is_file_path: bool = True) -> Dict[str, Any]:
+    # Bytes read from the head of the file; the rest is estimated from this sample
+    SAMPLE_BYTES = 64 * 1024
+    
+    def analyze_file(self, file_path_or_content: str, is_file_path: bool = True,
+                     sample_bytes: Optional[int] = SAMPLE_BYTES) -> Dict[str, Any]:
         """
-        Comprehensive analysis of CSV file
+        Comprehensive analysis of CSV file. Only the first `sample_bytes` are
+        read and analysed, with the line count estimated for the rest; pass
+        sample_bytes=None to analyse the whole file
         """
         try:
             if is_file_path:
-                # Read file with encoding detection
+                from .uploads import UniversalDetector, detect_encoding
+                
+                total_size = os.path.getsize(file_path_or_content)
                 with open(file_path_or_content, 'rb') as f:
-                    raw_data = f.read()
+                    # Detection feeds the file to chardet chunk by chunk and rewinds
+                    encoding, confidence = detect_encoding(f)
+                    raw_data = f.read(sample_bytes) if sample_bytes else f.read()
+                if len(raw_data) < total_size:
+                    raw_data = _complete_lines(raw_data, b'\n')
+                sample_size = len(raw_data)
                 
-                # Detect encoding
-                if HAS_CHARDET:
-                    encoding_result = chardet.detect(raw_data)
-                    encoding = encoding_result['encoding']
-                    confidence = encoding_result['confidence']
+                if UniversalDetector is not None:
                     self.info.append(f"Detected encoding: {encoding} (confidence: {confidence:.2f})")
                 else:
-                    # Fallback encoding detection
-                    encoding = 'utf-8'  # Default assumption
-                    self.info.append("Encoding detection: chardet not available, assuming UTF-8")
+                    self.info.append(f"Encoding detection: chardet not available, guessed {encoding}")
                 
                 # Try to decode
                 try:
                     content = raw_data.decode(encoding)
-                except UnicodeDecodeError:
+                except (UnicodeDecodeError, LookupError, TypeError):
                     # Fallback encodings
                     for fallback_encoding in ['utf-8', 'latin-1', 'cp1252']:
                         try:
@@ -61,13 +62,26 @@ class CSVDiagnostic:
                     else:
                         self.issues.append("Could not decode file with any standard encoding")
                         return self._build_result()
+                size_unit = 'bytes'
             else:
                 content = file_path_or_content
                 encoding = 'provided_as_string'
+                total_size = len(content)
+                if sample_bytes and total_size > sample_bytes:
+                    content = _complete_lines(content[:sample_bytes], '\n')
+                sample_size = len(content)
+                size_unit = 'characters'
             
             # Basic file analysis
-            self.info.append(f"File size: {len(content)} characters")
-            self.info.append(f"Number of lines: {content.count(chr(10)) + 1}")
+            sampled = sample_size < total_size
+            self.info.append(f"File size: {total_size} {size_unit}")
+            if sampled:
+                estimated_lines = round(total_size * content.count(chr(10)) / sample_size) if sample_size else 0
+                self.info.append(
+                    f"Number of lines: ~{estimated_lines} (estimated from the first {sample_size} {size_unit})"
+                )
+            else:
+                self.info.append(f"Number of lines: {content.count(chr(10)) + 1}")
             
             # Check for BOM
             if content.startswith('\ufeff'):
@@ -104,6 +118,7 @@ class CSVDiagnostic:
                 'structure_analysis': structure_analysis,
                 'issues_analysis': issues_analysis,
                 'mapping_analysis': mapping_analysis,
+                'sampled': sampled,
                 'content_sample': content[:500] + '...' if len(content) > 500 else content
             })
             
@@ -270,6 +285,11 @@ class CSVDiagnostic:
         
         return result
 
+def _complete_lines(data, newline):
+    """Cut a sample back to its last line break so no row (or multi-byte character) is split"""
+    cut = data.rfind(newline)
+    return data[:cut + 1] if cut > 0 else data
+
 def diagnose_csv_file(file_path: str) -> Dict[str, Any]:
     """Quick diagnostic function"""
     diagnostic = CSVDiagnostic()
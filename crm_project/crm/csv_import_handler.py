@@ -1,15 +1,32 @@
 import csv
+import hashlib
 import io
+import json
 import re
-from typing import Dict, List, Tuple, Any, Optional
-from django.db import transaction
+from typing import Dict, Iterator, List, Tuple, Any, Optional
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
-from .models import Customer
+from .import_pipeline import CustomerImportPipeline
+from .uploads import open_text
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def iter_lines(text: str) -> Iterator[str]:
+    """Lines of `text` (with their endings) for csv.reader, without copying it into a StringIO"""
+    start, length = 0, len(text)
+    while start < length:
+        end = text.find('\n', start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end + 1]
+        start = end + 1
+
+
 class CSVImportHandler:
     """
     Robust CSV import handler for customer data with flexible field mapping
@@ -116,11 +133,23 @@ class CSVImportHandler:
         self.success_count = 0
         self.total_rows = 0
         
+    def sample_content(self, csv_content: str, size: Optional[int] = None) -> str:
+        """
+        The first `size` characters (CSV_SAMPLE_BYTES by default), cut back to
+        the last complete line so the sniffer never sees a truncated row
+        """
+        size = size or getattr(settings, 'CSV_SAMPLE_BYTES', 64 * 1024)
+        if len(csv_content) <= size:
+            return csv_content
+        sample = csv_content[:size]
+        cut = sample.rfind('\n')
+        return sample[:cut + 1] if cut > 0 else sample
+    
     def detect_delimiter(self, csv_content: str) -> str:
-        """Auto-detect CSV delimiter with enhanced fallback"""
-        # Try different sample sizes
-        for sample_size in [1024, 2048, len(csv_content)]:
-            sample = csv_content[:min(sample_size, len(csv_content))]
+        """Auto-detect CSV delimiter from growing samples of the head of the file"""
+        # Try different sample sizes; never more than CSV_SAMPLE_BYTES however large the file
+        for sample_size in [1024, 8192, None]:
+            sample = self.sample_content(csv_content, sample_size)
             
             # Try CSV sniffer first
             sniffer = csv.Sniffer()
@@ -148,15 +177,57 @@ class CSVImportHandler:
                             return delimiter
                     except:
                         continue
+            
+            if len(sample) == len(csv_content):
+                break
         
         # Final fallback
         return ','
     
+    def count_rows(self, csv_content: str, delimiter: str, exact: bool = False,
+                   total_chars: Optional[int] = None) -> Tuple[int, bool]:
+        """
+        Data rows in the file as (count, is_exact). Unless `exact` is set, files
+        larger than the sample are estimated from the sample's characters per
+        row; an exact count streams through the content once. `total_chars`
+        marks csv_content as only the head of a file that long
+        """
+        total_chars = len(csv_content) if total_chars is None else total_chars
+        sample = self.sample_content(csv_content)
+        if (exact and total_chars <= len(csv_content)) or len(sample) >= total_chars:
+            return self.count_records(iter_lines(csv_content), delimiter), True
+        
+        records = sum(1 for row in csv.reader(iter_lines(sample), delimiter=delimiter) if row)
+        if records < 2:
+            return max(records - 1, 0), False
+        chars_per_record = len(sample) / records
+        return max(round(total_chars / chars_per_record) - 1, 0), False
+    
+    def count_records(self, lines, delimiter: str) -> int:
+        """Data rows (header excluded) in an iterable of lines, read one line at a time"""
+        records = sum(1 for row in csv.reader(lines, delimiter=delimiter) if row)
+        return max(records - 1, 0)
+    
     def analyze_headers(self, headers: List[str]) -> Dict[str, str]:
         """
         Analyze CSV headers and create field mapping
         Returns dict mapping CSV column names to model field names
+
+        Results are cached by a hash of the headers and the mapping tables, so
+        the preview and the import of the same file (and repeat uploads of a
+        standard export) map their headers once
         """
+        key_data = json.dumps([type(self).__name__, self.FIELD_MAPPINGS, self.MANDATORY_FIELDS, list(headers)])
+        cache_key = f"csv_header_mapping:{hashlib.md5(key_data.encode()).hexdigest()}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        result = self._map_headers(headers)
+        cache.set(cache_key, result, settings.CACHE_TTL.get('csv_header_mapping', 60 * 60))
+        return result
+    
+    def _map_headers(self, headers: List[str]) -> Tuple[Dict[str, str], List[str]]:
         field_mapping = {}
         unmapped_headers = []
         
@@ -474,14 +545,17 @@ class CSVImportHandler:
             self.errors.append(f"Row {row_num}: Unexpected error - {str(e)}")
             return None
     
-    def import_csv(self, csv_content: str, field_mapping: Optional[Dict[str, str]] = None, default_source: str = 'csv_import') -> Dict[str, Any]:
+    def import_csv(self, csv_content: str, field_mapping: Optional[Dict[str, str]] = None, default_source: str = 'csv_import', workers: Optional[int] = None) -> Dict[str, Any]:
         """
-        Main import function
+        Main import function. Rows go through MappedCSVImport: cleaned by
+        process_row in `workers` processes, deduplicated by email and written
+        in batches, all in one transaction and only if every row is valid
         """
         self.errors = []
         self.warnings = []
         self.success_count = 0
         self.total_rows = 0
+        pipeline = None
         
         try:
             # Detect delimiter
@@ -519,80 +593,20 @@ class CSVImportHandler:
                     'headers': headers
                 }
             
-            # Process rows
-            customers_to_create = []
-            seen_emails = set()  # Track emails within CSV to prevent duplicates
-            
-            with transaction.atomic():
-                for row_num, row in enumerate(reader, start=2):  # Start at 2 (after header)
-                    self.total_rows += 1
-                    
-                    customer_data = self.process_row(row, field_mapping, row_num, default_source)
-                    if customer_data:
-                        try:
-                            email_primary = customer_data['email_primary']
-                            
-                            # Check for duplicates within the CSV itself
-                            if email_primary in seen_emails:
-                                self.warnings.append(
-                                    f"Row {row_num}: Duplicate email {email_primary} found within CSV, skipping"
-                                )
-                                continue
-                            
-                            # Check for existing customer in database
-                            existing = Customer.objects.filter(
-                                email_primary=email_primary
-                            ).first()
-                            
-                            if existing:
-                                self.warnings.append(
-                                    f"Row {row_num}: Customer with email {email_primary} already exists in database, skipping"
-                                )
-                                continue
-                            
-                            # Add email to seen set
-                            seen_emails.add(email_primary)
-                            
-                            # Create customer
-                            customer = Customer(**customer_data)
-                            customer.full_clean()  # Validate
-                            customers_to_create.append(customer)
-                            
-                        except ValidationError as e:
-                            error_msg = f"Row {row_num}: Validation error - {str(e)}"
-                            self.errors.append(error_msg)
-                        except Exception as e:
-                            error_msg = f"Row {row_num}: Error - {str(e)}"
-                            self.errors.append(error_msg)
-                
-                # Bulk create if no errors
-                if not self.errors and customers_to_create:
-                    try:
-                        Customer.objects.bulk_create(customers_to_create)
-                        self.success_count = len(customers_to_create)
-                    except Exception as bulk_error:
-                        # If bulk create fails, try individual creates to identify problematic records
-                        logger.error(f"Bulk create failed: {str(bulk_error)}")
-                        
-                        if "UNIQUE constraint failed" in str(bulk_error):
-                            self.errors.append("Bulk import failed due to duplicate email addresses. Processing records individually...")
-                            
-                            # Process individual records to identify duplicates
-                            for i, customer in enumerate(customers_to_create):
-                                try:
-                                    customer.save()
-                                    self.success_count += 1
-                                except Exception as individual_error:
-                                    if "UNIQUE constraint failed" in str(individual_error):
-                                        self.errors.append(f"Customer with email {customer.email_primary} could not be created: duplicate email address")
-                                    else:
-                                        self.errors.append(f"Customer with email {customer.email_primary} could not be created: {str(individual_error)}")
-                        else:
-                            self.errors.append(f"Bulk create failed: {str(bulk_error)}")
-                            self.success_count = 0
+            # Map, clean, dedupe and write through the shared import pipeline
+            pipeline = MappedCSVImport(field_mapping, default_source, delimiter, workers=workers)
+            stats = pipeline.run_rows(reader)
+            self.total_rows = stats.total
+            self.success_count = stats.imported
+            self.errors.extend(stats.errors)
+            self.warnings.extend(stats.warnings)
         
         except Exception as e:
             logger.error(f"CSV processing error: {str(e)}")
+            if pipeline is not None:
+                self.total_rows = pipeline.stats.total
+                self.errors.extend(pipeline.stats.errors)
+                self.warnings.extend(pipeline.stats.warnings)
             return {
                 'success': False,
                 'error': f'CSV processing error: {str(e)}',
@@ -619,16 +633,45 @@ class CSVImportHandler:
             'field_mapping': field_mapping
         }
     
-    def preview_import(self, csv_content: str, max_rows: int = 5) -> Dict[str, Any]:
+    def preview_upload(self, upload, max_rows: int = 5, exact_count: bool = False) -> Dict[str, Any]:
         """
-        Preview CSV import with field mapping suggestions
+        Preview an uploaded file from its first CSV_SAMPLE_BYTES characters.
+        The row total is estimated from upload.size; with `exact_count` the
+        rest of the file is streamed through the row counter, never held
+        """
+        size = getattr(settings, 'CSV_SAMPLE_BYTES', 64 * 1024)
+        text = open_text(upload)
+        try:
+            head = text.read(size)
+            if len(head) < size:
+                total_chars = len(head)
+            else:
+                head = head[:head.rfind('\n') + 1] or head
+                # Assume the rest of the file encodes like its head
+                head_bytes = len(head.encode(text.encoding, errors='replace'))
+                total_chars = round(upload.size * len(head) / head_bytes)
+            
+            result = self.preview_import(head, max_rows=max_rows, total_chars=total_chars)
+            if exact_count and result.get('total_rows_estimated'):
+                text.seek(0)
+                result['total_rows_detected'] = self.count_records(text, result['delimiter_detected'])
+                result['total_rows_estimated'] = False
+            return result
+        finally:
+            text.detach()
+    
+    def preview_import(self, csv_content: str, max_rows: int = 5, exact_count: bool = False,
+                       total_chars: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Preview CSV import with field mapping suggestions. Only the head of the
+        file is parsed; the row total is an estimate unless `exact_count` is set.
+        Pass `total_chars` when csv_content is only the head of a larger file
         """
         try:
             delimiter = self.detect_delimiter(csv_content)
             logger.info(f"Detected delimiter: '{delimiter}'")
             
-            csv_file = io.StringIO(csv_content)
-            reader = csv.DictReader(csv_file, delimiter=delimiter)
+            reader = csv.DictReader(iter_lines(csv_content), delimiter=delimiter)
             
             headers = reader.fieldnames
             if not headers:
@@ -661,12 +704,12 @@ class CSVImportHandler:
                 except Exception as row_error:
                     row_errors.append(f"Row {i+2}: {str(row_error)}")
             
-            # Count total rows more safely
+            # Count (or estimate) total rows more safely
             try:
-                total_rows = sum(1 for _ in csv.DictReader(io.StringIO(csv_content), delimiter=delimiter))
+                total_rows, exact = self.count_rows(csv_content, delimiter, exact=exact_count, total_chars=total_chars)
             except Exception as count_error:
                 logger.warning(f"Could not count total rows: {count_error}")
-                total_rows = len(sample_rows)
+                total_rows, exact = len(sample_rows), False
             
             result = {
                 'headers': headers,
@@ -675,6 +718,7 @@ class CSVImportHandler:
                 'missing_fields': missing_fields,
                 'sample_rows': sample_rows,
                 'total_rows_detected': total_rows,
+                'total_rows_estimated': not exact,
                 'delimiter_detected': delimiter
             }
             
@@ -689,4 +733,31 @@ class CSVImportHandler:
                 'error': f'Preview error: {str(e)}',
                 'error_type': type(e).__name__,
                 'csv_sample': csv_content[:500] + '...' if len(csv_content) > 500 else csv_content
-            }
\ No newline at end of file
+            }
+
+
+class MappedCSVImport(CustomerImportPipeline):
+    """
+    CSVImportHandler's import as a pipeline: rows are cleaned by process_row
+    using the header mapping, deduplicated by email, and written in one
+    transaction only when no row failed
+    """
+    
+    dedupe_fields = ('email_primary',)
+    all_or_nothing = True
+    atomic = True
+    
+    def __init__(self, field_mapping: Dict[str, str], default_source: str = 'csv_import', delimiter: str = ',', **kwargs):
+        super().__init__(**kwargs)
+        self.field_mapping = field_mapping
+        self.default_source = default_source
+        self.delimiter = delimiter
+        self.handler = CSVImportHandler()
+    
+    def worker_kwargs(self) -> Dict[str, Any]:
+        return {'field_mapping': self.field_mapping, 'default_source': self.default_source, 'delimiter': self.delimiter}
+    
+    def map_row(self, row: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        handler = self.handler
+        handler.errors, handler.warnings = self.current.errors, self.current.warnings
+        return handler.process_row(row, self.field_mapping, self.current.row_num, self.default_source)
@@ -49,7 +49,7 @@ def custom_exception_handler(exc, context):
     
     error_data = {
         'exception_type': type(exc).__name__,
-        'message': str(exc),
+        'error_message': str(exc),
         'path': getattr(request, 'path', ''),
         'method': getattr(request, 'method', ''),
         'user': str(user) if user and user.is_authenticated else 'Anonymous',
@@ -1,6 +1,16 @@
 # forms.py - Django forms for customer management
 from django import forms
-from .models import Customer, Enrollment, Course, CustomerCommunicationPreference
+from .models import Customer, CustomerProfile, Enrollment, Course, CustomerCommunicationPreference
+
+
+def profile_form_field(name, meta):
+    """Form field for a CustomerProfile column, using the widget and help text listed in `meta`"""
+    kwargs = {}
+    if name in meta.widgets:
+        kwargs['widget'] = meta.widgets[name]
+    if name in meta.help_texts:
+        kwargs['help_text'] = meta.help_texts[name]
+    return CustomerProfile._meta.get_field(name).formfield(**kwargs)
 
 
 class CustomerForm(forms.ModelForm):
@@ -328,8 +338,24 @@ class CustomerForm(forms.ModelForm):
             'newsletter_subscription': 'Subscribe to newsletter.',
         }
 
+    # Stored on CustomerProfile, so ModelForm can't build these from Customer's columns
+    emergency_contact_name = profile_form_field('emergency_contact_name', Meta)
+    emergency_contact_relationship = profile_form_field('emergency_contact_relationship', Meta)
+    emergency_contact_phone = profile_form_field('emergency_contact_phone', Meta)
+    emergency_contact_email = profile_form_field('emergency_contact_email', Meta)
+    linkedin_profile = profile_form_field('linkedin_profile', Meta)
+    facebook_profile = profile_form_field('facebook_profile', Meta)
+    twitter_handle = profile_form_field('twitter_handle', Meta)
+    instagram_handle = profile_form_field('instagram_handle', Meta)
+    address_secondary = profile_form_field('address_secondary', Meta)
+    internal_notes = profile_form_field('internal_notes', Meta)
+    special_requirements = profile_form_field('special_requirements', Meta)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        if self.instance.pk and not self.instance._state.adding:
+            for field_name in Customer.PROFILE_FIELDS:
+                self.initial.setdefault(field_name, getattr(self.instance, field_name))
         # Make fields with model defaults not required in the form
         # so the model defaults are used when not provided
         fields_with_defaults = [
@@ -347,6 +373,13 @@ class CustomerForm(forms.ModelForm):
             if field_name in self.fields:
                 self.fields[field_name].required = True
 
+    def save(self, commit=True):
+        # construct_instance() only copies Customer's own columns; Customer.save() writes the profile
+        for field_name in Customer.PROFILE_FIELDS:
+            if field_name in self.cleaned_data:
+                setattr(self.instance, field_name, self.cleaned_data[field_name])
+        return super().save(commit)
+
 
 class CustomerCommunicationPreferenceForm(forms.ModelForm):
     """Form for managing customer communication preferences"""
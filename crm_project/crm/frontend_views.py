@@ -341,53 +341,44 @@ def test_country_code_form(request):
 def dashboard(request):
     """Enhanced CRM Dashboard with activity timeline and Stripe payments"""
     from django.utils import timezone
-    from django.db.models import Sum, Count
+    from django.db.models import Sum
     from datetime import timedelta
 
     today = timezone.now().date()
     yesterday = today - timedelta(days=1)
 
-    # Key metrics
-    total_customers = Customer.objects.count()
-    active_customers = Customer.objects.filter(status='active').count()
+    # Key metrics and segment charts: one grouped query (cached per customer version)
+    from .aggregates import counts_for, segment_counts, total_for
+    segments = segment_counts([(), ('status',), ('customer_type',), ('customer_centre',), ('service_subscribed',)])
+    total_customers = total_for(segments)
+    active_customers = total_for(segments, status='active')
     active_percentage = round((active_customers / total_customers * 100) if total_customers > 0 else 0)
     new_customers_today = Customer.objects.filter(created_at__date=today).count()
 
     total_courses = Course.objects.filter(is_active=True).count()
     total_enrollments = Enrollment.objects.filter(status__in=['registered', 'confirmed']).count()
 
-    # Customer Centre statistics
-    centre_stats = Customer.objects.exclude(customer_centre='').values('customer_centre').annotate(
-        count=Count('id')
-    ).order_by('-count')[:10]
-    # Add display names
-    centre_choices_dict = dict(Customer.CUSTOMER_CENTRE_CHOICES)
-    for stat in centre_stats:
-        stat['display_name'] = centre_choices_dict.get(stat['customer_centre'], stat['customer_centre'])
-
-    # Service Subscribed statistics
-    service_stats = Customer.objects.exclude(service_subscribed='').values('service_subscribed').annotate(
-        count=Count('id')
-    ).order_by('-count')[:10]
-    # Add display names
-    service_choices_dict = dict(Customer.SERVICE_SUBSCRIBED_CHOICES)
-    for stat in service_stats:
-        stat['display_name'] = service_choices_dict.get(stat['service_subscribed'], stat['service_subscribed'])
-
-    # Customer Type statistics
-    type_stats = Customer.objects.values('customer_type').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    type_choices_dict = dict(Customer.CUSTOMER_TYPES)
-    for stat in type_stats:
-        stat['display_name'] = type_choices_dict.get(stat['customer_type'], stat['customer_type'])
+    def segment_stats(dimension, choices, limit=None, skip_blank=False):
+        choices_dict = dict(choices)
+        stats = [
+            {dimension: row['values'][dimension], 'count': row['count'],
+             'display_name': choices_dict.get(row['values'][dimension], row['values'][dimension])}
+            for row in counts_for(segments, dimension)
+            if not (skip_blank and row['values'][dimension] == '')
+        ]
+        return stats[:limit] if limit else stats
+
+    centre_stats = segment_stats('customer_centre', Customer.CUSTOMER_CENTRE_CHOICES, limit=10, skip_blank=True)
+    service_stats = segment_stats('service_subscribed', Customer.SERVICE_SUBSCRIBED_CHOICES, limit=10, skip_blank=True)
+    type_stats = segment_stats('customer_type', Customer.CUSTOMER_TYPES)
 
     # Stripe payment metrics
     try:
-        from .models import StripePayment, Activity
-        payment_stats = StripePayment.objects.filter(status='paid').aggregate(
+        from .models import StripePayment, StripeRevenueRollup
+        # Read the monthly rollups instead of scanning every paid payment
+        payment_stats = StripeRevenueRollup.objects.filter(granularity='month').aggregate(
             total=Sum('converted_amount'),
-            count=Count('id')
+            count=Sum('payment_count')
         )
         total_revenue = payment_stats['total'] or 0
         payment_count = payment_stats['count'] or 0
@@ -395,8 +386,9 @@ def dashboard(request):
         # Recent payments
         recent_payments = StripePayment.objects.select_related('customer').order_by('-payment_date')[:10]
 
-        # Activity timeline
-        activities = Activity.objects.select_related('customer').order_by('-created_at')[:20]
+        # Activity timeline (served from the capped timeline cache)
+        from .timeline import timeline, entry_for_display
+        activities = [entry_for_display(entry) for entry in timeline.latest(limit=20)]
     except Exception:
         total_revenue = 0
         payment_count = 0
@@ -479,10 +471,7 @@ def stripe_payments(request):
 @login_required
 def import_stripe(request):
     """Import Stripe payment data from CSV"""
-    import csv
-    from decimal import Decimal
-    from datetime import datetime
-    from .models import StripePayment, Activity
+    from .stripe_import import StripePaymentImporter
     
     if request.method == 'POST' and request.FILES.get('csv_file'):
         csv_file = request.FILES['csv_file']
@@ -493,96 +482,15 @@ def import_stripe(request):
             return redirect('crm:import_stripe')
         
         try:
-            # Detect encoding
-            import chardet
-            raw_data = csv_file.read()
-            detected = chardet.detect(raw_data)
-            encoding = detected['encoding'] or 'utf-8'
-            csv_file.seek(0)
-            
-            # Parse CSV
-            decoded_file = raw_data.decode(encoding)
-            reader = csv.DictReader(decoded_file.splitlines())
-            
-            imported = 0
-            skipped = 0
-            errors = []
-            
-            for row in reader:
-                try:
-                    stripe_id = row.get('id', '').strip()
-                    if not stripe_id:
-                        skipped += 1
-                        continue
-                    
-                    # Skip if already exists
-                    if StripePayment.objects.filter(stripe_id=stripe_id).exists():
-                        skipped += 1
-                        continue
-                    
-                    # Parse amount
-                    amount = Decimal(row.get('Amount', '0') or '0')
-                    amount_refunded = Decimal(row.get('Amount Refunded', '0') or '0')
-                    converted_amount = Decimal(row.get('Converted Amount', '0') or '0') if row.get('Converted Amount') else None
-                    fee = Decimal(row.get('Fee', '0') or '0')
-                    
-                    # Parse dates
-                    date_str = row.get('Created date (UTC)', '')
-                    payment_date = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S') if date_str else None
-                    
-                    # Parse status
-                    status_map = {
-                        'Paid': 'paid',
-                        'Failed': 'failed',
-                        'canceled': 'canceled',
-                        'Refunded': 'refunded',
-                    }
-                    raw_status = row.get('Status', 'pending')
-                    status = status_map.get(raw_status, 'pending')
-                    
-                    # Find matching customer
-                    customer_email = row.get('Customer Email', '')
-                    customer = None
-                    if customer_email:
-                        customer = Customer.objects.filter(email_primary__iexact=customer_email).first()
-                    
-                    # Create payment record
-                    StripePayment.objects.create(
-                        stripe_id=stripe_id,
-                        amount=amount,
-                        amount_refunded=amount_refunded,
-                        currency=row.get('Currency', 'usd').lower(),
-                        converted_amount=converted_amount,
-                        converted_currency=row.get('Converted Currency', '').lower(),
-                        status=status,
-                        customer_email=customer_email,
-                        stripe_customer_id=row.get('Customer ID', ''),
-                        customer=customer,
-                        site=row.get('1. Site (metadata)', '') or row.get('site (metadata)', ''),
-                        plan_name=row.get('stripe_plan (metadata)', ''),
-                        plan_days=int(row.get('plan_days (metadata)', 0) or 0) if row.get('plan_days (metadata)') else None,
-                        user_name=row.get('3. User name (metadata)', '') or row.get('2. User email (metadata)', ''),
-                        fee=fee,
-                        payment_date=payment_date,
-                        source_account=source_account,
-                        raw_data=dict(row),
-                    )
-                    imported += 1
-                    
-                except Exception as e:
-                    errors.append(f"Row error: {str(e)}")
-            
-            # Log activity
-            Activity.log(
-                activity_type='import_completed',
-                title=f'Stripe Import: {imported} payments',
-                description=f'Imported {imported} payments from {source_account}, skipped {skipped}',
+            importer = StripePaymentImporter(source_account=source_account)
+            stats = importer.import_file(
+                csv_file,
                 performed_by=request.user.username if request.user.is_authenticated else 'system'
             )
             
-            messages.success(request, f'Successfully imported {imported} payments. Skipped {skipped} (duplicates/empty).')
-            if errors:
-                messages.warning(request, f'Encountered {len(errors)} errors during import.')
+            messages.success(request, f"Successfully imported {stats['imported']} payments. Skipped {stats['skipped']} (duplicates/empty).")
+            if stats['errors']:
+                messages.warning(request, f"Encountered {len(stats['errors'])} errors during import.")
                 
         except Exception as e:
             messages.error(request, f'Error importing CSV: {str(e)}')
@@ -0,0 +1,58 @@
+# ids.py - Primary key generation: time-ordered UUIDv7 (RFC 9562) or random UUIDv4
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Optional
+
+from django.conf import settings
+
+# 7: new rows get time-ordered keys that append to the right of primary key
+# and foreign key indexes; 4: fully random keys (the original behaviour)
+PRIMARY_KEY_UUID_VERSION = getattr(settings, 'PRIMARY_KEY_UUID_VERSION', 7)
+
+_lock = threading.Lock()
+_last_ms = 0
+_sequence = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    UUIDv7: 48-bit Unix milliseconds, version, 12-bit sequence, variant, 62 random bits.
+
+    Values from one process are strictly increasing: within a millisecond the
+    sequence counts up from a random start, and if it overflows (or the clock
+    steps back) the timestamp is carried forward instead of going backwards.
+    """
+    global _last_ms, _sequence
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            _sequence = int.from_bytes(os.urandom(2), 'big') & 0x7FF  # start low to leave room for the counter
+        else:
+            _sequence += 1
+            if _sequence > 0xFFF:
+                _last_ms += 1
+                _sequence = 0
+        timestamp_ms, sequence = _last_ms, _sequence
+
+    random_bits = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    value = (timestamp_ms << 80) | (0x7 << 76) | (sequence << 64) | (0b10 << 62) | random_bits
+    return uuid.UUID(int=value)
+
+
+def new_uuid() -> uuid.UUID:
+    """Default for the UUID primary keys (see PRIMARY_KEY_UUID_VERSION)"""
+    if PRIMARY_KEY_UUID_VERSION == 4:
+        return uuid.uuid4()
+    return uuid7()
+
+
+def uuid7_datetime(value) -> Optional[datetime]:
+    """When a UUIDv7 was generated (millisecond precision); None for other versions"""
+    value = value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+    if value.version != 7:
+        return None
+    return datetime(1970, 1, 1, tzinfo=dt_timezone.utc) + timedelta(milliseconds=value.int >> 80)
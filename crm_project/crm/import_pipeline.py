@@ -0,0 +1,469 @@
+# import_pipeline.py - Staged customer import pipeline shared by every CSV importer
+import csv
+import io
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .bulk import WRITE_BATCH_SIZE, CustomerBulkWriter
+from .models import Customer
+from .uploads import open_text
+
+logger = logging.getLogger(__name__)
+
+# Country names (the COUNTRY_CHOICES labels), codes and common aliases -> country_region codes
+COUNTRY_CODES = {
+    **{label.lower(): code for code, label in Customer.COUNTRY_CHOICES if code},
+    **{code.lower(): code for code, _ in Customer.COUNTRY_CHOICES if code},
+    'hong kong': 'HK',
+    'uk': 'GB',
+    'usa': 'US',
+    'united states of america': 'US',
+}
+
+# How duplicate messages name each dedupe key
+KEY_LABELS = {'email_primary': 'email', 'youtube_handle': 'YouTube handle', 'name': 'name', 'id': 'id'}
+
+
+def country_code(value: str) -> str:
+    """The country_region code for a country name or code, '' when it is not recognised"""
+    return COUNTRY_CODES.get((value or '').strip().lower(), '')
+
+
+def clean_field(value) -> str:
+    if not value:
+        return ''
+    return str(value).strip()
+
+
+class SkipRow(Exception):
+    """Raised by map_row to skip a row; the message says why"""
+
+
+@dataclass
+class ImportRow:
+    """One CSV row on its way through the pipeline"""
+    row_num: int
+    customer: Optional[Customer] = None  # unsaved; kept on validation errors so the row still dedupes
+    source_id: Optional[str] = None  # value of the pipeline's id_column
+    skipped: Optional[str] = None
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ImportStats:
+    """Counts, messages and timing of one pipeline run"""
+    total: int = 0
+    imported: int = 0
+    skipped: int = 0
+    failed: int = 0
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    started: float = field(default_factory=time.perf_counter)
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        return (
+            f'{self.imported} imported, {self.skipped} skipped, {self.failed} errors '
+            f'({self.total} rows in {self.elapsed:.1f}s, {self.rows_per_second:,.0f} rows/s)'
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'total': self.total,
+            'imported': self.imported,
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'errors': self.errors,
+            'warnings': self.warnings,
+            'elapsed': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+        }
+
+
+class CustomerImportPipeline:
+    """
+    Import customers from CSV in stages:
+
+        decode -> parse -> map -> clean -> dedupe -> batch write -> report
+
+    An importer is a subclass that says how a row maps onto Customer fields
+    (map_row) and what counts as a duplicate (dedupe_fields, match_names,
+    id_column). The pipeline does the rest the same way for every importer:
+
+    - uploads and files are decoded as a stream with the encoding detected
+    - rows are mapped and validated without touching the database, in worker
+      processes when `workers` > 1
+    - duplicates within the file and against existing customers are found with
+      one query per key type per batch, not one per row
+    - new customers are written through CustomerBulkWriter in batches
+    - progress, counts, messages and throughput are collected in ImportStats
+
+        stats = MyImport(dry_run=True, log=print).run('customers.csv')
+
+    Row numbers match spreadsheet lines: the header is row 1.
+    """
+
+    # Unique keys checked against earlier rows of the file and existing customers
+    dedupe_fields = ('email_primary', 'youtube_handle')
+    # Also skip rows whose first + last name match an existing customer in name_queryset()
+    match_names = False
+    # CSV column with a customer id; rows whose id already exists are skipped
+    id_column = None
+    # Validate every row first and write nothing if any row failed
+    all_or_nothing = False
+    # Run the whole import in one transaction
+    atomic = False
+    delimiter = ','
+    first_row = 2
+
+    def __init__(self, dry_run: bool = False, workers: Optional[int] = 1, batch_size: Optional[int] = None,
+                 log: Optional[Callable[[str, str], None]] = None, progress_every: int = 10000):
+        self.dry_run = dry_run
+        self.workers = self.resolve_workers(workers)
+        self.batch_size = batch_size or WRITE_BATCH_SIZE
+        self.log = log
+        self.progress_every = progress_every
+        self.stats = ImportStats()
+        self.current: Optional[ImportRow] = None
+        self._seen: Set[Tuple[str, Any]] = set()
+        self._queued: Dict[int, ImportRow] = {}
+        self._held: List[ImportRow] = []
+
+    @staticmethod
+    def resolve_workers(workers: Optional[int]) -> int:
+        """Worker processes for map/clean: CSV_IMPORT_WORKERS when None, 0 meaning one per CPU"""
+        if workers is None:
+            workers = getattr(settings, 'CSV_IMPORT_WORKERS', 1)
+        if workers == 0:
+            workers = os.cpu_count() or 1
+        return max(workers, 1)
+
+    def worker_kwargs(self) -> Dict[str, Any]:
+        """Constructor arguments that rebuild this pipeline's map/clean rules in a worker process"""
+        return {}
+
+    # Stage hooks for importers
+
+    def map_row(self, row: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """
+        Customer field values for a CSV row. Return None to ignore a row that is
+        not meant for this importer, raise SkipRow to skip it with a reason
+        """
+        raise NotImplementedError
+
+    def name_queryset(self):
+        """Customers whose names count as duplicates when match_names is set"""
+        return Customer.objects.all()
+
+    def describe(self, customer: Customer) -> str:
+        contact = customer.email_primary or (f'@{customer.youtube_handle}' if customer.youtube_handle else 'no email')
+        return f'{customer.first_name} {customer.last_name} ({contact})'
+
+    def duplicate_message(self, row: ImportRow, key: str, value: Any, in_file: bool) -> str:
+        label = KEY_LABELS.get(key, key)
+        if key == 'name':
+            value = ' '.join(value)
+        if in_file:
+            return f"Row {row.row_num}: Duplicate {label} {value} found within CSV, skipping"
+        return f"Row {row.row_num}: Customer with {label} {value} already exists in database, skipping"
+
+    def warn(self, message: str):
+        """Record a warning against the row being mapped"""
+        self.current.warnings.append(f"Row {self.current.row_num}: {message}")
+
+    # Decode and parse
+
+    def run(self, source) -> ImportStats:
+        """Import from a file path, a binary file or upload, or an open text stream"""
+        with ExitStack() as stack:
+            if isinstance(source, (str, os.PathLike)):
+                source = stack.enter_context(open(source, 'rb'))
+            stream = source if isinstance(source, io.TextIOBase) else open_text(source)
+            return self.run_rows(self.parse(stream))
+
+    def parse(self, stream) -> Iterator[Dict[str, str]]:
+        return csv.DictReader(stream, delimiter=self.delimiter)
+
+    # Map and clean
+
+    def prepare_row(self, row_num: int, row: Dict[str, str]) -> Optional[ImportRow]:
+        """Map and validate one row. Never queries, so it can run in a worker process"""
+        result = self.current = ImportRow(row_num, source_id=clean_field(row.get(self.id_column)) if self.id_column else None)
+        try:
+            data = self.map_row(row)
+            if data is None:
+                return result if result.errors else None
+            result.customer = Customer(**data)
+            # Uniqueness is the dedupe stage's job (and the database's)
+            result.customer.full_clean(validate_unique=False, validate_constraints=False)
+        except SkipRow as e:
+            result.skipped = f"Row {row_num}: Skipping - {e}"
+        except ValidationError as e:
+            result.errors.append(f"Row {row_num}: Validation error - {str(e)}")
+        except Exception as e:
+            result.errors.append(f"Row {row_num}: Error - {str(e)}")
+        finally:
+            self.current = None
+        return result
+
+    def prepare(self, rows: Iterable[Dict[str, str]]) -> Iterator[Optional[ImportRow]]:
+        """
+        prepare_row() for every row, in file order. With more than one worker,
+        rows are sharded in CSV_IMPORT_CHUNK_SIZE chunks across a process pool
+        and merged back in order; a file that fits in one chunk stays in-process
+        since spawning would cost more
+        """
+        numbered = enumerate(rows, start=self.first_row)
+        chunk_size = getattr(settings, 'CSV_IMPORT_CHUNK_SIZE', 5000)
+        first_chunk = list(islice(numbered, chunk_size)) if self.workers > 1 else []
+
+        if self.workers == 1 or len(first_chunk) < chunk_size:
+            for row_num, row in chain(first_chunk, numbered):
+                yield self.prepare_row(row_num, row)
+            return
+
+        from .import_workers import init_worker, prepare_chunk
+
+        chunks = chain([first_chunk], iter(lambda: list(islice(numbered, chunk_size)), []))
+        pipeline_path = f'{type(self).__module__}.{type(self).__qualname__}'
+        logger.info(f"Preparing CSV rows with {self.workers} worker processes")
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+            initargs=(pipeline_path, self.worker_kwargs()),
+        ) as executor:
+            # Keep two chunks per worker in flight so parsing never runs far ahead of validation
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(prepare_chunk, chunk))
+                if len(pending) >= self.workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    # Dedupe
+
+    def row_keys(self, row: ImportRow) -> List[Tuple[str, Any, Any]]:
+        """(key, normalised value, display value) triples a row is deduplicated on"""
+        customer = row.customer
+        keys = []
+        for name in self.dedupe_fields:
+            value = getattr(customer, name)
+            if value and value.strip():
+                keys.append((name, value.strip().lower(), value.strip()))
+        if self.match_names and customer.first_name and customer.last_name:
+            names = (customer.first_name.strip(), customer.last_name.strip())
+            keys.append(('name', (names[0].lower(), names[1].lower()), names))
+        if row.source_id:
+            keys.append(('id', row.source_id.lower(), row.source_id))
+        return keys
+
+    def existing_keys(self, rows: List[ImportRow]) -> Set[Tuple[str, Any]]:
+        """Keys of `rows` that already belong to customers: at most one query per key type"""
+        wanted: Dict[str, Set] = {}
+        for row in rows:
+            for key, value, _ in self.row_keys(row):
+                wanted.setdefault(key, set()).add(value)
+        existing = set()
+
+        fields = [name for name in self.dedupe_fields if wanted.get(name)]
+        if fields:
+            lookups = Q()
+            for name in fields:
+                lookups |= Q(**{f'{name}_lower__in': wanted[name]})
+            matches = (
+                Customer.objects.alias(**{f'{name}_lower': Lower(name) for name in fields})
+                .filter(lookups)
+                .order_by()
+                .values_list(*fields)
+            )
+            for values in matches:
+                existing.update((name, value.lower()) for name, value in zip(fields, values) if value)
+
+        if wanted.get('name'):
+            matches = (
+                self.name_queryset()
+                .alias(first_lower=Lower('first_name'), last_lower=Lower('last_name'))
+                .filter(
+                    first_lower__in={first for first, _ in wanted['name']},
+                    last_lower__in={last for _, last in wanted['name']},
+                )
+                .order_by()
+                .values_list('first_name', 'last_name')
+            )
+            existing.update(('name', (first.lower(), last.lower())) for first, last in matches)
+
+        if wanted.get('id'):
+            ids = {}
+            for value in wanted['id']:
+                try:
+                    ids[str(Customer._meta.pk.to_python(value))] = value
+                except ValidationError:
+                    continue
+            found = Customer.objects.filter(pk__in=ids).values_list('pk', flat=True)
+            existing.update(('id', ids[str(pk)]) for pk in found)
+        return existing
+
+    def dedupe(self, rows: List[ImportRow]) -> List[ImportRow]:
+        """Skip rows repeating an earlier row of the file or an existing customer; returns the rest"""
+        existing = self.existing_keys([row for row in rows if row.customer is not None and not row.errors])
+        kept = []
+        for row in rows:
+            if row.customer is None:
+                kept.append(row)
+                continue
+            keys = self.row_keys(row)
+            repeated = next(((key, shown) for key, value, shown in keys if (key, value) in self._seen), None)
+            if repeated:
+                row.skipped = self.duplicate_message(row, *repeated, in_file=True)
+            else:
+                self._seen.update((key, value) for key, value, _ in keys)
+                taken = next(((key, shown) for key, value, shown in keys if (key, value) in existing), None)
+                if taken and not row.errors:
+                    row.skipped = self.duplicate_message(row, *taken, in_file=False)
+            kept.append(row)
+        return kept
+
+    # Write and report
+
+    def run_rows(self, rows: Iterable[Dict[str, str]]) -> ImportStats:
+        """Run every stage after parsing over already-parsed CSV rows"""
+        stats = self.stats = ImportStats()
+        with ExitStack() as stack:
+            if self.atomic:
+                stack.enter_context(transaction.atomic())
+            writer = None if self.dry_run else stack.enter_context(CustomerBulkWriter(self.batch_size, on_flush=self._flushed))
+
+            batch = []
+            for row in self.prepare(rows):
+                stats.total += 1
+                if row is not None:
+                    batch.append(row)
+                if len(batch) >= self.batch_size:
+                    self._process(batch, writer)
+                    batch = []
+                if stats.total % self.progress_every == 0:
+                    self.report(
+                        f'{stats.total} rows processed: {len(self._queued)} queued, {stats.skipped} skipped, '
+                        f'{stats.failed} errors ({stats.total / (time.perf_counter() - stats.started):,.0f} rows/s)'
+                    )
+            self._process(batch, writer)
+
+            if self._held and not stats.failed:
+                for row in self._held:
+                    self._queue(row, writer)
+            self._held = []
+
+        if writer is not None:
+            stats.imported = writer.created
+        self._queued = {}
+
+        stats.elapsed = time.perf_counter() - stats.started
+        logger.info(f"{type(self).__name__}: {stats.summary()}")
+        self.report(f'Import complete: {stats.summary()}', 'success')
+        return stats
+
+    def _process(self, batch: List[ImportRow], writer):
+        for row in self.dedupe(batch):
+            for message in row.warnings:
+                self._message(message, 'warning')
+            if row.skipped:
+                self.stats.skipped += 1
+                self._message(row.skipped, 'warning')
+            elif row.errors:
+                self.stats.failed += 1
+                for message in row.errors:
+                    self._message(message, 'error')
+            elif self.all_or_nothing:
+                self._held.append(row)
+            else:
+                self._queue(row, writer)
+
+    def _queue(self, row: ImportRow, writer):
+        if writer is None:
+            self.stats.imported += 1
+            self.report(f'Row {row.row_num}: Would create {self.describe(row.customer)}')
+            return
+        self._queued[id(row.customer)] = row
+        writer.add(row.customer)
+
+    def _flushed(self, customers, failures):
+        """Writer callback per written batch: report its conflicts and let go of its rows"""
+        for customer, errors in failures:
+            row = self._queued[id(customer)]
+            key = next(iter(errors))
+            self.stats.skipped += 1
+            self._message(self.duplicate_message(row, key, getattr(customer, key), in_file=False), 'warning')
+        for customer in customers:
+            del self._queued[id(customer)]
+
+    def _message(self, message: str, level: str):
+        (self.stats.errors if level == 'error' else self.stats.warnings).append(message)
+        self.report(message, level)
+
+    def report(self, message: str, level: str = 'info'):
+        """Pass a message to the `log` callback (level: info, warning, error or success)"""
+        if self.log is not None:
+            self.log(message, level)
+
+
+class ImportCommand(BaseCommand):
+    """
+    Management command running an import pipeline over a CSV file. Subclasses
+    set `pipeline_class` (or override get_pipeline) and get --file, --dry-run,
+    --workers and --batch-size
+    """
+
+    pipeline_class = None
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', type=str, required=True, help='Path to CSV file to import')
+        self.add_pipeline_arguments(parser)
+
+    def add_pipeline_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Show what would be imported without actually importing')
+        parser.add_argument('--workers', type=int, default=1, help='Processes validating rows (0 = one per CPU)')
+        parser.add_argument('--batch-size', type=int, default=WRITE_BATCH_SIZE, help='Customers per INSERT batch')
+
+    def get_pipeline(self, options) -> CustomerImportPipeline:
+        return self.pipeline_class(
+            dry_run=options['dry_run'],
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            log=self.write_log,
+        )
+
+    def write_log(self, message: str, level: str = 'info'):
+        style = {'warning': self.style.WARNING, 'error': self.style.ERROR, 'success': self.style.SUCCESS}.get(level)
+        self.stdout.write(style(message) if style else message)
+
+    def handle(self, *args, **options):
+        file_path = options['file']
+        if not os.path.exists(file_path):
+            raise CommandError(f'File does not exist: {file_path}')
+
+        self.stdout.write(f'Starting import from: {file_path}')
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No data will be saved'))
+        self.get_pipeline(options).run(file_path)
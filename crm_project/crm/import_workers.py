@@ -0,0 +1,26 @@
+# import_workers.py - Process-pool entry points for parallel CSV row mapping and validation
+#
+# Pool workers are spawned rather than forked so they never inherit the parent's
+# open database connections. A spawned interpreter starts without Django set up,
+# which is why this module must not import models at the top: unpickling the
+# worker functions imports it before init_worker() has run django.setup().
+from importlib import import_module
+
+_pipeline = None
+
+
+def init_worker(pipeline_path, kwargs):
+    """Pool initializer: set up Django and build one pipeline per worker process"""
+    global _pipeline
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    module_name, class_name = pipeline_path.rsplit('.', 1)
+    _pipeline = getattr(import_module(module_name), class_name)(**kwargs)
+
+
+def prepare_chunk(rows):
+    """Map and validate a shard of (row_num, row) pairs; results come back in row order"""
+    return [_pipeline.prepare_row(row_num, row) for row_num, row in rows]
@@ -0,0 +1,357 @@
+# importers.py - Customer CSV importers for the management commands, built on the import pipeline
+import re
+from typing import Any, Dict, Optional
+
+from .import_pipeline import CustomerImportPipeline, SkipRow, clean_field, country_code
+
+YOUTUBE_KEYWORDS = [
+    'channel', 'tv', 'media', 'studio', 'productions', 'creative',
+    'content', 'digital', 'video', 'creator', 'vlog',
+]
+
+
+def compact(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop empty values so the model defaults apply to them"""
+    return {key: value for key, value in data.items() if value not in (None, '')}
+
+
+def clean_url(value) -> str:
+    url = clean_field(value)
+    if url and not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+def first_of(row: Dict[str, str], *columns: str) -> str:
+    """Value of the first non-empty column"""
+    for column in columns:
+        value = clean_field(row.get(column))
+        if value:
+            return value
+    return ''
+
+
+class FullExportImport(CustomerImportPipeline):
+    """The CRM's own comprehensive customer export (import_customers_csv --format full)"""
+
+    id_column = 'ID'
+
+    CUSTOMER_TYPES = {
+        'corporare client': 'corporate',  # Note: typo in original data
+        'corporate client': 'corporate',
+        'individual learner': 'individual',
+        'student': 'student',
+        'instructor': 'instructor',
+        'youtuber': 'youtuber',
+    }
+    STATUSES = {'prospect', 'active', 'inactive', 'alumni'}
+    COMMUNICATION_METHODS = {'email', 'phone', 'whatsapp', 'wechat', 'sms'}
+
+    COLUMNS = {
+        'first_name': 'First Name',
+        'middle_name': 'Middle Name',
+        'last_name': 'Last Name',
+        'preferred_name': 'Preferred Name',
+        'other_names': 'Other Names',
+        'email_primary': 'Primary Email',
+        'email_secondary': 'Secondary Email',
+        'phone_primary': 'Primary Phone',
+        'phone_primary_country_code': 'Primary Phone Country Code',
+        'phone_secondary': 'Secondary Phone',
+        'phone_secondary_country_code': 'Secondary Phone Country Code',
+        'whatsapp_number': 'WhatsApp Number',
+        'whatsapp_country_code': 'WhatsApp Country Code',
+        'fax': 'Fax',
+        'fax_country_code': 'Fax Country Code',
+        'wechat_id': 'WeChat ID',
+        'company_primary': 'Primary Company',
+        'position_primary': 'Primary Position',
+        'company_secondary': 'Secondary Company',
+        'position_secondary': 'Secondary Position',
+        'company_website': 'Company Website',
+        'address_primary': 'Primary Address',
+        'address_secondary': 'Secondary Address',
+        'linkedin_profile': 'LinkedIn Profile',
+        'facebook_profile': 'Facebook Profile',
+        'twitter_handle': 'Twitter Handle',
+        'instagram_handle': 'Instagram Handle',
+        'preferred_learning_format': 'Preferred Learning Format',
+        'interests': 'Interests',
+    }
+
+    def map_row(self, row):
+        data = {name: clean_field(row.get(column)) for name, column in self.COLUMNS.items()}
+        status = clean_field(row.get('Status')).lower()
+        method = clean_field(row.get('Preferred Communication Method')).lower()
+        data.update(
+            country_region=country_code(row.get('Country/Region')),
+            customer_type=self.CUSTOMER_TYPES.get(clean_field(row.get('Customer Type')).lower(), 'individual'),
+            status=status if status in self.STATUSES else 'prospect',
+            preferred_communication_method=method if method in self.COMMUNICATION_METHODS else 'email',
+        )
+        return compact(data)
+
+
+class MasterListImport(CustomerImportPipeline):
+    """The simple master eDM list format (import_customers_csv --format simple)"""
+
+    def map_row(self, row):
+        first_name = clean_field(row.get('first_name'))
+        last_name = clean_field(row.get('last_name'))
+
+        # If last_name is duplicated in the "first_name" field, keep just the first name part
+        if last_name and first_name and last_name in first_name:
+            parts = first_name.split()
+            if len(parts) > 1:
+                first_name = parts[0]
+
+        if not first_name and not last_name:
+            raise SkipRow('no name provided')
+        # If only one name provided, put it in first_name
+        if not first_name:
+            first_name, last_name = last_name, ''
+
+        email = clean_field(row.get('primary_email'))
+        if not email:
+            raise SkipRow('no email address')
+
+        return compact({
+            'first_name': first_name,
+            'last_name': last_name,
+            'email_primary': email,
+            'company_primary': clean_field(row.get('company_primary')),
+            'customer_type': 'corporate',  # Default based on data
+            'status': 'prospect',
+            'preferred_communication_method': 'email',
+            'referral_source': clean_field(row.get('referral_source')),
+        })
+
+
+class CleanImport(CustomerImportPipeline):
+    """
+    Loosely formatted contact lists (clean_import_csv): names are split and
+    cleaned, multi-email cells reduced to the first valid address, and
+    channel-like companies imported as YouTube creators. A customer with the
+    same name counts as a duplicate
+    """
+
+    match_names = True
+
+    YOUTUBE_INDICATORS = YOUTUBE_KEYWORDS + ['youtuber']
+
+    def map_row(self, row):
+        company = first_of(row, 'company_primary', 'company')
+        email = self.clean_email(first_of(row, 'primary_email', 'email'))
+        first_name_raw = first_of(row, 'first_name', 'first')
+        last_name_raw = first_of(row, 'last_name', 'last')
+        referral_source = clean_field(row.get('referral_source'))
+
+        if not email or not (first_name_raw or last_name_raw):
+            raise SkipRow('insufficient data')
+
+        first_name, last_name = self.clean_names(first_name_raw, last_name_raw)
+        first_name = first_name or 'Unknown'
+        last_name = last_name or 'Contact'
+        customer_type = self.determine_customer_type(company)
+
+        data = {
+            'first_name': first_name[:50],  # Ensure field length limits
+            'last_name': last_name[:50],
+            'email_primary': email.lower(),
+            'company_primary': company[:100] if company else f"{first_name} {last_name} Company",
+            'customer_type': customer_type,
+            'status': 'prospect',
+            'preferred_communication_method': 'email',
+            'referral_source': referral_source or 'csv_import',
+        }
+
+        if customer_type == 'youtuber':
+            youtube_handle = self.extract_youtube_handle(company, first_name, last_name)
+            if youtube_handle:
+                data.update(
+                    youtube_handle=youtube_handle,
+                    youtube_channel_url=f"https://youtube.com/@{youtube_handle}",
+                    position_primary='Content Creator',
+                    interests='Content Creation, Video Production',
+                )
+        return data
+
+    def clean_names(self, first_name_raw: str, last_name_raw: str):
+        """Split a full name given as the first name and strip stray characters"""
+        if first_name_raw and (' ' in first_name_raw) and (not last_name_raw or last_name_raw in first_name_raw):
+            name_parts = first_name_raw.split()
+            first_name = name_parts[0]
+            last_name = ' '.join(name_parts[1:]) if len(name_parts) > 1 else last_name_raw
+        else:
+            first_name, last_name = first_name_raw, last_name_raw
+
+        first_name = re.sub(r'[^a-zA-Z\s\'-]', '', first_name).strip() if first_name else ""
+        last_name = re.sub(r'[^a-zA-Z\s\'-]', '', last_name).strip() if last_name else ""
+
+        # Handle cases where names are duplicated
+        if first_name and last_name and first_name.lower() in last_name.lower():
+            if last_name.lower().startswith(first_name.lower()):
+                last_name = last_name[len(first_name):].strip()
+            elif last_name.lower().endswith(first_name.lower()):
+                last_name = last_name[:-len(first_name)].strip()
+
+        return first_name, last_name
+
+    def determine_customer_type(self, company: str) -> str:
+        if company and any(indicator in company.lower() for indicator in self.YOUTUBE_INDICATORS):
+            return 'youtuber'
+        return 'individual'
+
+    def clean_email(self, email_raw: str) -> Optional[str]:
+        """First plausible address of a cell that may hold several"""
+        for email in re.split(r'[\s,;]+', email_raw):
+            if len(email) >= 5 and re.match(r'^[^@]+@[^@]+\.[^@]+$', email):
+                return email
+        return None
+
+    def extract_youtube_handle(self, company: str, first_name: str, last_name: str) -> Optional[str]:
+        # Use the company name as handle if it looks like one
+        if company and ' ' not in company and len(company) > 3:
+            handle = re.sub(r'[^a-zA-Z0-9_]', '', company)
+            if len(handle) > 2:
+                return handle
+
+        handle = re.sub(r'[^a-zA-Z0-9_]', '', f"{first_name}{last_name}")
+        return handle if len(handle) > 2 else None
+
+
+class CountryMappedImport(CustomerImportPipeline):
+    """
+    Lead exports with country names rather than codes (import_with_country_fix):
+    names, codes and common aliases are mapped onto COUNTRY_CHOICES
+    """
+
+    def map_row(self, row):
+        country_raw = clean_field(row.get('country_region'))
+        country = country_code(country_raw)
+        if country_raw and not country:
+            self.warn(f"Unknown country '{country_raw}', left empty")
+
+        return compact({
+            'first_name': clean_field(row.get('first_name')),
+            'last_name': clean_field(row.get('last_name')),
+            'email_primary': clean_field(row.get('email_primary')),
+            'email_secondary': clean_field(row.get('email_secondary')),
+            'phone_primary': clean_field(row.get('phone_primary')),
+            'phone_secondary': clean_field(row.get('phone_secondary')),
+            'company_primary': clean_field(row.get('company_name')),
+            'position_primary': clean_field(row.get('job_title')),
+            'profession': clean_field(row.get('industry')),
+            'customer_type': clean_field(row.get('customer_type')) or 'corporate',
+            'status': clean_field(row.get('lead_status')) or 'prospect',
+            'source': clean_field(row.get('source')) or 'import',
+            'country_region': country,
+            'address_primary': clean_field(row.get('address_line1')),
+            'address_secondary': clean_field(row.get('address_line2')),
+            'city': clean_field(row.get('city')),
+            'state_province': clean_field(row.get('state_province')),
+            'postal_code': clean_field(row.get('postal_code')),
+            'company_website': clean_url(row.get('website')),
+            'internal_notes': clean_field(row.get('notes')),
+            'youtube_handle': clean_field(row.get('youtube_handle')),
+            'instagram_handle': clean_field(row.get('instagram_handle')),
+            'twitter_handle': clean_field(row.get('twitter_handle')),
+            'facebook_profile': clean_url(row.get('facebook_page')),
+            'linkedin_profile': clean_url(row.get('linkedin_profile')),
+        })
+
+
+class YouTubeCreatorImport(CustomerImportPipeline):
+    """
+    YouTube creators from contact lists that often have only a name and a
+    channel (import_youtube_creators). Rows that do not look like a creator
+    are ignored; a creator with the same name counts as a duplicate
+    """
+
+    match_names = True
+
+    def name_queryset(self):
+        return super().name_queryset().filter(customer_type='youtuber')
+
+    def map_row(self, row):
+        indicators = self.detect_youtube_creator(row)
+        if not indicators:
+            return None  # Not a YouTube entry
+        youtube_handle = self.extract_youtube_handle(row, indicators)
+        if not youtube_handle:
+            return None
+        return compact(self.build_customer_data(row, youtube_handle))
+
+    def detect_youtube_creator(self, row):
+        """(indicator, value) pairs suggesting the row is a YouTube creator"""
+        indicators = []
+
+        company = first_of(row, 'company_primary', 'company')
+        if company:
+            if any(keyword in company.lower() for keyword in YOUTUBE_KEYWORDS):
+                indicators.append(('company_channel', company))
+
+            # Look for @handle patterns
+            if company.startswith('@') or re.match(r'^[a-zA-Z0-9_.-]+$', company):
+                if len(company) > 3 and '@' not in company[1:]:  # Not an email
+                    indicators.append(('handle_pattern', company))
+
+        # Missing email but has a name is common for YouTube entries
+        email = first_of(row, 'primary_email', 'email')
+        if len(email) < 5 and (first_of(row, 'first_name', 'first') or first_of(row, 'last_name', 'last')):
+            indicators.append(('no_email_has_name', True))
+
+        if company and '.' not in company and ' ' not in company and len(company) > 3:
+            indicators.append(('possible_handle', company))
+
+        return indicators
+
+    def extract_youtube_handle(self, row, indicators) -> Optional[str]:
+        for indicator_type, value in indicators:
+            if indicator_type in ['handle_pattern', 'possible_handle']:
+                handle = str(value).strip().lstrip('@')
+                if len(handle) > 2 and handle.replace('_', '').replace('-', '').isalnum():
+                    return handle
+
+            elif indicator_type == 'company_channel':
+                handle = re.sub(r'[^a-zA-Z0-9_]', '', str(value).replace(' ', ''))
+                if len(handle) > 3:
+                    return handle
+
+        # Fallback: construct from the name
+        handle = f"{first_of(row, 'first_name', 'first')}{first_of(row, 'last_name', 'last')}".replace(' ', '')
+        return handle if len(handle) > 2 else None
+
+    def build_customer_data(self, row, youtube_handle: str) -> Dict[str, Any]:
+        first_name = first_of(row, 'first_name', 'first')
+        last_name = first_of(row, 'last_name', 'last')
+        email = first_of(row, 'primary_email', 'email')
+        company = first_of(row, 'company_primary', 'company')
+
+        # If no proper names, generate them from the CamelCase or underscore handle
+        if not first_name and not last_name:
+            name_parts = re.findall(r'[A-Z][a-z]*|[a-z]+', youtube_handle)
+            if name_parts:
+                first_name = name_parts[0]
+                last_name = ' '.join(name_parts[1:]) if len(name_parts) > 1 else 'Creator'
+            else:
+                first_name, last_name = youtube_handle.title(), 'Creator'
+        elif not first_name:
+            first_name = youtube_handle.title()
+        elif not last_name:
+            last_name = 'Creator'
+
+        return {
+            'first_name': first_name,
+            'last_name': last_name,
+            'email_primary': email if len(email) > 5 else None,
+            'customer_type': 'youtuber',
+            'status': 'prospect',
+            'youtube_handle': youtube_handle,
+            'youtube_channel_url': f"https://youtube.com/@{youtube_handle}",
+            'company_primary': company if company and company != youtube_handle else f"{first_name} {last_name} Channel",
+            'position_primary': 'Content Creator',
+            'preferred_communication_method': 'email' if email else 'whatsapp',
+            'referral_source': clean_field(row.get('referral_source')) or 'csv_import',
+            'interests': 'Content Creation, Video Production',
+        }
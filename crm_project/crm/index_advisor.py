@@ -0,0 +1,609 @@
+# index_advisor.py - Index proposals from observed query shapes, and unused-index detection
+import hashlib
+import logging
+import re
+from dataclasses import dataclass, field
+from functools import reduce
+from operator import and_
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection as default_connection, models
+from django.db.models import F, Q
+from django.db.models.functions import Lower, Upper
+
+from .query_budget import fingerprint_param
+
+logger = logging.getLogger('crm.performance')
+
+# Record sampled request query shapes (see QueryBudgetMixin) for the advisor
+CAPTURE = getattr(settings, 'INDEX_ADVISOR_CAPTURE', False)
+SHAPES_KEY = 'crm:index_advisor:shapes'
+CAPTURE_TTL = 7 * 24 * 3600
+MAX_SHAPES = 500
+MAX_PARAM_SAMPLES = 5
+# Covering (INCLUDE) columns are only proposed for narrow selects
+MAX_INCLUDE = 4
+APP_LABEL = 'crm'
+
+_CLAUSE_ENDS = (' ORDER BY ', ' GROUP BY ', ' HAVING ', ' LIMIT ', ' OFFSET ', ' FOR UPDATE')
+_FUNCTIONS = {'UPPER': Upper, 'LOWER': Lower}
+
+
+@dataclass
+class QueryShape:
+    """A normalised SELECT with how often it ran and, when captured in-process, sample parameter fingerprints"""
+    sql: str
+    calls: int
+    total_ms: float = 0.0
+    param_samples: List[tuple] = field(default_factory=list)
+    source: str = 'captured'
+
+
+# Query capture ---------------------------------------------------------------
+
+def is_candidate(sql: str) -> bool:
+    return sql.lstrip().upper().startswith('SELECT') and f'"{APP_LABEL}_' in sql
+
+
+def record_shapes(inspector):
+    """
+    Merge one request's queries (a QueryInspector with params kept) into the captured set.
+    Parameters arrive as fingerprints (see fingerprint_param), so no value
+    passed to a query is written to the cache.
+
+    Best effort: concurrent merges can drop a few counts, which doesn't
+    change which shapes dominate.
+    """
+    try:
+        shapes = cache.get(SHAPES_KEY) or {}
+        for (shape, _), count in inspector.shapes.items():
+            if not is_candidate(shape):
+                continue
+            entry = shapes.setdefault(shape, {'calls': 0, 'params': []})
+            entry['calls'] += count
+            params = inspector.params.get(shape)
+            if params is not None:
+                entry['params'] = (entry['params'] + [tuple(params)])[-MAX_PARAM_SAMPLES:]
+        if len(shapes) > MAX_SHAPES:
+            kept = sorted(shapes.items(), key=lambda item: item[1]['calls'], reverse=True)[:MAX_SHAPES]
+            shapes = dict(kept)
+        cache.set(SHAPES_KEY, shapes, CAPTURE_TTL)
+    except Exception as e:
+        logger.warning(f"Index advisor capture failed: {e}")
+
+
+def captured_shapes() -> List[QueryShape]:
+    return [
+        QueryShape(sql=sql, calls=entry['calls'], param_samples=list(entry['params']))
+        for sql, entry in (cache.get(SHAPES_KEY) or {}).items()
+    ]
+
+
+def clear_captured():
+    cache.delete(SHAPES_KEY)
+
+
+def pg_stat_statement_shapes(connection=None, limit: int = 500) -> List[QueryShape]:
+    """Top crm SELECTs from pg_stat_statements ($n placeholders become %s; no parameter values)"""
+    connection = connection or default_connection
+    if connection.vendor != 'postgresql':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements')")
+        if not cursor.fetchone()[0]:
+            return []
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = 'pg_stat_statements' AND column_name IN ('total_exec_time', 'total_time')"
+        )
+        time_column = 'total_exec_time' if 'total_exec_time' in {row[0] for row in cursor.fetchall()} else 'total_time'
+        cursor.execute(
+            f"SELECT query, calls, {time_column} FROM pg_stat_statements "
+            f"WHERE query ILIKE 'select%%' AND query LIKE %s ORDER BY {time_column} DESC LIMIT %s",
+            [f'%"{APP_LABEL}\\_%', limit],
+        )
+        rows = cursor.fetchall()
+    return [
+        QueryShape(sql=re.sub(r'\$\d+', '%s', query), calls=calls, total_ms=total_ms or 0.0, source='pg_stat_statements')
+        for query, calls, total_ms in rows
+    ]
+
+
+# SQL parsing -----------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Predicate:
+    kind: str                      # 'eq', 'range', 'expr' or 'const'
+    column: str
+    function: Optional[str] = None  # UPPER/LOWER for 'expr'
+    condition: Optional[Q] = None   # for 'const'
+
+
+@dataclass
+class ParsedQuery:
+    model: Any
+    predicates: List[Predicate]
+    order_by: List[str]
+    selected: Optional[List[str]]  # None when the select list has expressions
+
+
+def _top_level_split(text: str, separator: str) -> List[Tuple[int, str]]:
+    """(offset, part) pieces of `text` split on `separator` outside parentheses and quotes"""
+    parts, depth, start, index, quote = [], 0, 0, 0, None
+    while index < len(text):
+        char = text[index]
+        if quote:
+            quote = None if char == quote else quote
+        elif char in '\'"':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0 and text.startswith(separator, index):
+            parts.append((start, text[start:index]))
+            index += len(separator)
+            start = index
+            continue
+        index += 1
+    parts.append((start, text[start:]))
+    return parts
+
+
+def _top_level_find(text: str, needle: str, start: int = 0) -> int:
+    pieces = _top_level_split(text[start:], needle)
+    return start + pieces[1][0] - len(needle) if len(pieces) > 1 else -1
+
+
+def _closing_paren(text: str, start: int) -> int:
+    depth, quote = 0, None
+    for index in range(start, len(text)):
+        char = text[index]
+        if quote:
+            quote = None if char == quote else quote
+        elif char in '\'"':
+            quote = char
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return index
+    return -1
+
+
+def _strip_parens(offset: int, text: str) -> Tuple[int, str]:
+    """Drop parentheses wrapping the whole of `text`"""
+    while text.startswith('(') and _closing_paren(text, 0) == len(text) - 1:
+        offset, text = offset + 1, text[1:-1]
+    return offset, text
+
+
+def _conjuncts(offset: int, text: str) -> List[Tuple[int, str]]:
+    """Top-level AND terms (OR groups are left whole)"""
+    offset, text = _strip_parens(offset, text.strip())
+    pieces = _top_level_split(text, ' AND ')
+    if len(pieces) == 1:
+        return [(offset, text)]
+    terms = []
+    for piece_offset, piece in pieces:
+        terms.extend(_conjuncts(offset + piece_offset, piece))
+    return terms
+
+
+def _models_by_table() -> Dict[str, Any]:
+    return {model._meta.db_table: model for model in apps.get_app_config(APP_LABEL).get_models()}
+
+
+def _field_names(model) -> Dict[str, str]:
+    return {f.column: f.name for f in model._meta.concrete_fields}
+
+
+def _constant(shape: QueryShape, param_index: int, field):
+    """
+    (True, value) when every sampled call passed the same value at this
+    position. Only fingerprints are captured, so the value is recovered from
+    the field's own constants (choices, booleans, blank); any other repeated
+    value is treated as varying
+    """
+    samples = [params for params in shape.param_samples if len(params) > param_index]
+    digests = {params[param_index][0] for params in samples}
+    if len(samples) < 2 or len(digests) != 1:
+        return False, None
+    candidates = [value for value, _ in field.flatchoices] + [True, False, '']
+    digest = digests.pop()
+    for value in candidates:
+        if fingerprint_param(field.get_db_prep_value(value, default_connection))[0] == digest:
+            return True, value
+    return False, None
+
+
+def parse_shape(shape: QueryShape) -> Optional[ParsedQuery]:
+    """Predicates on the main table of a Django-style SELECT, or None when it isn't one"""
+    sql = shape.sql.strip()
+    from_at = _top_level_find(sql, ' FROM ')
+    if not sql.upper().startswith('SELECT ') or from_at < 0:
+        return None
+    table_match = re.match(r'\s*FROM "(\w+)"', sql[from_at:])
+    model = _models_by_table().get(table_match.group(1)) if table_match else None
+    if model is None:
+        return None
+    table = model._meta.db_table
+    columns = _field_names(model)
+    column = rf'"{re.escape(table)}"\."(\w+)"'
+
+    selected = []
+    for _, item in _top_level_split(sql[len('SELECT '):from_at], ', '):
+        match = re.fullmatch(column, item.strip())
+        if not match or match.group(1) not in columns:
+            selected = None
+            break
+        selected.append(columns[match.group(1)])
+
+    where_at = _top_level_find(sql, ' WHERE ', from_at)
+    clause_end = min([at for at in (_top_level_find(sql, end, from_at) for end in _CLAUSE_ENDS) if at >= 0] or [len(sql)])
+    predicates = []
+    if 0 <= where_at < clause_end:
+        where_start = where_at + len(' WHERE ')
+        for offset, term in _conjuncts(where_start, sql[where_start:clause_end]):
+            predicate = _classify(term, column, model, shape, sql[:offset].count('%s'))
+            if predicate is not None:
+                predicates.append(predicate)
+
+    order_by = []
+    order_at = _top_level_find(sql, ' ORDER BY ', from_at)
+    if order_at >= 0:
+        order_end = min([at for at in (_top_level_find(sql, end, order_at) for end in (' LIMIT ', ' OFFSET ', ' FOR UPDATE')) if at >= 0] or [len(sql)])
+        for _, item in _top_level_split(sql[order_at + len(' ORDER BY '):order_end], ', '):
+            match = re.fullmatch(column + r'(?: (ASC|DESC))?', item.strip())
+            if not match or match.group(1) not in columns:
+                break
+            order_by.append(('-' if match.group(2) == 'DESC' else '') + columns[match.group(1)])
+    return ParsedQuery(model=model, predicates=predicates, order_by=order_by, selected=selected)
+
+
+def _classify(term: str, column: str, model, shape: QueryShape, param_index: int) -> Optional[Predicate]:
+    term = term.strip()
+    columns = _field_names(model)
+    patterns = (
+        (rf'(UPPER|LOWER)\({column}(?:::text)?\) (?:= (?:UPPER|LOWER)\(%s\)|IN \(.*\))', 'expr'),
+        (rf'{column} = %s', 'eq'),
+        (rf'{column} IN \(.*\)', 'in'),
+        (rf'{column} (?:<|<=|>|>=) %s', 'range'),
+        (rf'{column} LIKE %s ESCAPE .*', 'like'),
+        (rf'NOT \({column} = %s(?: AND {column} IS NOT NULL)?\)', 'ne'),
+        (rf'NOT {column}', 'false'),
+        (rf'{column} IS (NOT )?NULL', 'null'),
+        (column, 'true'),
+    )
+    for pattern, kind in patterns:
+        match = re.fullmatch(pattern, term)
+        if not match:
+            continue
+        if kind == 'expr':
+            function, db_column = match.group(1), match.group(2)
+        else:
+            db_column = match.group(1)
+        name = columns.get(db_column)
+        if name is None:
+            return None
+
+        if kind == 'expr':
+            return Predicate('expr', name, function=function)
+        if kind == 'in':
+            return Predicate('eq', name)
+        if kind == 'range':
+            return Predicate('range', name)
+        if kind == 'like':
+            # iexact on SQLite: LIKE without wildcards; PostgreSQL compares UPPER() for the same lookup
+            samples = [params[param_index] for params in shape.param_samples if len(params) > param_index]
+            if samples and not any(wildcard for _, wildcard in samples):
+                return Predicate('expr', name, function='UPPER')
+            return None
+        if kind == 'true':
+            return Predicate('const', name, condition=Q(**{name: True}))
+        if kind == 'false':
+            return Predicate('const', name, condition=Q(**{name: False}))
+        if kind == 'null':
+            return Predicate('const', name, condition=Q(**{f'{name}__isnull': 'NOT' not in term}))
+        constant, value = _constant(shape, param_index, model._meta.get_field(name))
+        if kind == 'ne':
+            return Predicate('const', name, condition=~Q(**{name: value})) if constant else None
+        if constant:
+            return Predicate('const', name, condition=Q(**{name: value}))
+        return Predicate('eq', name)
+    return None
+
+
+# Proposals -------------------------------------------------------------------
+
+@dataclass
+class IndexProposal:
+    model: Any
+    fields: Tuple[str, ...] = ()
+    expressions: Tuple[Tuple[str, str], ...] = ()  # (function, field)
+    condition: Optional[Q] = None
+    include: Tuple[str, ...] = ()
+    calls: int = 0
+    total_ms: float = 0.0
+    examples: List[str] = field(default_factory=list)
+
+    @property
+    def key(self):
+        return (self.model, self.fields, self.expressions, repr(self.condition), self.include)
+
+    @property
+    def kind(self) -> str:
+        kinds = []
+        if self.expressions:
+            kinds.append('expression')
+        if self.condition is not None:
+            kinds.append('partial')
+        if self.include:
+            kinds.append('covering')
+        if kinds:
+            return '+'.join(kinds)
+        return 'composite' if len(self.fields) > 1 else 'single-column'
+
+    @property
+    def name(self) -> str:
+        """Stable 30-character name derived from the index definition"""
+        digest = hashlib.md5(repr(self.key[1:]).encode()).hexdigest()[:6]
+        hint = (self.expressions[0][1] if self.expressions else self.fields[0].lstrip('-'))[:10]
+        return f"{self.model._meta.model_name[:10]}_{hint}_{digest}"
+
+    def index(self) -> models.Index:
+        options = {'name': self.name}
+        if self.condition is not None:
+            options['condition'] = self.condition
+        if self.expressions:
+            keys = [_FUNCTIONS[function](column) for function, column in self.expressions]
+            keys += [F(key[1:]).desc() if key.startswith('-') else F(key) for key in self.fields]
+            return models.Index(*keys, **options)
+        if self.include:
+            options['include'] = list(self.include)
+        return models.Index(fields=list(self.fields), **options)
+
+    def as_code(self) -> str:
+        from django.db.migrations.writer import MigrationWriter
+        return MigrationWriter.serialize(self.index())[0]
+
+
+def _proposal_for(parsed: ParsedQuery, shape: QueryShape) -> Optional[IndexProposal]:
+    predicates = parsed.predicates
+    if not predicates:
+        return None
+    eq = [p.column for p in predicates if p.kind == 'eq']
+    ranges = [p.column for p in predicates if p.kind == 'range']
+    expressions = tuple(dict.fromkeys((p.function, p.column) for p in predicates if p.kind == 'expr'))
+    constants = [p.condition for p in predicates if p.kind == 'const']
+
+    keys = list(dict.fromkeys(eq))
+    if ranges:
+        keys.append(ranges[0])
+    elif parsed.order_by and not expressions and parsed.order_by[0].lstrip('-') not in keys:
+        # Expression lookups are near-unique (case-insensitive email/handle matches), so no sort key
+        keys.append(parsed.order_by[0])
+    if not keys and not expressions:
+        # Only constant predicates: key the partial index on the ordering (or the primary key)
+        ordering = parsed.order_by or list(parsed.model._meta.ordering) or [parsed.model._meta.pk.name]
+        keys = [ordering[0]]
+
+    include = ()
+    if parsed.selected and not expressions:
+        extra = [name for name in parsed.selected if name not in {key.lstrip('-') for key in keys}]
+        if 0 < len(extra) <= MAX_INCLUDE:
+            include = tuple(extra)
+
+    return IndexProposal(
+        model=parsed.model,
+        fields=tuple(keys),
+        expressions=expressions,
+        condition=reduce(and_, constants) if constants else None,
+        include=include,
+    )
+
+
+def _existing_indexes(model) -> List[Dict[str, Any]]:
+    """Key columns, expressions and condition of every index Django knows about on `model`"""
+    existing = []
+    for index in model._meta.indexes:
+        existing.append({
+            'fields': tuple(name.lstrip('-') for name in index.fields),
+            'expressions': tuple(repr(expression) for expression in index.expressions),
+            'condition': repr(index.condition) if index.condition is not None else None,
+        })
+    for constraint in model._meta.constraints:
+        if isinstance(constraint, models.UniqueConstraint):
+            existing.append({
+                'fields': tuple(constraint.fields),
+                'expressions': tuple(repr(expression) for expression in constraint.expressions),
+                'condition': repr(constraint.condition) if constraint.condition is not None else None,
+            })
+    for fields in model._meta.unique_together:
+        existing.append({'fields': tuple(fields), 'expressions': (), 'condition': None})
+    for model_field in model._meta.concrete_fields:
+        if model_field.primary_key or model_field.unique or model_field.db_index:
+            existing.append({'fields': (model_field.name,), 'expressions': (), 'condition': None})
+    return existing
+
+
+def is_served(proposal: IndexProposal) -> bool:
+    """Whether an existing index already leads with the proposal's keys (same expressions and condition)"""
+    index = proposal.index()
+    expressions = tuple(repr(expression) for expression in index.expressions)
+    condition = repr(proposal.condition) if proposal.condition is not None else None
+    keys = {name.lstrip('-') for name in proposal.fields}
+    for existing in _existing_indexes(proposal.model):
+        if existing['condition'] != condition:
+            continue
+        if expressions:
+            if existing['expressions'][:len(expressions)] == expressions:
+                return True
+            continue
+        if not existing['expressions'] and set(existing['fields'][:len(keys)]) == keys and not proposal.include:
+            return True
+    return False
+
+
+def propose_indexes(shapes: Sequence[QueryShape], min_calls: int = 10) -> List[IndexProposal]:
+    """Index proposals for the shapes' predicates that no existing index serves, busiest first"""
+    proposals: Dict[tuple, IndexProposal] = {}
+    for shape in shapes:
+        parsed = parse_shape(shape)
+        if parsed is None:
+            continue
+        proposal = _proposal_for(parsed, shape)
+        if proposal is None:
+            continue
+        merged = proposals.setdefault(proposal.key, proposal)
+        merged.calls += shape.calls
+        merged.total_ms += shape.total_ms
+        if len(merged.examples) < 3:
+            merged.examples.append(shape.sql)
+    selected = [p for p in proposals.values() if p.calls >= min_calls and not is_served(p)]
+    return sorted(selected, key=lambda p: (p.total_ms, p.calls), reverse=True)
+
+
+# Unused indexes --------------------------------------------------------------
+
+@dataclass
+class UnusedIndex:
+    table: str
+    name: str
+    size_bytes: int
+    model: Any = None
+    declared: bool = False  # in Meta.indexes, so a RemoveIndex migration can drop it
+
+
+def unused_indexes(connection=None) -> List[UnusedIndex]:
+    """Non-unique crm indexes with no scans since statistics were last reset (PostgreSQL only)"""
+    connection = connection or default_connection
+    if connection.vendor != 'postgresql':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT s.relname, s.indexrelname, pg_relation_size(s.indexrelid)
+            FROM pg_stat_user_indexes s
+            JOIN pg_index i ON i.indexrelid = s.indexrelid
+            WHERE s.schemaname = current_schema()
+            AND s.relname LIKE %s
+            AND s.idx_scan = 0
+            AND NOT i.indisunique
+            AND NOT i.indisprimary
+            ORDER BY pg_relation_size(s.indexrelid) DESC
+        """, [f'{APP_LABEL}\\_%'])
+        rows = cursor.fetchall()
+    models_by_table = _models_by_table()
+    unused = []
+    for table, name, size in rows:
+        model = models_by_table.get(table)
+        declared = model is not None and any(index.name == name for index in model._meta.indexes)
+        unused.append(UnusedIndex(table=table, name=name, size_bytes=size, model=model, declared=declared))
+    return unused
+
+
+# Report and migration --------------------------------------------------------
+
+@dataclass
+class Advice:
+    proposals: List[IndexProposal]
+    unused: List[UnusedIndex]
+    shapes: int
+    sources: List[str]
+
+
+def advise(source: str = 'auto', min_calls: int = 10, connection=None) -> Advice:
+    """Proposals from captured shapes and/or pg_stat_statements, plus unused indexes"""
+    shapes, sources = [], []
+    if source in ('auto', 'captured'):
+        captured = captured_shapes()
+        if captured or source == 'captured':
+            shapes += captured
+            sources.append('captured')
+    if source in ('auto', 'pg_stat_statements'):
+        statements = pg_stat_statement_shapes(connection)
+        if statements or source == 'pg_stat_statements':
+            shapes += statements
+            sources.append('pg_stat_statements')
+    return Advice(
+        proposals=propose_indexes(shapes, min_calls=min_calls),
+        unused=unused_indexes(connection),
+        shapes=len(shapes),
+        sources=sources,
+    )
+
+
+def write_report(stdout, style, advice: Advice):
+    """Print an Advice from a management command"""
+    stdout.write(f"Analysed {advice.shapes} query shapes from: {', '.join(advice.sources) or 'no source'}")
+    if not advice.sources:
+        stdout.write(style.WARNING(
+            '  Enable pg_stat_statements or set INDEX_ADVISOR_CAPTURE=True to record sampled request queries'
+        ))
+
+    stdout.write('\nPROPOSED INDEXES:')
+    if not advice.proposals:
+        stdout.write('  None - existing indexes serve the observed predicates')
+    for proposal in advice.proposals:
+        timing = f", {proposal.total_ms:.0f}ms total" if proposal.total_ms else ''
+        stdout.write(style.SUCCESS(
+            f"  + {proposal.model.__name__} ({proposal.kind}, {proposal.calls} calls{timing})"
+        ))
+        stdout.write(f"    {proposal.as_code()}")
+        stdout.write(f"    e.g. {proposal.examples[0][:160]}")
+
+    stdout.write('\nUNUSED INDEXES (no scans since the last statistics reset):')
+    if not advice.unused:
+        stdout.write('  None found (or not PostgreSQL)')
+    for unused in advice.unused:
+        note = 'Meta.indexes' if unused.declared else 'not declared in Meta.indexes; drop manually if unneeded'
+        stdout.write(style.ERROR(f"  - {unused.name} on {unused.table} ({unused.size_bytes / 1024:.0f} KB, {note})"))
+
+
+def write_migration(advice: Advice, drop_unused: bool = False, concurrently: bool = False, name: str = 'index_advisor') -> Optional[str]:
+    """
+    Write a crm migration adding the proposed indexes (and dropping unused declared ones).
+
+    The matching models.Index entries still have to be added to (or removed
+    from) Meta.indexes, or makemigrations will try to undo the migration.
+    """
+    from django.db import migrations
+    from django.db.migrations.autodetector import MigrationAutodetector
+    from django.db.migrations.loader import MigrationLoader
+    from django.db.migrations.writer import MigrationWriter
+
+    operations = []
+    add_index = migrations.AddIndex
+    remove_index = migrations.RemoveIndex
+    if concurrently:
+        from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+        add_index, remove_index = AddIndexConcurrently, RemoveIndexConcurrently
+    for proposal in advice.proposals:
+        operations.append(add_index(model_name=proposal.model._meta.model_name, index=proposal.index()))
+    if drop_unused:
+        for unused in advice.unused:
+            if unused.declared:
+                operations.append(remove_index(model_name=unused.model._meta.model_name, name=unused.name))
+    if not operations:
+        return None
+
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    leaf = loader.graph.leaf_nodes(APP_LABEL)[0]
+    number = (MigrationAutodetector.parse_number(leaf[1]) or 0) + 1
+    migration = migrations.Migration(f"{number:04d}_{name}", APP_LABEL)
+    migration.dependencies = [leaf]
+    migration.operations = operations
+
+    writer = MigrationWriter(migration)
+    source = writer.as_string()
+    if concurrently:
+        # CREATE INDEX CONCURRENTLY can't run in a transaction; MigrationWriter doesn't emit `atomic`
+        header = 'class Migration(migrations.Migration):\n'
+        source = source.replace(header, header + '\n    atomic = False\n', 1)
+    with open(writer.path, 'w', encoding='utf-8') as handle:
+        handle.write(source)
+    return writer.path
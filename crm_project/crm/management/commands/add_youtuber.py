@@ -37,13 +37,13 @@ class Command(BaseCommand):
             
         except Exception as e:
             error_msg = str(e)
-            if 'already used by' in error_msg:
+            if 'YouTube handle already exists' in error_msg:
                 self.stdout.write(
                     self.style.WARNING(f'⚠️  Duplicate YouTube handle: {error_msg}')
                 )
                 # Show existing customer info
                 try:
-                    existing = Customer.objects.get(youtube_handle__iexact=youtube_handle)
+                    existing = Customer.objects.with_youtube_handle(youtube_handle).get()
                     self.stdout.write(f'   Existing customer: {existing.first_name} {existing.last_name}')
                     if existing.email_primary:
                         self.stdout.write(f'   Email: {existing.email_primary}')
@@ -27,6 +27,11 @@ class Command(BaseCommand):
             action='store_true',
             help='Show table size and statistics',
         )
+        parser.add_argument(
+            '--index-advice',
+            action='store_true',
+            help='Propose indexes for observed query shapes and list unused indexes',
+        )
         parser.add_argument(
             '--all',
             action='store_true',
@@ -34,7 +39,8 @@ class Command(BaseCommand):
         )
     
     def handle(self, *args, **options):
-        if not any([options['slow_queries'], options['index_usage'], options['table_stats'], options['all']]):
+        if not any([options['slow_queries'], options['index_usage'], options['table_stats'],
+                    options['index_advice'], options['all']]):
             options['all'] = True
         
         self.stdout.write(
@@ -51,8 +57,19 @@ class Command(BaseCommand):
         if options['all'] or options['slow_queries']:
             self.analyze_slow_queries()
         
+        if options['all'] or options['index_advice']:
+            self.analyze_index_advice()
+        
         self.provide_recommendations()
     
+    def analyze_index_advice(self):
+        """Index proposals from captured query shapes / pg_stat_statements"""
+        from crm.index_advisor import advise, write_report
+        self.stdout.write('\n' + self.style.WARNING('INDEX ADVICE'))
+        self.stdout.write('-'*50)
+        write_report(self.stdout, self.style, advise())
+        self.stdout.write('Generate a migration with: python manage.py optimize_db --advise-indexes --write-migration')
+    
     def analyze_table_stats(self):
         """Analyze table sizes and statistics"""
         self.stdout.write('\n' + self.style.WARNING('TABLE STATISTICS'))
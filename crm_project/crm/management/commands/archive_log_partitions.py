@@ -0,0 +1,83 @@
+# archive_log_partitions.py - Management command to export and drop cold log partitions
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.utils import timezone
+from crm.partitioning import PARTITIONED_TABLES, archive_partitions, ensure_partitions, supports_partitioning
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger('crm.performance')
+
+class Command(BaseCommand):
+    help = 'Archive monthly log partitions older than the retention period to compressed CSV and drop them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=settings.LOG_RETENTION_DAYS,
+            help='Archive partitions whose whole month is older than this many days',
+        )
+        parser.add_argument(
+            '--output-dir',
+            default=settings.LOG_ARCHIVE_DIR,
+            help='Directory for the <partition>.csv.gz exports',
+        )
+        parser.add_argument(
+            '--table',
+            action='append',
+            choices=sorted(PARTITIONED_TABLES),
+            help='Only archive this table (repeatable)',
+        )
+        parser.add_argument(
+            '--no-export',
+            action='store_true',
+            help='Drop cold partitions without exporting them',
+        )
+        parser.add_argument(
+            '--keep-detached',
+            action='store_true',
+            help='Detach cold partitions but keep them as standalone tables',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the partitions that would be archived',
+        )
+
+    def handle(self, *args, **options):
+        if not supports_partitioning():
+            self.stdout.write(
+                self.style.WARNING('Log partitioning requires PostgreSQL 11 or newer')
+            )
+            return
+
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        tables = options['table']
+
+        try:
+            created = ensure_partitions(tables)
+            for name in created:
+                self.stdout.write(f'Created partition {name}')
+
+            archived = archive_partitions(
+                cutoff,
+                export_dir=None if options['no_export'] else options['output_dir'],
+                drop=not options['keep_detached'],
+                tables=tables,
+                dry_run=options['dry_run'],
+            )
+        except Exception as e:
+            logger.error(f"Log partition archival failed: {e}")
+            self.stdout.write(self.style.ERROR(f'Log partition archival failed: {e}'))
+            raise
+
+        for result in archived:
+            if options['dry_run']:
+                self.stdout.write(f"Would archive {result['partition']}")
+            elif result['file']:
+                self.stdout.write(f"Archived {result['partition']}: {result['rows']} rows -> {result['file']}")
+            else:
+                self.stdout.write(f"Removed {result['partition']}")
+
+        self.stdout.write(self.style.SUCCESS(f'{len(archived)} partitions older than {cutoff:%Y-%m-%d} processed'))
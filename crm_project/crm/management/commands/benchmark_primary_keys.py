@@ -0,0 +1,178 @@
+# benchmark_primary_keys.py - Management command comparing insert/join throughput of UUIDv4, UUIDv7 and bigint keys
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from crm.ids import uuid7
+import random
+import time
+import uuid
+
+PARENT_TABLE = 'crm_pkbench_parent'
+CHILD_TABLE = 'crm_pkbench_child'
+STRATEGIES = ('uuid4', 'uuid7', 'bigint')
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark primary key strategies on scratch tables shaped like customer -> log rows: '
+        'batched insert throughput, join time and (PostgreSQL) index size'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--parents', type=int, default=20000, help='Parent rows (customers) per strategy')
+        parser.add_argument('--children-per-parent', type=int, default=5, help='Child rows (log entries) per parent')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT batch')
+        parser.add_argument('--repeat', type=int, default=3, help='Join runs per strategy (best time is reported)')
+        parser.add_argument(
+            '--strategy',
+            action='append',
+            choices=STRATEGIES,
+            help='Only benchmark this key strategy (repeatable)',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Seed for the child -> parent assignment')
+
+    def handle(self, *args, **options):
+        strategies = options['strategy'] or list(STRATEGIES)
+        self.stdout.write(
+            f"Primary key benchmark on {connection.vendor}: {options['parents']} parents, "
+            f"{options['parents'] * options['children_per_parent']} children"
+        )
+        self.stdout.write('-' * 80)
+        self.stdout.write(
+            f"{'strategy':<8} {'parents/s':>11} {'children/s':>11} {'join ms':>9} {'lookup ms':>10} {'pk index':>10} {'fk index':>10}"
+        )
+
+        for strategy in strategies:
+            result = self.run_strategy(strategy, options)
+            self.stdout.write(
+                f"{strategy:<8} {result['parent_rate']:>11,.0f} {result['child_rate']:>11,.0f} "
+                f"{result['join_ms']:>9.1f} {result['lookup_ms']:>10.1f} "
+                f"{_size(result['pk_index_bytes']):>10} {_size(result['fk_index_bytes']):>10}"
+            )
+
+    def run_strategy(self, strategy, options):
+        parents = options['parents']
+        children = parents * options['children_per_parent']
+        rng = random.Random(options['seed'])
+
+        # Keys are generated per row in insert order, as new_uuid() does on save
+        parent_keys = [self.make_key(strategy, index) for index in range(parents)]
+        child_keys = [self.make_key(strategy, index) for index in range(children)]
+        child_parents = [parent_keys[rng.randrange(parents)] for _ in range(children)]
+        lookup_keys = rng.sample(parent_keys, min(parents, 500))
+
+        self.drop_tables()
+        try:
+            self.create_tables(strategy)
+            parent_seconds = self.insert(
+                PARENT_TABLE, ('id', 'payload'),
+                ((key, 'parent') for key in parent_keys), options['batch_size']
+            )
+            child_seconds = self.insert(
+                CHILD_TABLE, ('id', 'parent_id', 'payload'),
+                zip(child_keys, child_parents, ['child'] * children), options['batch_size']
+            )
+            self.analyze()
+            join_seconds = self.best_of(options['repeat'], self.full_join)
+            lookup_seconds = self.best_of(options['repeat'], lambda: self.lookup_join(lookup_keys))
+            return {
+                'strategy': strategy,
+                'parent_rate': parents / parent_seconds if parent_seconds else 0,
+                'child_rate': children / child_seconds if child_seconds else 0,
+                'join_ms': join_seconds * 1000,
+                'lookup_ms': lookup_seconds * 1000,
+                'pk_index_bytes': self.relation_size(f'{PARENT_TABLE}_pkey'),
+                'fk_index_bytes': self.relation_size(f'{CHILD_TABLE}_parent_idx'),
+            }
+        finally:
+            self.drop_tables()
+
+    def make_key(self, strategy, index):
+        if strategy == 'bigint':
+            return index + 1
+        value = uuid7() if strategy == 'uuid7' else uuid.uuid4()
+        # Native uuid columns on PostgreSQL; char(32) hex elsewhere, like Django's UUIDField
+        return str(value) if connection.vendor == 'postgresql' else value.hex
+
+    def key_type(self, strategy):
+        if strategy == 'bigint':
+            return 'bigint'
+        return 'uuid' if connection.vendor == 'postgresql' else 'char(32)'
+
+    def create_tables(self, strategy):
+        key_type = self.key_type(strategy)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE {PARENT_TABLE} (id {key_type} NOT NULL, payload varchar(20) NOT NULL, '
+                f'CONSTRAINT {PARENT_TABLE}_pkey PRIMARY KEY (id))'
+            )
+            cursor.execute(
+                f'CREATE TABLE {CHILD_TABLE} (id {key_type} NOT NULL, parent_id {key_type} NOT NULL, '
+                f'payload varchar(20) NOT NULL, CONSTRAINT {CHILD_TABLE}_pkey PRIMARY KEY (id))'
+            )
+            cursor.execute(f'CREATE INDEX {CHILD_TABLE}_parent_idx ON {CHILD_TABLE} (parent_id)')
+
+    def drop_tables(self):
+        with connection.cursor() as cursor:
+            for table in (CHILD_TABLE, PARENT_TABLE):
+                cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+    def insert(self, table, columns, rows, batch_size):
+        """Seconds spent inserting `rows`, one transaction per executemany() batch like bulk_create"""
+        placeholders = ', '.join(['%s'] * len(columns))
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        rows = list(rows)
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                with transaction.atomic():
+                    cursor.executemany(sql, rows[start:start + batch_size])
+        return time.perf_counter() - started
+
+    def analyze(self):
+        """Fresh planner statistics so every strategy gets its best join plan"""
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            return
+        with connection.cursor() as cursor:
+            for table in (PARENT_TABLE, CHILD_TABLE):
+                cursor.execute(f'ANALYZE {table}')
+
+    def full_join(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {CHILD_TABLE} c JOIN {PARENT_TABLE} p ON p.id = c.parent_id'
+            )
+            cursor.fetchone()
+
+    def lookup_join(self, keys):
+        """Children of a sample of parents, the shape of per-customer log lookups"""
+        placeholders = ', '.join(['%s'] * len(keys))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT p.id, COUNT(*) FROM {PARENT_TABLE} p JOIN {CHILD_TABLE} c ON c.parent_id = p.id '
+                f'WHERE p.id IN ({placeholders}) GROUP BY p.id',
+                keys,
+            )
+            cursor.fetchall()
+
+    @staticmethod
+    def best_of(repeat, func):
+        timings = []
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def relation_size(self, name):
+        """Bytes used by an index (PostgreSQL only)"""
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_relation_size(%s::regclass)', [name])
+            return cursor.fetchone()[0]
+
+
+def _size(value):
+    if value is None:
+        return 'n/a'
+    return f'{value / (1024 * 1024):.1f} MB'
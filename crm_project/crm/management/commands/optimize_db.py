@@ -25,8 +25,45 @@ class Command(BaseCommand):
             action='store_true',
             help='Show slow queries and optimization suggestions',
         )
+        parser.add_argument(
+            '--advise-indexes',
+            action='store_true',
+            help='Propose expression, partial and covering indexes for observed query shapes',
+        )
+        parser.add_argument(
+            '--source',
+            choices=['auto', 'captured', 'pg_stat_statements'],
+            default='auto',
+            help='Where query shapes come from (captured: INDEX_ADVISOR_CAPTURE request sampling)',
+        )
+        parser.add_argument(
+            '--min-calls',
+            type=int,
+            default=10,
+            help='Ignore query shapes seen fewer times than this',
+        )
+        parser.add_argument(
+            '--write-migration',
+            action='store_true',
+            help='Write a crm migration adding the proposed indexes',
+        )
+        parser.add_argument(
+            '--drop-unused',
+            action='store_true',
+            help='Also remove unused indexes declared in Meta.indexes in the written migration',
+        )
+        parser.add_argument(
+            '--concurrently',
+            action='store_true',
+            help='Use AddIndexConcurrently/RemoveIndexConcurrently (PostgreSQL, non-atomic migration)',
+        )
 
     def handle(self, *args, **options):
+        if options['advise_indexes']:
+            # Captured shapes work on any backend, so this runs before the PostgreSQL check
+            self._advise_indexes(options)
+            return
+
         if 'postgresql' not in settings.DATABASES['default']['ENGINE']:
             self.stdout.write(
                 self.style.WARNING('This command is optimized for PostgreSQL databases')
@@ -65,6 +102,28 @@ class Command(BaseCommand):
                 self._show_index_usage(cursor)
                 self._show_table_stats(cursor)
 
+    def _advise_indexes(self, options):
+        """Print index proposals and optionally write them as a migration"""
+        from crm.index_advisor import advise, write_migration, write_report
+
+        advice = advise(source=options['source'], min_calls=options['min_calls'])
+        write_report(self.stdout, self.style, advice)
+        if not options['write_migration']:
+            return
+
+        path = write_migration(advice, drop_unused=options['drop_unused'], concurrently=options['concurrently'])
+        if path is None:
+            self.stdout.write('\nNothing to migrate')
+            return
+        self.stdout.write(self.style.SUCCESS(f'\nWrote {path}'))
+        self.stdout.write('Add these to the models\' Meta.indexes so makemigrations stays clean:')
+        for proposal in advice.proposals:
+            self.stdout.write(f'  {proposal.model.__name__}: {proposal.as_code()},')
+        if options['drop_unused']:
+            for unused in advice.unused:
+                if unused.declared:
+                    self.stdout.write(f'  {unused.model.__name__}: remove {unused.name!r}')
+
     def _show_query_performance(self, cursor):
         """Show slow queries and performance statistics"""
         try:
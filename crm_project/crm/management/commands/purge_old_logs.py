@@ -0,0 +1,80 @@
+# purge_old_logs.py - Management command for batched retention deletes on log tables
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.utils import timezone
+from crm.models import CommunicationLog, Activity
+from crm.retention import delete_in_batches
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger('crm.performance')
+
+LOG_TABLES = {
+    'communication_logs': (CommunicationLog, 'sent_at'),
+    'activities': (Activity, 'created_at'),
+}
+
+class Command(BaseCommand):
+    help = 'Delete expired log rows in small primary-key batches (fallback where partitions cannot be dropped)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            default=settings.LOG_RETENTION_DAYS,
+            help='Delete rows older than this many days',
+        )
+        parser.add_argument(
+            '--table',
+            action='append',
+            choices=sorted(LOG_TABLES),
+            help='Only purge this table (repeatable)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.RETENTION_DELETE_BATCH_SIZE,
+            help='Rows deleted per batch',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=settings.RETENTION_DELETE_SLEEP,
+            help='Seconds to pause between batches',
+        )
+        parser.add_argument(
+            '--time-budget',
+            type=int,
+            default=settings.RETENTION_TIME_BUDGET,
+            help='Stop after this many seconds per table (0 for no limit)',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+
+        for name in options['table'] or sorted(LOG_TABLES):
+            model, date_field = LOG_TABLES[name]
+            self.stdout.write(f'Purging {name} older than {cutoff:%Y-%m-%d}...')
+
+            def report(deleted, batches):
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'  {deleted} rows deleted ({batches} batches)')
+
+            try:
+                result = delete_in_batches(
+                    model.objects.filter(**{f'{date_field}__lt': cutoff}),
+                    batch_size=options['batch_size'],
+                    sleep=options['sleep'],
+                    time_budget=options['time_budget'],
+                    progress=report,
+                )
+            except Exception as e:
+                logger.error(f"Retention purge of {name} failed: {e}")
+                self.stdout.write(self.style.ERROR(f'Retention purge of {name} failed: {e}'))
+                raise
+
+            message = f"Deleted {result['deleted']} {name} in {result['batches']} batches ({result['elapsed']:.1f}s)"
+            if result['complete']:
+                self.stdout.write(self.style.SUCCESS(message))
+            else:
+                self.stdout.write(self.style.WARNING(f'{message}; time budget reached, run again to continue'))
@@ -0,0 +1,40 @@
+# rebuild_revenue_rollups.py - Management command to backfill Stripe revenue rollups
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+from crm.revenue import rebuild_revenue_rollups, refresh_revenue_rollups
+from datetime import timedelta
+import logging
+
+logger = logging.getLogger('crm.performance')
+
+class Command(BaseCommand):
+    help = 'Rebuild daily and monthly Stripe revenue rollups from the payments table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            help='Only refresh days from this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--end',
+            help='Only refresh days up to this date (YYYY-MM-DD), defaults to --start',
+        )
+
+    def handle(self, *args, **options):
+        start = parse_date(options['start']) if options['start'] else None
+        end = parse_date(options['end']) if options['end'] else start
+
+        try:
+            if start:
+                days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+                self.stdout.write(f'Refreshing revenue rollups for {start} .. {end}...')
+                written = refresh_revenue_rollups(days)
+            else:
+                self.stdout.write('Rebuilding all revenue rollups...')
+                written = rebuild_revenue_rollups()
+        except Exception as e:
+            logger.error(f"Revenue rollup rebuild failed: {e}")
+            self.stdout.write(self.style.ERROR(f'Revenue rollup rebuild failed: {e}'))
+            raise
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} daily rollup rows'))
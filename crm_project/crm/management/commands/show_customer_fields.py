@@ -2,7 +2,7 @@
 Management command to show the enhanced Customer model fields
 """
 from django.core.management.base import BaseCommand
-from crm.models import Customer, CustomerCommunicationPreference
+from crm.models import Customer, CustomerProfile, CustomerCommunicationPreference
 from django.db import models
 
 class Command(BaseCommand):
@@ -37,7 +37,8 @@ class Command(BaseCommand):
             
             for field_name in field_names:
                 try:
-                    field = Customer._meta.get_field(field_name)
+                    model = CustomerProfile if field_name in Customer.PROFILE_FIELDS else Customer
+                    field = model._meta.get_field(field_name)
                     field_type = field.__class__.__name__
                     
                     # Get field constraints and options
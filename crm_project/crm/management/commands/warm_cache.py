@@ -95,9 +95,7 @@ class Command(BaseCommand):
                 if email:
                     # Pre-cache search results for recent customer emails
                     cache_key = f"customer_search_email_{email}"
-                    search_results = list(Customer.objects.filter(
-                        email_primary__iexact=email
-                    ).only('id', 'first_name', 'last_name', 'email_primary').values())
+                    search_results = list(Customer.objects.with_email(email).only('id', 'first_name', 'last_name', 'email_primary').values())
                     cache.set(cache_key, search_results, settings.CACHE_TTL['customer_search'])
             
             # Cache API endpoint responses for common queries
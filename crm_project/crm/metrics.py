@@ -0,0 +1,304 @@
+# metrics.py - Per-view request/query histograms with a Prometheus /metrics endpoint
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger('crm.performance')
+
+KEY_PREFIX = 'crm:metrics'
+
+# Seconds between pushes of local deltas to Redis (ignored without django_redis)
+FLUSH_INTERVAL = getattr(settings, 'METRICS_FLUSH_INTERVAL', 10)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+CACHE_DURATION_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+
+# name -> (help text, bucket bounds, label name)
+HISTOGRAMS = {
+    'crm_http_request_duration_seconds': ('Request latency by view', DURATION_BUCKETS, 'view'),
+    'crm_db_query_duration_seconds': ('Database time per request by view', DURATION_BUCKETS, 'view'),
+    'crm_db_queries_per_request': ('Database queries per request by view', QUERY_COUNT_BUCKETS, 'view'),
+    'crm_cache_operation_duration_seconds': ('Cache operation latency by key prefix', CACHE_DURATION_BUCKETS, 'prefix'),
+}
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Fixed-bucket histogram; counts are per bucket, the last one is +Inf"""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: 'Histogram'):
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation inside the bucket (as histogram_quantile does)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if index == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                return lower + (self.bounds[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+
+class QueryTimer:
+    """connection.execute_wrapper hook counting and timing every query, DEBUG or not"""
+
+    __slots__ = ('count', 'duration')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsRegistry:
+    """
+    In-process metrics, optionally aggregated across workers in Redis.
+
+    Recording a request is a few dict lookups and bisects under a lock. With
+    django_redis, each worker pushes its deltas at most every FLUSH_INTERVAL
+    seconds in one pipeline, and /metrics reads the merged totals.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = self._empty()
+        self._pending = self._empty()
+        self._last_flush = time.monotonic()
+        self._redis = None
+
+    @staticmethod
+    def _empty():
+        return {'histograms': {}, 'responses': defaultdict(int), 'cache': defaultdict(int)}
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from .cache_backends import uses_redis
+            if not uses_redis():
+                return None
+            try:
+                from django_redis import get_redis_connection
+                self._redis = get_redis_connection('default')
+            except Exception as e:
+                logger.warning(f"Metrics Redis backend unavailable: {e}")
+                return None
+        return self._redis
+
+    def record(self, view: str, status_code: int, duration: float, query_count: int, query_duration: float):
+        observations = (
+            ('crm_http_request_duration_seconds', duration),
+            ('crm_db_query_duration_seconds', query_duration),
+            ('crm_db_queries_per_request', query_count),
+        )
+        self._observe(view, observations, 'responses', (view, f"{status_code // 100}xx"))
+
+    def record_cache(self, prefix: str, result: str, duration: float):
+        """Count one cache operation (result is hit, miss or write) and its latency"""
+        self._observe(prefix, (('crm_cache_operation_duration_seconds', duration),), 'cache', (prefix, result))
+
+    def _observe(self, label: str, observations, counter: str, counter_key):
+        stores = (self._totals, self._pending) if self.redis is not None else (self._totals,)
+        with self._lock:
+            for store in stores:
+                histograms = store['histograms']
+                for name, value in observations:
+                    histogram = histograms.get((name, label))
+                    if histogram is None:
+                        histogram = histograms[(name, label)] = Histogram(HISTOGRAMS[name][1])
+                    histogram.observe(value)
+                store[counter][counter_key] += 1
+            flush_due = len(stores) > 1 and time.monotonic() - self._last_flush >= FLUSH_INTERVAL
+
+        if flush_due:
+            self.flush()
+
+    def flush(self):
+        """Push pending deltas to Redis in one pipeline"""
+        backend = self.redis
+        with self._lock:
+            pending, self._pending = self._pending, self._empty()
+            self._last_flush = time.monotonic()
+        if backend is None or not (pending['responses'] or pending['cache']):
+            return
+        try:
+            pipe = backend.pipeline(transaction=False)
+            for (name, view), histogram in pending['histograms'].items():
+                for index, count in enumerate(histogram.counts):
+                    if count:
+                        pipe.hincrby(f"{KEY_PREFIX}:histograms", f"{name}|{view}|{index}", count)
+                pipe.hincrbyfloat(f"{KEY_PREFIX}:histograms", f"{name}|{view}|sum", histogram.sum)
+            for counter in ('responses', 'cache'):
+                for (label, value), count in pending[counter].items():
+                    pipe.hincrby(f"{KEY_PREFIX}:{counter}", f"{label}|{value}", count)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to flush metrics to Redis: {e}")
+
+    def snapshot(self) -> Tuple[Dict, Dict, Dict]:
+        """(histograms, response counts, cache counts) across all workers when Redis is available"""
+        backend = self.redis
+        if backend is not None:
+            self.flush()
+            try:
+                return self._load_redis(backend)
+            except Exception as e:
+                logger.error(f"Failed to read metrics from Redis, serving local values: {e}")
+        with self._lock:
+            histograms = {}
+            for key, histogram in self._totals['histograms'].items():
+                copy = histograms[key] = Histogram(histogram.bounds)
+                copy.merge(histogram)
+            return histograms, dict(self._totals['responses']), dict(self._totals['cache'])
+
+    def _load_redis(self, backend):
+        histograms = {}
+        for field, value in backend.hgetall(f"{KEY_PREFIX}:histograms").items():
+            name, view, slot = field.decode().split('|')
+            if name not in HISTOGRAMS:
+                continue
+            histogram = histograms.get((name, view))
+            if histogram is None:
+                histogram = histograms[(name, view)] = Histogram(HISTOGRAMS[name][1])
+            if slot == 'sum':
+                histogram.sum = float(value)
+            else:
+                histogram.counts[int(slot)] = int(value)
+        for histogram in histograms.values():
+            histogram.count = sum(histogram.counts)
+
+        counters = {}
+        for counter in ('responses', 'cache'):
+            counters[counter] = {}
+            for field, value in backend.hgetall(f"{KEY_PREFIX}:{counter}").items():
+                label, _, name = field.decode().rpartition('|')
+                counters[counter][(label, name)] = int(value)
+        return histograms, counters['responses'], counters['cache']
+
+    def reset(self):
+        with self._lock:
+            self._totals = self._empty()
+            self._pending = self._empty()
+        backend = self.redis
+        if backend is not None:
+            backend.delete(f"{KEY_PREFIX}:histograms", f"{KEY_PREFIX}:responses", f"{KEY_PREFIX}:cache")
+
+
+registry = MetricsRegistry()
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_bound(bound) -> str:
+    return repr(float(bound))
+
+
+def render_prometheus(histograms: Dict, responses: Dict, cache_counts: Optional[Dict] = None) -> str:
+    """Render metrics in the Prometheus text exposition format (0.0.4)"""
+    lines: List[str] = []
+    for name, (help_text, bounds, label_name) in HISTOGRAMS.items():
+        series = sorted((value, h) for (metric, value), h in histograms.items() if metric == name)
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for value, histogram in series:
+            label = f'{label_name}="{_escape(value)}"'
+            cumulative = 0
+            for bound, count in zip(bounds, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label},le="{_format_bound(bound)}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{{label}}} {histogram.sum}')
+            lines.append(f'{name}_count{{{label}}} {histogram.count}')
+
+    # Pre-computed percentiles for dashboards without PromQL
+    quantile_name = 'crm_http_request_duration_quantile_seconds'
+    lines.append(f"# HELP {quantile_name} Estimated request latency percentiles by view")
+    lines.append(f"# TYPE {quantile_name} gauge")
+    for (metric, view), histogram in sorted(histograms.items()):
+        if metric != 'crm_http_request_duration_seconds':
+            continue
+        for q in QUANTILES:
+            lines.append(f'{quantile_name}{{view="{_escape(view)}",quantile="{q}"}} {histogram.quantile(q)}')
+
+    lines.append("# HELP crm_http_responses_total Responses by view and status class")
+    lines.append("# TYPE crm_http_responses_total counter")
+    for (view, status_class), count in sorted(responses.items()):
+        lines.append(f'crm_http_responses_total{{view="{_escape(view)}",status="{status_class}"}} {count}')
+
+    cache_counts = cache_counts or {}
+    lines.append("# HELP crm_cache_operations_total Cache operations by key prefix and result")
+    lines.append("# TYPE crm_cache_operations_total counter")
+    for (prefix, result), count in sorted(cache_counts.items()):
+        lines.append(f'crm_cache_operations_total{{prefix="{_escape(prefix)}",result="{result}"}} {count}')
+
+    lines.append("# HELP crm_cache_hit_ratio Share of cache reads served from the cache by key prefix")
+    lines.append("# TYPE crm_cache_hit_ratio gauge")
+    for prefix in sorted({prefix for prefix, _ in cache_counts}):
+        hits = cache_counts.get((prefix, 'hit'), 0)
+        reads = hits + cache_counts.get((prefix, 'miss'), 0)
+        if reads:
+            lines.append(f'crm_cache_hit_ratio{{prefix="{_escape(prefix)}"}} {hits / reads:.4f}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_allowed(request) -> bool:
+    """Staff users, or scrapers from METRICS_ALLOWED_IPS"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return True
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1'])
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint"""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden('Metrics access denied')
+    histograms, responses, cache_counts = registry.snapshot()
+    return HttpResponse(render_prometheus(histograms, responses, cache_counts), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def view_label(request) -> str:
+    """Low-cardinality label for a request: the URL name, never the raw path"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
@@ -1,12 +1,14 @@
 import logging
-import time
+import math
 from django.http import HttpResponseForbidden, JsonResponse
 from django.urls import reverse
 from django.utils.deprecation import MiddlewareMixin
-from django.core.cache import cache
 from django.conf import settings
+from django.core.cache import cache
 import hashlib
 
+from ..rate_limit import rate_limiter
+
 logger = logging.getLogger('crm.security')
 
 class SecurityHeadersMiddleware(MiddlewareMixin):
@@ -65,38 +67,84 @@ class RateLimitMiddleware(MiddlewareMixin):
         'export': {'requests': 10, 'window': 600},   # 10 exports per 10 minutes
     }
     
+    # Orchestrator probes: never throttled, and /livez must not touch the session or cache
+    EXEMPT_PATHS = ('/livez', '/readyz')
+    
     def process_request(self, request):
-        # Skip rate limiting for authenticated superusers in development
-        if settings.DEBUG and request.user.is_authenticated and request.user.is_superuser:
+        if request.path in self.EXEMPT_PATHS:
             return None
-            
-        client_ip = self.get_client_ip(request)
-        endpoint_type = self.get_endpoint_type(request.path)
         
-        # Create rate limit key
-        rate_key = f"rate_limit:{endpoint_type}:{client_ip}"
+        user = getattr(request, 'user', None)
         
-        # Get rate limit configuration
+        # Skip rate limiting for authenticated superusers in development
+        if settings.DEBUG and user is not None and user.is_authenticated and user.is_superuser:
+            return None
+        
+        endpoint_type = self.get_endpoint_type(request.path)
         rate_config = self.RATE_LIMITS.get(endpoint_type, self.RATE_LIMITS['default'])
         
-        # Check current request count
-        current_requests = cache.get(rate_key, 0)
+        # One atomic check-and-increment per request
+        rate_key = f"{endpoint_type}:{self.get_client_key(request)}"
+        result = rate_limiter.hit(rate_key, rate_config['requests'], rate_config['window'])
+        request.rate_limit = result
         
-        if current_requests >= rate_config['requests']:
+        if not result.allowed:
             logger.warning(
-                f"Rate limit exceeded for {client_ip} on {endpoint_type}: "
-                f"{current_requests} requests"
+                f"Rate limit exceeded for {rate_key}: "
+                f"{rate_config['requests']} requests per {rate_config['window']}s"
             )
-            return JsonResponse({
+            response = JsonResponse({
                 'error': 'Rate limit exceeded',
                 'detail': f'Too many requests. Limit: {rate_config["requests"]} per {rate_config["window"]} seconds'
             }, status=429)
-        
-        # Increment request count
-        cache.set(rate_key, current_requests + 1, rate_config['window'])
+            response['Retry-After'] = str(math.ceil(result.retry_after))
+            return response
         
         return None
     
+    def process_response(self, request, response):
+        result = getattr(request, 'rate_limit', None)
+        if result is not None:
+            response['X-RateLimit-Limit'] = str(result.limit)
+            response['X-RateLimit-Remaining'] = str(result.remaining)
+            response['X-RateLimit-Reset'] = str(math.ceil(result.reset_after))
+        return response
+    
+    def get_client_key(self, request):
+        """
+        Rate limit authenticated users per account and everyone else per IP.
+        DRF's TokenAuthentication only runs inside the view, so API token
+        clients are still anonymous here: a valid token is resolved to its
+        user, an unknown one counts against the IP like any anonymous request
+        """
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return f"user:{user.pk}"
+        token = self.get_api_token(request)
+        user_id = self.get_token_user_id(token) if token else None
+        if user_id is not None:
+            return f"user:{user_id}"
+        return f"ip:{self.get_client_ip(request)}"
+    
+    def get_token_user_id(self, token):
+        """User id behind a DRF API token (cached briefly by token hash), None when unknown"""
+        cache_key = f"ratelimit:token_user:{hashlib.sha256(token.encode()).hexdigest()}"
+        user_id = cache.get(cache_key)
+        if user_id is None:
+            from rest_framework.authtoken.models import Token
+            user_id = Token.objects.filter(key=token).values_list('user_id', flat=True).first()
+            # Unknown tokens are not cached, so random ones cannot fill the cache
+            if user_id is not None:
+                cache.set(cache_key, user_id, settings.CACHE_TTL.get('api_token_user', 60))
+        return user_id
+    
+    def get_api_token(self, request):
+        """The key of an `Authorization: Token <key>` header, if any"""
+        parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+        if len(parts) == 2 and parts[0].lower() == 'token':
+            return parts[1]
+        return None
+    
     def get_client_ip(self, request):
         """Get client IP address"""
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -155,7 +203,7 @@ class SecurityAuditMiddleware(MiddlewareMixin):
                     'method': request.method,
                     'path': request.path,
                     'user_agent': request.META.get('HTTP_USER_AGENT', ''),
-                    'user': str(request.user) if request.user.is_authenticated else 'anonymous'
+                    'user': self.get_username(request)
                 }
             )
         
@@ -186,6 +234,13 @@ class SecurityAuditMiddleware(MiddlewareMixin):
             return x_forwarded_for.split(',')[0].strip()
         return request.META.get('REMOTE_ADDR', '0.0.0.0')
     
+    def get_username(self, request):
+        """Get the username, if authentication has already run for this request"""
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return str(user)
+        return 'anonymous'
+    
     def check_suspicious_patterns(self, request):
         """Check for suspicious patterns in request"""
         import re
@@ -215,35 +270,3 @@ class SecurityAuditMiddleware(MiddlewareMixin):
                 )
                 break
 
-
-class PerformanceMonitoringMiddleware(MiddlewareMixin):
-    """
-    Performance monitoring middleware
-    """
-    
-    def process_request(self, request):
-        request._start_time = time.time()
-        return None
-    
-    def process_response(self, request, response):
-        if hasattr(request, '_start_time'):
-            duration = time.time() - request._start_time
-            
-            # Add performance header
-            response['X-Response-Time'] = f"{duration:.3f}s"
-            
-            # Log slow requests
-            if duration > 2.0:  # Log requests taking more than 2 seconds
-                logger = logging.getLogger('crm.performance')
-                logger.warning(
-                    f"Slow request: {request.method} {request.path} took {duration:.3f}s",
-                    extra={
-                        'method': request.method,
-                        'path': request.path,
-                        'duration': duration,
-                        'status_code': response.status_code,
-                        'user': str(request.user) if request.user.is_authenticated else 'anonymous'
-                    }
-                )
-        
-        return response
\ No newline at end of file
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.16 on 2026-10-19 18:05
+
+from django.db import migrations, models
+import uuid
+
+
+def backfill_revenue_rollups(apps, schema_editor):
+    from crm.revenue import rebuild_revenue_rollups
+
+    rebuild_revenue_rollups(
+        payment_model=apps.get_model("crm", "StripePayment"),
+        rollup_model=apps.get_model("crm", "StripeRevenueRollup"),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0003_add_customer_centre_and_service_subscribed"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripeRevenueRollup",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("day", "Daily"), ("month", "Monthly")], max_length=5
+                    ),
+                ),
+                (
+                    "period_start",
+                    models.DateField(help_text="First day of the rolled-up period"),
+                ),
+                ("source_account", models.CharField(blank=True, max_length=50)),
+                ("currency", models.CharField(max_length=3)),
+                ("plan_name", models.CharField(blank=True, max_length=100)),
+                ("site", models.CharField(blank=True, max_length=100)),
+                ("payment_count", models.PositiveIntegerField(default=0)),
+                (
+                    "amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "converted_amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "amount_refunded",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "fee",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["granularity", "period_start"],
+                "indexes": [
+                    models.Index(
+                        fields=["granularity", "period_start"],
+                        name="crm_striper_granula_92459f_idx",
+                    ),
+                    models.Index(
+                        fields=["granularity", "source_account", "period_start"],
+                        name="crm_striper_granula_b44f84_idx",
+                    ),
+                ],
+                "unique_together": {
+                    (
+                        "granularity",
+                        "period_start",
+                        "source_account",
+                        "currency",
+                        "plan_name",
+                        "site",
+                    )
+                },
+            },
+        ),
+        migrations.RunPython(backfill_revenue_rollups, migrations.RunPython.noop),
+    ]
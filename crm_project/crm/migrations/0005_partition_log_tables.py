@@ -0,0 +1,29 @@
+# Generated by Django 4.2.16 on 2026-10-19 19:10
+
+from django.db import migrations
+
+
+def partition_log_tables(apps, schema_editor):
+    from crm.partitioning import (
+        PARTITIONED_TABLES,
+        convert_to_partitioned,
+        is_partitioned,
+        supports_partitioning,
+    )
+
+    connection = schema_editor.connection
+    if not supports_partitioning(connection):
+        return
+    for table, column in PARTITIONED_TABLES.items():
+        if not is_partitioned(table, connection):
+            convert_to_partitioned(table, column, connection)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0004_stripe_revenue_rollup"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_log_tables, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.16 on 2026-10-19 18:18
+
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    from crm.signals import refresh_enrollment_counts, refresh_registration_counts
+
+    refresh_enrollment_counts(
+        course_model=apps.get_model("crm", "Course"),
+        enrollment_model=apps.get_model("crm", "Enrollment"),
+    )
+    refresh_registration_counts(
+        conference_model=apps.get_model("crm", "Conference"),
+        registration_model=apps.get_model("crm", "ConferenceRegistration"),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0005_partition_log_tables"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conference",
+            name="registration_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="enrollment_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
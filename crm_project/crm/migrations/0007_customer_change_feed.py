@@ -0,0 +1,39 @@
+# Generated by Django 4.2.16 on 2026-10-19 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0006_participant_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerTombstone",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "customer_id",
+                    models.UUIDField(help_text="ID of the deleted customer"),
+                ),
+                ("deleted_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["deleted_at", "customer_id"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(
+                fields=["updated_at", "id"], name="crm_custome_updated_54921e_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="customertombstone",
+            index=models.Index(
+                fields=["deleted_at", "customer_id"],
+                name="crm_custome_deleted_ac7149_idx",
+            ),
+        ),
+    ]
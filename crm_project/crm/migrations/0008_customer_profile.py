@@ -0,0 +1,201 @@
+# Generated by Django 4.2.16 on 2026-10-19 18:33
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+PROFILE_FIELDS = (
+    "emergency_contact_name",
+    "emergency_contact_relationship",
+    "emergency_contact_phone",
+    "emergency_contact_email",
+    "linkedin_profile",
+    "facebook_profile",
+    "twitter_handle",
+    "instagram_handle",
+    "address_secondary",
+    "internal_notes",
+    "special_requirements",
+)
+BATCH_SIZE = 1000
+
+
+def copy_to_profiles(apps, schema_editor):
+    """One profile per customer with any of the moved columns filled in"""
+    Customer = apps.get_model("crm", "Customer")
+    CustomerProfile = apps.get_model("crm", "CustomerProfile")
+
+    has_data = models.Q()
+    for name in PROFILE_FIELDS:
+        has_data |= ~models.Q(**{name: ""})
+    rows = Customer.objects.filter(has_data).values("id", *PROFILE_FIELDS)
+    profiles = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        customer_id = row.pop("id")
+        profiles.append(CustomerProfile(customer_id=customer_id, **row))
+        if len(profiles) >= BATCH_SIZE:
+            CustomerProfile.objects.bulk_create(profiles)
+            profiles = []
+    CustomerProfile.objects.bulk_create(profiles)
+
+
+def copy_from_profiles(apps, schema_editor):
+    Customer = apps.get_model("crm", "Customer")
+    CustomerProfile = apps.get_model("crm", "CustomerProfile")
+
+    customers = []
+    for profile in CustomerProfile.objects.iterator(chunk_size=BATCH_SIZE):
+        customer = Customer(id=profile.customer_id)
+        for name in PROFILE_FIELDS:
+            setattr(customer, name, getattr(profile, name))
+        customers.append(customer)
+    Customer.objects.bulk_update(customers, PROFILE_FIELDS, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0007_customer_change_feed"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerProfile",
+            fields=[
+                (
+                    "customer",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="profile",
+                        serialize=False,
+                        to="crm.customer",
+                    ),
+                ),
+                (
+                    "emergency_contact_name",
+                    models.CharField(
+                        blank=True,
+                        help_text="Emergency contact full name",
+                        max_length=200,
+                    ),
+                ),
+                (
+                    "emergency_contact_relationship",
+                    models.CharField(
+                        blank=True,
+                        help_text="Relationship to emergency contact",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "emergency_contact_phone",
+                    models.CharField(
+                        blank=True,
+                        help_text="Emergency contact phone number",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "emergency_contact_email",
+                    models.EmailField(
+                        blank=True, help_text="Emergency contact email", max_length=254
+                    ),
+                ),
+                (
+                    "address_secondary",
+                    models.TextField(
+                        blank=True, help_text="Secondary address (Mailing/Alternative)"
+                    ),
+                ),
+                (
+                    "linkedin_profile",
+                    models.URLField(
+                        blank=True,
+                        help_text="LinkedIn profile URL",
+                        validators=[django.core.validators.URLValidator()],
+                    ),
+                ),
+                (
+                    "facebook_profile",
+                    models.URLField(
+                        blank=True,
+                        help_text="Facebook profile URL",
+                        validators=[django.core.validators.URLValidator()],
+                    ),
+                ),
+                (
+                    "twitter_handle",
+                    models.CharField(
+                        blank=True,
+                        help_text="Twitter/X handle (without @)",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "instagram_handle",
+                    models.CharField(
+                        blank=True,
+                        help_text="Instagram handle (without @)",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "internal_notes",
+                    models.TextField(
+                        blank=True, help_text="Internal notes (not visible to customer)"
+                    ),
+                ),
+                (
+                    "special_requirements",
+                    models.TextField(
+                        blank=True, help_text="Special requirements or accommodations"
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(copy_to_profiles, copy_from_profiles),
+        migrations.RemoveField(
+            model_name="customer",
+            name="address_secondary",
+        ),
+        migrations.RemoveField(
+            model_name="customer",
+            name="emergency_contact_email",
+        ),
+        migrations.RemoveField(
+            model_name="customer",
+            name="emergency_contact_name",
+        ),
+        migrations.RemoveField(
+            model_name="customer",
+            name="emergency_contact_phone",
+        ),
+        migrations.RemoveField(
+            model_name="customer",
+            name="emergency_contact_relationship",
+        ),
+        migrations.RemoveField(
+            model_name="customer",
+            name="facebook_profile",
+        ),
+        migrations.RemoveField(
+            model_name="customer",
+            name="instagram_handle",
+        ),
+        migrations.RemoveField(
+            model_name="customer",
+            name="internal_notes",
+        ),
+        migrations.RemoveField(
+            model_name="customer",
+            name="linkedin_profile",
+        ),
+        migrations.RemoveField(
+            model_name="customer",
+            name="special_requirements",
+        ),
+        migrations.RemoveField(
+            model_name="customer",
+            name="twitter_handle",
+        ),
+    ]
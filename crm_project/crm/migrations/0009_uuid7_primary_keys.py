@@ -0,0 +1,129 @@
+# Generated by Django 4.2.16 on 2026-10-19 18:36
+
+import crm.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0008_customer_profile"),
+    ]
+
+    # The default is applied in Python, so only migration state changes: existing
+    # keys stay as they are and no table (partitioned log tables included) is rebuilt
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="activity",
+                    name="id",
+                    field=models.UUIDField(
+                        default=crm.ids.new_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="communicationlog",
+                    name="id",
+                    field=models.UUIDField(
+                        default=crm.ids.new_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="conference",
+                    name="id",
+                    field=models.UUIDField(
+                        default=crm.ids.new_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="conferenceregistration",
+                    name="id",
+                    field=models.UUIDField(
+                        default=crm.ids.new_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="course",
+                    name="id",
+                    field=models.UUIDField(
+                        default=crm.ids.new_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="customer",
+                    name="id",
+                    field=models.UUIDField(
+                        default=crm.ids.new_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="customercommunicationpreference",
+                    name="id",
+                    field=models.UUIDField(
+                        default=crm.ids.new_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="enrollment",
+                    name="id",
+                    field=models.UUIDField(
+                        default=crm.ids.new_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="stripepayment",
+                    name="id",
+                    field=models.UUIDField(
+                        default=crm.ids.new_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="striperevenuerollup",
+                    name="id",
+                    field=models.UUIDField(
+                        default=crm.ids.new_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="youtubemessage",
+                    name="id",
+                    field=models.UUIDField(
+                        default=crm.ids.new_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 4.2.16 on 2026-10-19 18:49
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+UNIQUE_FIELDS = ("email_primary", "youtube_handle")
+REPORT_LIMIT = 50
+
+
+def normalize(field, value):
+    """Customer.normalize_unique_fields() as of this migration"""
+    value = (value or "").strip()
+    if field == "youtube_handle":
+        value = value.lstrip("@")
+    return value or None
+
+
+def normalize_values(apps, schema_editor):
+    """Blank -> NULL and trimmed values, as Customer.save() now writes them"""
+    Customer = apps.get_model("crm", "Customer")
+    for field in UNIQUE_FIELDS:
+        Customer.objects.filter(**{field: ""}).update(**{field: None})
+        untidy = (
+            models.Q(**{f"{field}__startswith": " "})
+            | models.Q(**{f"{field}__endswith": " "})
+            | models.Q(**{f"{field}__startswith": "@"})
+        )
+        for pk, value in Customer.objects.filter(untidy).values_list("pk", field):
+            Customer.objects.filter(pk=pk).update(**{field: normalize(field, value)})
+
+
+def report_conflicts(apps, schema_editor):
+    """Stop with a list of the customers to merge when existing rows would violate the new constraints"""
+    Customer = apps.get_model("crm", "Customer")
+    lines = []
+    for field in UNIQUE_FIELDS:
+        duplicates = (
+            Customer.objects.annotate(key=django.db.models.functions.text.Lower(field))
+            .exclude(key=None)
+            .values("key")
+            .annotate(count=models.Count("pk"))
+            .filter(count__gt=1)
+            .order_by("-count", "key")
+        )
+        for group in duplicates[:REPORT_LIMIT]:
+            customers = (
+                Customer.objects.annotate(
+                    key=django.db.models.functions.text.Lower(field)
+                )
+                .filter(key=group["key"])
+                .order_by("created_at")
+                .values_list("pk", "first_name", "last_name", field)
+            )
+            described = ", ".join(
+                f"{pk} ({first} {last}, {value!r})"
+                for pk, first, last, value in customers
+            )
+            lines.append(f"  {field} {group['key']!r}: {described}")
+    if lines:
+        raise RuntimeError(
+            "Cannot add the case-insensitive unique constraints; merge or clear these duplicate "
+            "customers and run migrate again:\n" + "\n".join(lines)
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("crm", "0009_uuid7_primary_keys"),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_values, migrations.RunPython.noop),
+        migrations.RunPython(report_conflicts, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="customer",
+            name="crm_custome_email_p_e2a267_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="customer",
+            name="crm_custome_youtube_07ed9e_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="customer",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("email_primary"),
+                name="crm_customer_email_lower_uniq",
+                violation_error_message="A customer with this email address already exists.",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="customer",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("youtube_handle"),
+                name="crm_customer_youtube_lower_uniq",
+                violation_error_message="A customer with this YouTube handle already exists.",
+            ),
+        ),
+    ]
@@ -2,10 +2,37 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import EmailValidator, URLValidator
-from django.core.exceptions import ValidationError
-import uuid
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db.models.functions import Lower
+from collections import defaultdict
 import re
 
+from .ids import new_uuid
+
+
+def profile_attribute(name):
+    """Customer attribute backed by the same-named CustomerProfile column"""
+    def fget(self):
+        return getattr(self.get_profile(), name)
+    
+    def fset(self, value):
+        setattr(self.get_profile(), name, value)
+        self._profile_changed = True
+    
+    return property(fget, fset, doc=f"CustomerProfile.{name}, loaded on first access")
+
+
+class CustomerQuerySet(models.QuerySet):
+    """Case-insensitive identity lookups, served by the lower() unique indexes"""
+    
+    def with_email(self, email):
+        return self.alias(email_lower=Lower('email_primary')).filter(email_lower=(email or '').strip().lower())
+    
+    def with_youtube_handle(self, handle):
+        handle = (handle or '').strip().lstrip('@').lower()
+        return self.alias(handle_lower=Lower('youtube_handle')).filter(handle_lower=handle)
+
+
 class Customer(models.Model):
     CUSTOMER_TYPES = [
         ('individual', 'Individual Learner'),
@@ -23,7 +50,7 @@ class Customer(models.Model):
     ]
     
     # Core Identity
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=new_uuid, editable=False)
     first_name = models.CharField(max_length=100, help_text="Given name/First name", blank=True)
     middle_name = models.CharField(max_length=100, blank=True, help_text="Middle name(s)")
     last_name = models.CharField(max_length=100, help_text="Family name/Last name/Surname", blank=True)
@@ -97,11 +124,11 @@ class Customer(models.Model):
     date_of_birth = models.DateField(blank=True, null=True, help_text="Date of birth")
     nationality = models.CharField(max_length=100, blank=True, help_text="Nationality")
     
-    # Emergency Contact
-    emergency_contact_name = models.CharField(max_length=200, blank=True, help_text="Emergency contact full name")
-    emergency_contact_relationship = models.CharField(max_length=100, blank=True, help_text="Relationship to emergency contact")
-    emergency_contact_phone = models.CharField(max_length=20, blank=True, help_text="Emergency contact phone number")
-    emergency_contact_email = models.EmailField(blank=True, help_text="Emergency contact email")
+    # Emergency Contact (stored on CustomerProfile)
+    emergency_contact_name = profile_attribute('emergency_contact_name')
+    emergency_contact_relationship = profile_attribute('emergency_contact_relationship')
+    emergency_contact_phone = profile_attribute('emergency_contact_phone')
+    emergency_contact_email = profile_attribute('emergency_contact_email')
     
     # Multiple Email Addresses  
     email_primary = models.EmailField(validators=[EmailValidator()], help_text="Primary email address", blank=True, null=True)
@@ -120,11 +147,11 @@ class Customer(models.Model):
     whatsapp_country_code = models.CharField(max_length=5, blank=True, help_text="Country code for WhatsApp")
     wechat_id = models.CharField(max_length=100, blank=True)
     
-    # Social Media Accounts
-    linkedin_profile = models.URLField(blank=True, validators=[URLValidator()], help_text="LinkedIn profile URL")
-    facebook_profile = models.URLField(blank=True, validators=[URLValidator()], help_text="Facebook profile URL")
-    twitter_handle = models.CharField(max_length=100, blank=True, help_text="Twitter/X handle (without @)")
-    instagram_handle = models.CharField(max_length=100, blank=True, help_text="Instagram handle (without @)")
+    # Social Media Accounts (all but YouTube stored on CustomerProfile)
+    linkedin_profile = profile_attribute('linkedin_profile')
+    facebook_profile = profile_attribute('facebook_profile')
+    twitter_handle = profile_attribute('twitter_handle')
+    instagram_handle = profile_attribute('instagram_handle')
     youtube_handle = models.CharField(max_length=100, blank=True, null=True, help_text="YouTube handle (without @)")
     youtube_channel_url = models.URLField(blank=True, validators=[URLValidator()], help_text="Full YouTube channel URL")
     
@@ -469,7 +496,7 @@ class Customer(models.Model):
     
     # Multiple Addresses
     address_primary = models.TextField(blank=True, help_text="Primary address (Home/Office)")
-    address_secondary = models.TextField(blank=True, help_text="Secondary address (Mailing/Alternative)")
+    address_secondary = profile_attribute('address_secondary')  # stored on CustomerProfile
     
     # Individual Address Components for Primary Address
     address = models.CharField(max_length=500, blank=True, help_text="Street address")
@@ -506,9 +533,9 @@ class Customer(models.Model):
     data_processing_consent = models.BooleanField(default=True, help_text="Consent to data processing")
     newsletter_subscription = models.BooleanField(default=False, help_text="Subscribe to newsletter")
     
-    # Additional Notes
-    internal_notes = models.TextField(blank=True, help_text="Internal notes (not visible to customer)")
-    special_requirements = models.TextField(blank=True, help_text="Special requirements or accommodations")
+    # Additional Notes (stored on CustomerProfile)
+    internal_notes = profile_attribute('internal_notes')
+    special_requirements = profile_attribute('special_requirements')
     
     # System Fields
     source = models.CharField(max_length=100, blank=True, help_text="How customer found us")
@@ -517,23 +544,60 @@ class Customer(models.Model):
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    # Attributes above that live on CustomerProfile rather than in this table
+    PROFILE_FIELDS = (
+        'emergency_contact_name', 'emergency_contact_relationship',
+        'emergency_contact_phone', 'emergency_contact_email',
+        'linkedin_profile', 'facebook_profile', 'twitter_handle', 'instagram_handle',
+        'address_secondary', 'internal_notes', 'special_requirements',
+    )
+    _profile_changed = False
+    
+    # (country code field, number field) pairs filled in from country_region
+    COUNTRY_CODE_FIELDS = (
+        ('phone_primary_country_code', 'phone_primary'),
+        ('phone_secondary_country_code', 'phone_secondary'),
+        ('whatsapp_country_code', 'whatsapp_number'),
+        ('fax_country_code', 'fax'),
+    )
+    
+    # Case-insensitive unique indexes: constraint name -> the field it reports against
+    UNIQUE_CONSTRAINT_FIELDS = {
+        'crm_customer_email_lower_uniq': 'email_primary',
+        'crm_customer_youtube_lower_uniq': 'youtube_handle',
+    }
     
+    objects = CustomerQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            # NULLs never collide, so customers without an email/handle are unaffected
+            models.UniqueConstraint(
+                Lower('email_primary'),
+                name='crm_customer_email_lower_uniq',
+                violation_error_message='A customer with this email address already exists.',
+            ),
+            models.UniqueConstraint(
+                Lower('youtube_handle'),
+                name='crm_customer_youtube_lower_uniq',
+                violation_error_message='A customer with this YouTube handle already exists.',
+            ),
+        ]
         indexes = [
-            models.Index(fields=['email_primary']),
             models.Index(fields=['customer_type', 'status']),
             models.Index(fields=['country_region']),
             models.Index(fields=['source']),
             models.Index(fields=['marketing_consent']),
             models.Index(fields=['phone_primary']),
             models.Index(fields=['whatsapp_number']),
-            models.Index(fields=['youtube_handle']),
             models.Index(fields=['created_at', 'status']),
             models.Index(fields=['customer_type', 'created_at']),
             models.Index(fields=['customer_centre']),
             models.Index(fields=['service_subscribed']),
             models.Index(fields=['customer_centre', 'service_subscribed']),
+            models.Index(fields=['updated_at', 'id']),  # change feed keyset
         ]
     
     def __str__(self):
@@ -583,33 +647,95 @@ class Customer(models.Model):
     
     def auto_set_country_codes(self, force_update=False):
         """Automatically set country codes based on selected country"""
-        country_code = self.get_country_code()
-        if country_code:
-            # Always update primary phone country code when country changes
-            if not self.phone_primary_country_code or force_update:
-                if self.phone_primary:
-                    self.phone_primary_country_code = country_code
-            
-            # Only set secondary phone country code if empty (allow user override)
-            if not self.phone_secondary_country_code and self.phone_secondary:
-                self.phone_secondary_country_code = country_code
-            
-            # Auto-set WhatsApp and fax if empty
-            if not self.whatsapp_country_code and self.whatsapp_number:
-                self.whatsapp_country_code = country_code
-            if not self.fax_country_code and self.fax:
-                self.fax_country_code = country_code
-            
-            # Auto-set emergency contact if empty
-            if not hasattr(self, 'emergency_contact_country_code'):
-                # This field doesn't exist yet, will be added in next enhancement
-                pass
+        type(self).assign_country_codes([self], force_update=force_update)
+    
+    @classmethod
+    def assign_country_codes(cls, customers, force_update=False):
+        """
+        auto_set_country_codes() for a batch, looking each country up once.
+        
+        The primary phone code is replaced when force_update is set; the
+        others are only filled in when empty (allow user override), and only
+        for numbers that are present.
+        """
+        by_country = defaultdict(list)
+        for customer in customers:
+            if customer.country_region:
+                by_country[customer.country_region].append(customer)
+        for country, group in by_country.items():
+            country_code = cls.COUNTRY_CODE_MAP.get(country)
+            if not country_code:
+                continue
+            for code_field, number_field in cls.COUNTRY_CODE_FIELDS:
+                overwrite = force_update and code_field == 'phone_primary_country_code'
+                for customer in group:
+                    if getattr(customer, number_field) and (overwrite or not getattr(customer, code_field)):
+                        setattr(customer, code_field, country_code)
     
     
     def clean(self):
         """Custom model validation with special handling for YouTuber clients"""
         super().clean()
+        self.normalize_unique_fields()
+        self.normalize_youtube_fields()
         
+        # If URL provided but no handle, extract it
+        # (duplicate emails/handles are rejected by the lower() unique constraints)
+        if self.youtube_channel_url and not self.youtube_handle:
+            self.youtube_handle = self.handle_from_channel_url()
+    
+    def validate_constraints(self, exclude=None):
+        """Report lower() unique violations against their field rather than as non-field errors"""
+        try:
+            super().validate_constraints(exclude=exclude)
+        except ValidationError as e:
+            fields = {
+                constraint.violation_error_message: self.UNIQUE_CONSTRAINT_FIELDS[constraint.name]
+                for constraint in self._meta.constraints if constraint.name in self.UNIQUE_CONSTRAINT_FIELDS
+            }
+            errors = {}
+            for field, messages in e.error_dict.items():
+                for error in messages:
+                    target = fields.get(error.message, field) if field == NON_FIELD_ERRORS else field
+                    errors.setdefault(target, []).append(error)
+            raise ValidationError(errors)
+    
+    @classmethod
+    def unique_violation(cls, error):
+        """{field: [message]} when an IntegrityError comes from a lower() unique constraint, else None"""
+        message = str(error)
+        for constraint in cls._meta.constraints:
+            if constraint.name in cls.UNIQUE_CONSTRAINT_FIELDS and constraint.name in message:
+                return {cls.UNIQUE_CONSTRAINT_FIELDS[constraint.name]: [constraint.violation_error_message]}
+        return None
+    
+    def normalize_unique_fields(self):
+        """Trim the email and handle and store blanks as NULL, so the unique indexes compare like with like"""
+        self.email_primary = (self.email_primary or '').strip() or None
+        self.youtube_handle = (self.youtube_handle or '').strip().lstrip('@') or None
+    
+    def clean_fields(self, exclude=None):
+        """Validate assigned profile attributes too, as if they were still columns here"""
+        errors = {}
+        try:
+            super().clean_fields(exclude=exclude)
+        except ValidationError as e:
+            errors = e.update_error_dict(errors)
+        if self._profile_changed:
+            try:
+                self.get_profile().clean_fields(exclude={'customer', *(exclude or ())})
+            except ValidationError as e:
+                errors = e.update_error_dict(errors)
+        if errors:
+            raise ValidationError(errors)
+
+    def handle_from_channel_url(self):
+        """YouTube handle embedded in youtube_channel_url, if any"""
+        match = re.search(r'youtube\.com/@([a-zA-Z0-9._-]+)', self.youtube_channel_url or '')
+        return match.group(1) if match else self.youtube_handle
+    
+    def normalize_youtube_fields(self):
+        """The query-free part of clean(): tidy the handle and fill fields derived from it"""
         # Special handling for YouTuber customer type
         if self.customer_type == 'youtuber' and self.youtube_handle:
             # Remove @ if user included it
@@ -649,29 +775,47 @@ class Customer(models.Model):
             # Auto-generate URL from handle
             if not self.youtube_channel_url:
                 self.youtube_channel_url = f"https://youtube.com/@{self.youtube_handle}"
-        
-        # Check for duplicate YouTube handles (for any customer type with youtube_handle)
-        if self.youtube_handle:
-            from django.core.exceptions import ValidationError
-            existing = Customer.objects.filter(youtube_handle__iexact=self.youtube_handle)
-            if self.pk:
-                existing = existing.exclude(pk=self.pk)
-            if existing.exists():
-                existing_customer = existing.first()
-                raise ValidationError({
-                    'youtube_handle': f'YouTube handle "@{self.youtube_handle}" is already used by {existing_customer.first_name} {existing_customer.last_name} (ID: {existing_customer.id})'
-                })
-        
-        # If URL provided but no handle, extract it
-        elif self.youtube_channel_url and not self.youtube_handle:
-            match = re.search(r'youtube\.com/@([a-zA-Z0-9._-]+)', self.youtube_channel_url)
-            if match:
-                self.youtube_handle = match.group(1)
+    
+    def get_profile(self):
+        """
+        The CustomerProfile holding this customer's rarely-read columns.
+
+        Loaded with one query on first access (none when fetched with
+        select_related('profile')); a blank unsaved profile stands in when
+        the customer has none yet.
+        """
+        relation = Customer.profile.related
+        profile = relation.get_cached_value(self, default=None)
+        if profile is None:
+            if not self._state.adding and not relation.is_cached(self):
+                profile = CustomerProfile.objects.filter(customer_id=self.pk).first()
+            profile = profile or CustomerProfile(customer=self)
+            relation.set_cached_value(self, profile)
+        return profile
+    
+    @property
+    def profile_changed(self):
+        """True when a profile attribute was assigned since the last save"""
+        return self._profile_changed
     
     def save(self, *args, **kwargs):
-        """Override save to automatically set country codes"""
+        """Override save to automatically set country codes (and write the profile if it changed)"""
+        self.normalize_unique_fields()
         self.auto_set_country_codes()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            remaining = [name for name in update_fields if name not in self.PROFILE_FIELDS]
+            if len(remaining) < len(update_fields) and 'updated_at' not in remaining:
+                # A profile-only change still counts as a change to the customer
+                # (and an empty update_fields would skip the save and post_save)
+                remaining.append('updated_at')
+            kwargs['update_fields'] = remaining
         super().save(*args, **kwargs)
+        if self._profile_changed:
+            profile = self.get_profile()
+            profile.customer = self
+            profile.save()
+            self._profile_changed = False
     
     @property
     def email(self):
@@ -697,6 +841,53 @@ class Customer(models.Model):
     # Removed conflicting @property to avoid field/property collision
 
 
+class CustomerProfile(models.Model):
+    """
+    Rarely-read customer columns, split off so list, search and campaign
+    queries scan narrower customer rows. Read and written through the
+    same-named Customer properties.
+    """
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name='profile')
+    
+    # Emergency Contact
+    emergency_contact_name = models.CharField(max_length=200, blank=True, help_text="Emergency contact full name")
+    emergency_contact_relationship = models.CharField(max_length=100, blank=True, help_text="Relationship to emergency contact")
+    emergency_contact_phone = models.CharField(max_length=20, blank=True, help_text="Emergency contact phone number")
+    emergency_contact_email = models.EmailField(blank=True, help_text="Emergency contact email")
+    
+    # Secondary Address
+    address_secondary = models.TextField(blank=True, help_text="Secondary address (Mailing/Alternative)")
+    
+    # Social Media Accounts
+    linkedin_profile = models.URLField(blank=True, validators=[URLValidator()], help_text="LinkedIn profile URL")
+    facebook_profile = models.URLField(blank=True, validators=[URLValidator()], help_text="Facebook profile URL")
+    twitter_handle = models.CharField(max_length=100, blank=True, help_text="Twitter/X handle (without @)")
+    instagram_handle = models.CharField(max_length=100, blank=True, help_text="Instagram handle (without @)")
+    
+    # Additional Notes
+    internal_notes = models.TextField(blank=True, help_text="Internal notes (not visible to customer)")
+    special_requirements = models.TextField(blank=True, help_text="Special requirements or accommodations")
+    
+    def __str__(self):
+        return f"Profile of customer {self.customer_id}"
+
+
+class CustomerTombstone(models.Model):
+    """Record of a deleted customer, served by the change feed so syncs can delete it too"""
+    id = models.BigAutoField(primary_key=True)
+    customer_id = models.UUIDField(help_text="ID of the deleted customer")
+    deleted_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['deleted_at', 'customer_id']
+        indexes = [
+            models.Index(fields=['deleted_at', 'customer_id']),
+        ]
+    
+    def __str__(self):
+        return f"Customer {self.customer_id} deleted at {self.deleted_at}"
+
+
 class CustomerCommunicationPreference(models.Model):
     """Model to handle multiple communication preferences per customer"""
     
@@ -722,7 +913,7 @@ class CustomerCommunicationPreference(models.Model):
         (5, 'Do Not Use'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=new_uuid, editable=False)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='communication_preferences')
     communication_type = models.CharField(max_length=20, choices=COMMUNICATION_TYPES)
     priority = models.IntegerField(choices=PRIORITY_CHOICES, default=2)
@@ -748,7 +939,7 @@ class Course(models.Model):
         ('seminar', 'Seminar'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=new_uuid, editable=False)
     title = models.CharField(max_length=200)
     description = models.TextField()
     course_type = models.CharField(max_length=20, choices=COURSE_TYPES)
@@ -763,6 +954,9 @@ class Course(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Denormalised registered/confirmed enrollments, maintained by crm.signals
+    enrollment_count = models.PositiveIntegerField(default=0, editable=False)
+    
     class Meta:
         indexes = [
             models.Index(fields=['course_type', 'is_active']),
@@ -783,7 +977,10 @@ class Enrollment(models.Model):
         ('no_show', 'No Show'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Statuses that take up a place on the course
+    ACTIVE_STATUSES = ['registered', 'confirmed']
+    
+    id = models.UUIDField(primary_key=True, default=new_uuid, editable=False)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     enrollment_date = models.DateTimeField(auto_now_add=True)
@@ -809,7 +1006,7 @@ class Enrollment(models.Model):
         return f"{self.customer} - {self.course}"
 
 class Conference(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=new_uuid, editable=False)
     name = models.CharField(max_length=200)
     description = models.TextField()
     venue = models.CharField(max_length=300)
@@ -821,6 +1018,9 @@ class Conference(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Denormalised registration count, maintained by crm.signals
+    registration_count = models.PositiveIntegerField(default=0, editable=False)
+    
     class Meta:
         indexes = [
             models.Index(fields=['is_active', 'start_date']),
@@ -832,7 +1032,7 @@ class Conference(models.Model):
         return self.name
 
 class ConferenceRegistration(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=new_uuid, editable=False)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
     conference = models.ForeignKey(Conference, on_delete=models.CASCADE)
     registration_date = models.DateTimeField(auto_now_add=True)
@@ -856,7 +1056,7 @@ class CommunicationLog(models.Model):
         ('youtube', 'YouTube'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=new_uuid, editable=False)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
     channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
     subject = models.CharField(max_length=200)
@@ -901,7 +1101,7 @@ class YouTubeMessage(models.Model):
         ('business', 'Business Inquiry'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=new_uuid, editable=False)
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='youtube_messages')
     
     # Message Details
@@ -1020,7 +1220,7 @@ class Activity(models.Model):
         ('export_completed', 'Export Completed'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=new_uuid, editable=False)
     activity_type = models.CharField(max_length=30, choices=ACTIVITY_TYPES)
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -1051,15 +1251,16 @@ class Activity(models.Model):
     
     @classmethod
     def log(cls, activity_type, title, description='', customer=None, metadata=None, performed_by=''):
-        """Helper method to create activity log entries"""
-        return cls.objects.create(
+        """Helper method to create activity log entries (buffered inside timeline.activity_batch())"""
+        from .timeline import timeline
+        return timeline.record(cls(
             activity_type=activity_type,
             title=title,
             description=description,
             customer=customer,
             metadata=metadata or {},
             performed_by=performed_by
-        )
+        ))
 
 
 class StripePayment(models.Model):
@@ -1073,7 +1274,7 @@ class StripePayment(models.Model):
         ('refunded', 'Refunded'),
     ]
     
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=new_uuid, editable=False)
     stripe_id = models.CharField(max_length=100, unique=True, help_text="Stripe payment ID")
     
     # Payment details
@@ -1135,3 +1336,43 @@ class StripePayment(models.Model):
     def is_successful(self):
         """Check if payment was successful"""
         return self.status == 'paid'
+
+
+class StripeRevenueRollup(models.Model):
+    """Pre-aggregated paid Stripe revenue per day or month for dashboard charts"""
+    
+    GRANULARITY_CHOICES = [
+        ('day', 'Daily'),
+        ('month', 'Monthly'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=new_uuid, editable=False)
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    period_start = models.DateField(help_text="First day of the rolled-up period")
+    
+    # Dimensions (mirror StripePayment)
+    source_account = models.CharField(max_length=50, blank=True)
+    currency = models.CharField(max_length=3)
+    plan_name = models.CharField(max_length=100, blank=True)
+    site = models.CharField(max_length=100, blank=True)
+    
+    # Measures
+    payment_count = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    converted_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    amount_refunded = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    fee = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['granularity', 'period_start']
+        unique_together = ['granularity', 'period_start', 'source_account', 'currency', 'plan_name', 'site']
+        indexes = [
+            models.Index(fields=['granularity', 'period_start']),
+            models.Index(fields=['granularity', 'source_account', 'period_start']),
+        ]
+    
+    def __str__(self):
+        return f"{self.granularity} {self.period_start} {self.source_account}/{self.currency}: {self.converted_amount}"
+
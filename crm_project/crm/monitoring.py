@@ -1 +1,288 @@
-# monitoring.py - Application monitoring and health checks\nimport logging\nfrom django.core.cache import cache\nfrom django.db import connection\nfrom django.conf import settings\nfrom django.http import JsonResponse\nfrom django.utils import timezone\nfrom .models import Customer, Course, CommunicationLog\nimport time\nimport psutil\nimport os\n\nlogger = logging.getLogger('crm')\n\n\nclass HealthChecker:\n    \"\"\"Application health checking utilities\"\"\"\n    \n    def __init__(self):\n        self.checks = {\n            'database': self.check_database,\n            'models': self.check_models,\n            'disk_space': self.check_disk_space,\n            'memory': self.check_memory,\n            'external_apis': self.check_external_apis,\n        }\n    \n    def run_all_checks(self):\n        \"\"\"Run all health checks and return results\"\"\"\n        results = {\n            'timestamp': timezone.now().isoformat(),\n            'overall_status': 'healthy',\n            'checks': {}\n        }\n        \n        for check_name, check_func in self.checks.items():\n            try:\n                start_time = time.time()\n                status, message, details = check_func()\n                duration = time.time() - start_time\n                \n                results['checks'][check_name] = {\n                    'status': status,\n                    'message': message,\n                    'details': details,\n                    'duration_ms': round(duration * 1000, 2)\n                }\n                \n                if status != 'healthy':\n                    results['overall_status'] = 'unhealthy'\n                    \n            except Exception as e:\n                results['checks'][check_name] = {\n                    'status': 'error',\n                    'message': f'Health check failed: {str(e)}',\n                    'details': {},\n                    'duration_ms': 0\n                }\n                results['overall_status'] = 'unhealthy'\n                \n                logger.error(\n                    f\"Health check {check_name} failed: {str(e)}\",\n                    extra={'health_check_error': True, 'check_name': check_name},\n                    exc_info=True\n                )\n        \n        return results\n    \n    def check_database(self):\n        \"\"\"Check database connectivity and basic queries\"\"\"\n        try:\n            # Test basic connection\n            with connection.cursor() as cursor:\n                cursor.execute(\"SELECT 1\")\n                cursor.fetchone()\n            \n            # Test model queries\n            customer_count = Customer.objects.count()\n            \n            return 'healthy', 'Database connection OK', {\n                'customer_count': customer_count,\n                'db_vendor': connection.vendor\n            }\n        \n        except Exception as e:\n            return 'unhealthy', f'Database error: {str(e)}', {}\n    \n    def check_models(self):\n        \"\"\"Check model integrity and recent data\"\"\"\n        try:\n            # Check for recent activity\n            recent_customers = Customer.objects.filter(\n                created_at__gte=timezone.now() - timezone.timedelta(days=7)\n            ).count()\n            \n            recent_communications = CommunicationLog.objects.filter(\n                sent_at__gte=timezone.now() - timezone.timedelta(days=1)\n            ).count()\n            \n            return 'healthy', 'Models functioning normally', {\n                'recent_customers_7d': recent_customers,\n                'recent_communications_24h': recent_communications,\n                'total_customers': Customer.objects.count(),\n            }\n        \n        except Exception as e:\n            return 'unhealthy', f'Model check error: {str(e)}', {}\n    \n    def check_disk_space(self):\n        \"\"\"Check available disk space\"\"\"\n        try:\n            disk_usage = psutil.disk_usage('/')\n            free_gb = disk_usage.free / (1024**3)\n            total_gb = disk_usage.total / (1024**3)\n            used_percent = (disk_usage.used / disk_usage.total) * 100\n            \n            if used_percent > 90:\n                status = 'unhealthy'\n                message = f'Disk space critical: {used_percent:.1f}% used'\n            elif used_percent > 80:\n                status = 'warning'\n                message = f'Disk space low: {used_percent:.1f}% used'\n            else:\n                status = 'healthy'\n                message = f'Disk space OK: {used_percent:.1f}% used'\n            \n            return status, message, {\n                'free_gb': round(free_gb, 2),\n                'total_gb': round(total_gb, 2),\n                'used_percent': round(used_percent, 1)\n            }\n        \n        except Exception as e:\n            return 'error', f'Disk check error: {str(e)}', {}\n    \n    def check_memory(self):\n        \"\"\"Check memory usage\"\"\"\n        try:\n            memory = psutil.virtual_memory()\n            used_percent = memory.percent\n            available_gb = memory.available / (1024**3)\n            \n            if used_percent > 90:\n                status = 'unhealthy'\n                message = f'Memory critical: {used_percent:.1f}% used'\n            elif used_percent > 80:\n                status = 'warning'\n                message = f'Memory high: {used_percent:.1f}% used'\n            else:\n                status = 'healthy'\n                message = f'Memory OK: {used_percent:.1f}% used'\n            \n            return status, message, {\n                'used_percent': round(used_percent, 1),\n                'available_gb': round(available_gb, 2),\n                'total_gb': round(memory.total / (1024**3), 2)\n            }\n        \n        except Exception as e:\n            return 'error', f'Memory check error: {str(e)}', {}\n    \n    def check_external_apis(self):\n        \"\"\"Check external API configurations\"\"\"\n        try:\n            api_status = {}\n            overall_status = 'healthy'\n            \n            # Check WhatsApp API config\n            if hasattr(settings, 'WHATSAPP_ACCESS_TOKEN') and settings.WHATSAPP_ACCESS_TOKEN:\n                if settings.WHATSAPP_ACCESS_TOKEN.startswith('your-'):\n                    api_status['whatsapp'] = 'not_configured'\n                    overall_status = 'warning'\n                else:\n                    api_status['whatsapp'] = 'configured'\n            else:\n                api_status['whatsapp'] = 'missing'\n                overall_status = 'warning'\n            \n            # Check WeChat API config\n            if hasattr(settings, 'WECHAT_CORP_ID') and settings.WECHAT_CORP_ID:\n                if settings.WECHAT_CORP_ID.startswith('your-'):\n                    api_status['wechat'] = 'not_configured'\n                    overall_status = 'warning'\n                else:\n                    api_status['wechat'] = 'configured'\n            else:\n                api_status['wechat'] = 'missing'\n                overall_status = 'warning'\n            \n            # Check email config\n            if hasattr(settings, 'EMAIL_HOST_USER') and settings.EMAIL_HOST_USER:\n                if settings.EMAIL_HOST_USER.startswith('your-'):\n                    api_status['email'] = 'not_configured'\n                    overall_status = 'warning'\n                else:\n                    api_status['email'] = 'configured'\n            else:\n                api_status['email'] = 'missing'\n                overall_status = 'warning'\n            \n            message = 'External API configuration check complete'\n            if overall_status == 'warning':\n                message += ' (some APIs not properly configured)'\n            \n            return overall_status, message, api_status\n        \n        except Exception as e:\n            return 'error', f'External API check error: {str(e)}', {}\n\n\ndef health_check_view(request):\n    \"\"\"Django view for health check endpoint\"\"\"\n    checker = HealthChecker()\n    results = checker.run_all_checks()\n    \n    # Determine HTTP status code\n    if results['overall_status'] == 'healthy':\n        status_code = 200\n    elif results['overall_status'] == 'warning':\n        status_code = 200  # Still operational\n    else:\n        status_code = 503  # Service unavailable\n    \n    # Log health check\n    logger.info(\n        f\"Health check completed: {results['overall_status']}\",\n        extra={\n            'health_check': True,\n            'overall_status': results['overall_status'],\n            'failed_checks': [\n                name for name, check in results['checks'].items() \n                if check['status'] != 'healthy'\n            ]\n        }\n    )\n    \n    return JsonResponse(results, status=status_code)\n\n\nclass ApplicationMetrics:\n    \"\"\"Application metrics collection\"\"\"\n    \n    @staticmethod\n    def get_basic_metrics():\n        \"\"\"Get basic application metrics\"\"\"\n        try:\n            return {\n                'customers': {\n                    'total': Customer.objects.count(),\n                    'active': Customer.objects.filter(status='active').count(),\n                    'prospects': Customer.objects.filter(status='prospect').count(),\n                    'recent_24h': Customer.objects.filter(\n                        created_at__gte=timezone.now() - timezone.timedelta(days=1)\n                    ).count(),\n                },\n                'courses': {\n                    'total': Course.objects.count(),\n                    'active': Course.objects.filter(is_active=True).count(),\n                },\n                'communications': {\n                    'total_24h': CommunicationLog.objects.filter(\n                        sent_at__gte=timezone.now() - timezone.timedelta(days=1)\n                    ).count(),\n                    'email_24h': CommunicationLog.objects.filter(\n                        channel='email',\n                        sent_at__gte=timezone.now() - timezone.timedelta(days=1)\n                    ).count(),\n                    'whatsapp_24h': CommunicationLog.objects.filter(\n                        channel='whatsapp',\n                        sent_at__gte=timezone.now() - timezone.timedelta(days=1)\n                    ).count(),\n                },\n                'timestamp': timezone.now().isoformat()\n            }\n        except Exception as e:\n            logger.error(f\"Metrics collection error: {str(e)}\", exc_info=True)\n            return {'error': str(e), 'timestamp': timezone.now().isoformat()}\n\n\ndef metrics_view(request):\n    \"\"\"Django view for metrics endpoint\"\"\"\n    metrics = ApplicationMetrics.get_basic_metrics()\n    return JsonResponse(metrics)
\ No newline at end of file
+# monitoring.py - Liveness/readiness probes and cached application diagnostics
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import Count, Q
+from django.http import JsonResponse
+from django.utils import timezone
+
+try:
+    import psutil
+except ImportError:  # psutil is optional; disk/memory checks report "skipped" without it
+    psutil = None
+
+logger = logging.getLogger('crm')
+
+DIAGNOSTICS_KEY = 'crm:health:diagnostics'
+REFRESH_LOCK_KEY = 'crm:health:refreshing'
+READY_PROBE_KEY = 'crm:health:ready_probe'
+
+# Diagnostics older than this trigger a background refresh when read
+DIAGNOSTICS_MAX_AGE = getattr(settings, 'HEALTH_DIAGNOSTICS_MAX_AGE', 60)
+
+
+class HealthChecker:
+    """
+    Expensive application diagnostics (table counts, disk, memory, API config).
+
+    Never run on a probe: refresh_diagnostics() computes them in the
+    background and health_check_view serves the cached copy.
+    """
+
+    def __init__(self):
+        self.checks = {
+            'database': self.check_database,
+            'models': self.check_models,
+            'disk_space': self.check_disk_space,
+            'memory': self.check_memory,
+            'external_apis': self.check_external_apis,
+        }
+
+    def run_all_checks(self):
+        """Run all health checks and return results"""
+        results = {
+            'timestamp': timezone.now().isoformat(),
+            'overall_status': 'healthy',
+            'checks': {}
+        }
+
+        for check_name, check_func in self.checks.items():
+            try:
+                start_time = time.time()
+                status, message, details = check_func()
+                duration = time.time() - start_time
+
+                results['checks'][check_name] = {
+                    'status': status,
+                    'message': message,
+                    'details': details,
+                    'duration_ms': round(duration * 1000, 2)
+                }
+
+                if status == 'unhealthy':
+                    results['overall_status'] = 'unhealthy'
+                elif status != 'healthy' and results['overall_status'] == 'healthy':
+                    results['overall_status'] = 'warning'
+
+            except Exception as e:
+                results['checks'][check_name] = {
+                    'status': 'error',
+                    'message': f'Health check failed: {str(e)}',
+                    'details': {},
+                    'duration_ms': 0
+                }
+                results['overall_status'] = 'unhealthy'
+
+                logger.error(
+                    f"Health check {check_name} failed: {str(e)}",
+                    extra={'health_check_error': True, 'check_name': check_name},
+                    exc_info=True
+                )
+
+        return results
+
+    def check_database(self):
+        """Check database connectivity"""
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            return 'healthy', 'Database connection OK', {'db_vendor': connection.vendor}
+        except Exception as e:
+            return 'unhealthy', f'Database error: {str(e)}', {}
+
+    def check_models(self):
+        """Customer totals and recent activity, one query per table"""
+        from .models import CommunicationLog, Customer
+
+        try:
+            now = timezone.now()
+            customers = Customer.objects.aggregate(
+                total=Count('pk'),
+                recent_7d=Count('pk', filter=Q(created_at__gte=now - timedelta(days=7))),
+            )
+            recent_communications = CommunicationLog.objects.filter(sent_at__gte=now - timedelta(days=1)).count()
+
+            return 'healthy', 'Models functioning normally', {
+                'recent_customers_7d': customers['recent_7d'],
+                'recent_communications_24h': recent_communications,
+                'total_customers': customers['total'],
+            }
+        except Exception as e:
+            return 'unhealthy', f'Model check error: {str(e)}', {}
+
+    @staticmethod
+    def _usage_status(kind, used_percent):
+        if used_percent > 90:
+            return 'unhealthy', f'{kind} critical: {used_percent:.1f}% used'
+        if used_percent > 80:
+            return 'warning', f'{kind} high: {used_percent:.1f}% used'
+        return 'healthy', f'{kind} OK: {used_percent:.1f}% used'
+
+    def check_disk_space(self):
+        """Check available disk space"""
+        if psutil is None:
+            return 'skipped', 'psutil not installed', {}
+        disk_usage = psutil.disk_usage('/')
+        used_percent = (disk_usage.used / disk_usage.total) * 100
+        status, message = self._usage_status('Disk space', used_percent)
+        return status, message, {
+            'free_gb': round(disk_usage.free / (1024**3), 2),
+            'total_gb': round(disk_usage.total / (1024**3), 2),
+            'used_percent': round(used_percent, 1)
+        }
+
+    def check_memory(self):
+        """Check memory usage"""
+        if psutil is None:
+            return 'skipped', 'psutil not installed', {}
+        memory = psutil.virtual_memory()
+        status, message = self._usage_status('Memory', memory.percent)
+        return status, message, {
+            'used_percent': round(memory.percent, 1),
+            'available_gb': round(memory.available / (1024**3), 2),
+            'total_gb': round(memory.total / (1024**3), 2)
+        }
+
+    def check_external_apis(self):
+        """Check external API configurations"""
+        api_status = {}
+        overall_status = 'healthy'
+        for name, setting in (('whatsapp', 'WHATSAPP_ACCESS_TOKEN'), ('wechat', 'WECHAT_CORP_ID'), ('email', 'EMAIL_HOST_USER')):
+            value = getattr(settings, setting, '')
+            if not value:
+                api_status[name] = 'missing'
+            elif value.startswith('your-'):
+                api_status[name] = 'not_configured'
+            else:
+                api_status[name] = 'configured'
+                continue
+            overall_status = 'warning'
+
+        message = 'External API configuration check complete'
+        if overall_status == 'warning':
+            message += ' (some APIs not properly configured)'
+        return overall_status, message, api_status
+
+
+def refresh_diagnostics():
+    """Run the full HealthChecker and cache the results with their timestamp"""
+    started = time.monotonic()
+    results = HealthChecker().run_all_checks()
+    results['metrics'] = ApplicationMetrics.get_basic_metrics()
+    results['generated_at'] = time.time()
+    results['duration_ms'] = round((time.monotonic() - started) * 1000, 2)
+    # Kept well past DIAGNOSTICS_MAX_AGE so a stalled refresher still shows the last known state
+    cache.set(DIAGNOSTICS_KEY, results, DIAGNOSTICS_MAX_AGE * 10)
+    return results
+
+
+def _refresh_in_background():
+    try:
+        refresh_diagnostics()
+    except Exception as e:
+        logger.error(f"Diagnostics refresh failed: {e}", exc_info=True)
+    finally:
+        cache.delete(REFRESH_LOCK_KEY)
+        connections.close_all()
+
+
+def start_refresh():
+    """Refresh diagnostics on a daemon thread unless another worker already is"""
+    if cache.add(REFRESH_LOCK_KEY, 1, DIAGNOSTICS_MAX_AGE):
+        threading.Thread(target=_refresh_in_background, name='health-diagnostics', daemon=True).start()
+
+
+def cached_diagnostics():
+    """Last diagnostics with their age; schedules a refresh when stale or missing"""
+    results = cache.get(DIAGNOSTICS_KEY)
+    age = time.time() - results['generated_at'] if results else None
+    if age is None or age > DIAGNOSTICS_MAX_AGE:
+        start_refresh()
+    if results is None:
+        return {'overall_status': 'pending', 'stale': True, 'age_seconds': None, 'checks': {}}
+    return {**results, 'stale': age > DIAGNOSTICS_MAX_AGE, 'age_seconds': round(age, 1)}
+
+
+def livez(request):
+    """Liveness: the process is serving requests. No database, cache or disk access."""
+    return JsonResponse({'status': 'ok'})
+
+
+def readyz(request):
+    """Readiness: `SELECT 1` on the database and a cache round-trip, nothing else"""
+    checks = {}
+    ready = True
+    for name, probe in (('database', _probe_database), ('cache', _probe_cache)):
+        started = time.perf_counter()
+        try:
+            probe()
+            checks[name] = {'status': 'ok'}
+        except Exception as e:
+            ready = False
+            checks[name] = {'status': 'error', 'message': str(e)}
+            logger.warning(f"Readiness probe {name} failed: {e}")
+        checks[name]['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return JsonResponse({'status': 'ok' if ready else 'unavailable', 'checks': checks}, status=200 if ready else 503)
+
+
+def _probe_database():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+
+
+def _probe_cache():
+    cache.set(READY_PROBE_KEY, 1, 10)
+    if cache.get(READY_PROBE_KEY) != 1:
+        raise RuntimeError('Cache did not return the probe value')
+
+
+def health_check_view(request):
+    """Cached diagnostics for dashboards and humans (staff or METRICS_ALLOWED_IPS only)"""
+    from .metrics import metrics_allowed
+
+    if not metrics_allowed(request):
+        return JsonResponse({'error': 'Health diagnostics access denied'}, status=403)
+    results = cached_diagnostics()
+    status_code = 503 if results['overall_status'] == 'unhealthy' else 200
+    return JsonResponse(results, status=status_code)
+
+
+class ApplicationMetrics:
+    """Application metrics collection"""
+
+    @staticmethod
+    def get_basic_metrics():
+        """Customer, course and communication counts in one grouped query per table"""
+        from .aggregates import segment_counts, total_for
+        from .models import CommunicationLog, Course, Customer
+
+        try:
+            now = timezone.now()
+            segments = segment_counts([(), ('status',)])
+            courses = Course.objects.aggregate(total=Count('pk'), active=Count('pk', filter=Q(is_active=True)))
+            communications = CommunicationLog.objects.filter(sent_at__gte=now - timedelta(days=1)).aggregate(
+                total_24h=Count('pk'),
+                email_24h=Count('pk', filter=Q(channel='email')),
+                whatsapp_24h=Count('pk', filter=Q(channel='whatsapp')),
+            )
+            return {
+                'customers': {
+                    'total': total_for(segments),
+                    'active': total_for(segments, status='active'),
+                    'prospects': total_for(segments, status='prospect'),
+                    'recent_24h': Customer.objects.filter(created_at__gte=now - timedelta(days=1)).count(),
+                },
+                'courses': courses,
+                'communications': communications,
+                'timestamp': now.isoformat()
+            }
+        except Exception as e:
+            logger.error(f"Metrics collection error: {str(e)}", exc_info=True)
+            return {'error': str(e), 'timestamp': timezone.now().isoformat()}
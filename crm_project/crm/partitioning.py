@@ -0,0 +1,267 @@
+# partitioning.py - Monthly range partitioning and archival for append-only log tables (PostgreSQL)
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, timezone as dt_timezone
+from typing import Dict, List, NamedTuple, Optional
+
+from django.db import connection as default_connection, transaction
+
+logger = logging.getLogger('crm.performance')
+
+# Append-only tables partitioned by month: table name -> partition key column
+PARTITIONED_TABLES = {
+    'crm_communicationlog': 'sent_at',
+    'crm_activity': 'created_at',
+}
+
+# Future monthly partitions kept ready so inserts never land in the default partition
+PARTITION_MONTHS_AHEAD = 3
+
+_PARTITION_SUFFIX = re.compile(r'_y(\d{4})m(\d{2})$')
+
+
+class Partition(NamedTuple):
+    name: str
+    start: date  # inclusive
+    end: date    # exclusive
+
+
+def month_start(value) -> date:
+    if isinstance(value, datetime):
+        value = value.astimezone(dt_timezone.utc) if value.tzinfo else value
+        value = value.date()
+    return value.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month:%Y}m{month:%m}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def parse_partition(name: str) -> Optional[Partition]:
+    """Recover the month range from a partition name created by this module"""
+    match = _PARTITION_SUFFIX.search(name)
+    if not match:
+        return None
+    start = date(int(match.group(1)), int(match.group(2)), 1)
+    return Partition(name, start, add_months(start, 1))
+
+
+def cold_partitions(partitions: List[Partition], cutoff) -> List[Partition]:
+    """Partitions whose whole range is older than the cutoff"""
+    cutoff_day = cutoff.astimezone(dt_timezone.utc).date() if isinstance(cutoff, datetime) else cutoff
+    return sorted((p for p in partitions if p.end <= cutoff_day), key=lambda p: p.start)
+
+
+def supports_partitioning(connection=None) -> bool:
+    """Declarative partitioning with default partitions needs PostgreSQL 11+"""
+    connection = connection or default_connection
+    return connection.vendor == 'postgresql' and connection.pg_version >= 110000
+
+
+def is_partitioned(table: str, connection=None) -> bool:
+    connection = connection or default_connection
+    if not supports_partitioning(connection):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [table])
+        return cursor.fetchone()[0]
+
+
+def list_partitions(table: str, connection=None) -> List[Partition]:
+    """Monthly partitions attached to a table (the default partition is not included)"""
+    connection = connection or default_connection
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            """,
+            [table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = [parse_partition(name) for name in names]
+    return sorted((p for p in partitions if p), key=lambda p: p.start)
+
+
+def _bound(month: date) -> str:
+    return f"{month.isoformat()} 00:00:00+00"
+
+
+def create_partition(table: str, month: date, connection=None) -> str:
+    connection = connection or default_connection
+    quote = connection.ops.quote_name
+    name = partition_name(table, month)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {quote(name)} PARTITION OF {quote(table)} FOR VALUES FROM (%s) TO (%s)",
+            [_bound(month), _bound(add_months(month, 1))],
+        )
+    return name
+
+
+def ensure_partitions(tables=None, months_ahead: int = PARTITION_MONTHS_AHEAD, connection=None) -> List[str]:
+    """Create this month's and the next few months' partitions; returns the names created"""
+    connection = connection or default_connection
+    if not supports_partitioning(connection):
+        return []
+
+    created = []
+    this_month = month_start(datetime.now(dt_timezone.utc))
+    for table in tables or PARTITIONED_TABLES:
+        if not is_partitioned(table, connection):
+            continue
+        existing = {p.name for p in list_partitions(table, connection)}
+        for offset in range(months_ahead + 1):
+            month = add_months(this_month, offset)
+            if partition_name(table, month) not in existing:
+                created.append(create_partition(table, month, connection))
+    if created:
+        logger.info(f"Created log partitions: {', '.join(created)}")
+    return created
+
+
+def convert_to_partitioned(table: str, column: str, connection=None, months_ahead: int = PARTITION_MONTHS_AHEAD):
+    """
+    Rebuild a plain table as a monthly range-partitioned table on `column`.
+
+    PostgreSQL requires the partition key in every unique constraint, so the
+    primary key becomes (id, column); ids stay UUIDs and remain unique in
+    practice. Indexes and foreign keys are recreated on the parent and
+    cascade to each partition. Takes an exclusive lock for the copy, so run
+    it in a maintenance window (it is applied by migration 0005).
+    """
+    connection = connection or default_connection
+    quote = connection.ops.quote_name
+    legacy = f"{table}_unpartitioned"
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE confrelid = to_regclass(%s) AND contype = 'f'", [table]
+        )
+        referencing = [row[0] for row in cursor.fetchall()]
+        if referencing:
+            raise RuntimeError(f"Cannot partition {table}: referenced by {', '.join(referencing)}")
+
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p'", [table]
+        )
+        primary_key_name = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s",
+            [table],
+        )
+        index_defs = [(name, definition) for name, definition in cursor.fetchall() if name != primary_key_name]
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = to_regclass(%s) AND contype = 'f'
+            """,
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+
+        # Free the index names before they are recreated on the partitioned parent
+        cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(legacy)}")
+        cursor.execute(f"ALTER TABLE {quote(legacy)} DROP CONSTRAINT {quote(primary_key_name)}")
+        for name, _ in index_defs:
+            cursor.execute(f"DROP INDEX IF EXISTS {quote(name)}")
+
+        cursor.execute(
+            f"CREATE TABLE {quote(table)} (LIKE {quote(legacy)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({quote(column)})"
+        )
+        cursor.execute(
+            f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(primary_key_name)} "
+            f"PRIMARY KEY ({quote('id')}, {quote(column)})"
+        )
+
+        cursor.execute(f"SELECT MIN({quote(column)}), MAX({quote(column)}) FROM {quote(legacy)}")
+        oldest, newest = cursor.fetchone()
+        this_month = month_start(datetime.now(dt_timezone.utc))
+        month = month_start(oldest) if oldest else this_month
+        last_month = add_months(max(month_start(newest) if newest else this_month, this_month), months_ahead)
+        while month <= last_month:
+            create_partition(table, month, connection)
+            month = add_months(month, 1)
+        cursor.execute(f"CREATE TABLE {quote(default_partition_name(table))} PARTITION OF {quote(table)} DEFAULT")
+
+        cursor.execute(f"INSERT INTO {quote(table)} SELECT * FROM {quote(legacy)}")
+        copied = cursor.rowcount
+
+        # Build indexes after the copy; each one cascades to every partition
+        for _, definition in index_defs:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
+
+        cursor.execute(f"DROP TABLE {quote(legacy)}")
+
+    logger.info(f"Partitioned {table} by month on {column} ({copied} rows copied)")
+    return copied
+
+
+def export_partition(name: str, path: str, connection=None) -> int:
+    """Stream a partition to a gzip-compressed CSV file with COPY; returns the row count"""
+    connection = connection or default_connection
+    partial_path = f"{path}.partial"
+    with gzip.open(partial_path, 'wb') as output, connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {connection.ops.quote_name(name)} TO STDOUT WITH (FORMAT csv, HEADER)", output)
+        rows = cursor.rowcount
+    os.replace(partial_path, path)
+    return rows
+
+
+def detach_partition(table: str, name: str, drop: bool = True, connection=None):
+    """Detach a partition from its parent (metadata only) and optionally drop it"""
+    connection = connection or default_connection
+    quote = connection.ops.quote_name
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+        if drop:
+            cursor.execute(f"DROP TABLE {quote(name)}")
+
+
+def archive_partitions(cutoff, export_dir: Optional[str] = None, drop: bool = True,
+                       tables=None, dry_run: bool = False, connection=None) -> List[Dict]:
+    """
+    Export and remove every monthly partition older than the cutoff.
+
+    Each cold partition is written to <export_dir>/<partition>.csv.gz (when an
+    export directory is given) before it is detached, and dropped unless
+    drop=False. Removing a partition never rewrites or scans the hot ones.
+    """
+    connection = connection or default_connection
+    if not supports_partitioning(connection):
+        return []
+
+    if export_dir and not dry_run:
+        os.makedirs(export_dir, exist_ok=True)
+
+    archived = []
+    for table in tables or PARTITIONED_TABLES:
+        if not is_partitioned(table, connection):
+            continue
+        for partition in cold_partitions(list_partitions(table, connection), cutoff):
+            result = {'table': table, 'partition': partition.name, 'rows': None, 'file': None}
+            if not dry_run:
+                if export_dir:
+                    result['file'] = os.path.join(export_dir, f"{partition.name}.csv.gz")
+                    result['rows'] = export_partition(partition.name, result['file'], connection)
+                detach_partition(table, partition.name, drop=drop, connection=connection)
+                logger.info(f"Archived partition {partition.name} ({result['rows']} rows)")
+            archived.append(result)
+    return archived
@@ -1,42 +1,51 @@
 # performance_middleware.py - Performance Monitoring Middleware
 import time
 import logging
+from contextlib import ExitStack
 from django.conf import settings
-from django.db import connection
-from django.core.cache import cache
+from django.db import connections
+from .cache_backends import track_cache_stats
+from .metrics import QueryTimer, registry, view_label
 
 logger = logging.getLogger('crm.performance')
 
 class PerformanceMonitoringMiddleware:
-    """Middleware to monitor request performance and database queries"""
+    """
+    Single instrumentation layer for request timing and database queries.
+
+    Queries are counted and timed through connection.execute_wrapper, so the
+    numbers are real with DEBUG=False (connection.queries is only filled in
+    DEBUG). Every request feeds the per-view histograms served on /metrics.
+    """
+    
+    SKIP_PREFIXES = ('/static/', '/media/', '/admin/jsi18n/')
     
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
         # Skip performance monitoring for static files and admin
-        if (request.path.startswith('/static/') or 
-            request.path.startswith('/media/') or
-            request.path.startswith('/admin/jsi18n/')):
+        if request.path.startswith(self.SKIP_PREFIXES):
             return self.get_response(request)
         
-        # Record start time and query count
-        start_time = time.time()
-        start_queries = len(connection.queries)
+        timer = QueryTimer()
+        start_time = time.perf_counter()
+        
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
         
-        # Process request
-        response = self.get_response(request)
+        total_time = time.perf_counter() - start_time
+        query_count = timer.count
         
-        # Calculate metrics
-        end_time = time.time()
-        total_time = end_time - start_time
-        query_count = len(connection.queries) - start_queries
+        registry.record(view_label(request), response.status_code, total_time, query_count, timer.duration)
         
         # Log slow requests (>1 second)
         if total_time > 1.0:
             logger.warning(
                 f"SLOW REQUEST: {request.method} {request.path} "
-                f"took {total_time:.3f}s with {query_count} queries"
+                f"took {total_time:.3f}s with {query_count} queries ({timer.duration:.3f}s in DB)"
             )
         
         # Log high query count requests (>20 queries)
@@ -46,75 +55,45 @@ class PerformanceMonitoringMiddleware:
                 f"executed {query_count} queries in {total_time:.3f}s"
             )
         
-        # Add performance headers for debugging
+        response['X-Response-Time'] = f"{total_time:.3f}s"
+        
+        # Add query headers for debugging
         if settings.DEBUG:
-            response['X-Response-Time'] = f"{total_time:.3f}s"
             response['X-Query-Count'] = str(query_count)
-        
-        # Log all requests in debug mode
-        if settings.DEBUG and total_time > 0.1:  # Log requests >100ms
-            logger.info(
-                f"REQUEST: {request.method} {request.path} "
-                f"- {total_time:.3f}s - {query_count} queries"
-            )
+            response['X-Query-Time'] = f"{timer.duration:.3f}s"
         
         return response
 
 class CachePerformanceMiddleware:
-    """Middleware to monitor cache performance"""
+    """
+    Middleware to monitor cache performance per request.
+
+    Counts come from the instrumented cache backend through a context-local
+    CacheStats, so concurrent requests never see each other's numbers.
+    """
     
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        # Track cache operations during request
-        cache_hits = 0
-        cache_misses = 0
-        
-        # Monkey patch cache methods to count hits/misses
-        original_get = cache.get
-        original_set = cache.set
-        
-        def tracked_get(key, default=None, version=None):
-            nonlocal cache_hits, cache_misses
-            result = original_get(key, default, version)
-            if result is not None and result != default:
-                cache_hits += 1
-            else:
-                cache_misses += 1
-            return result
-        
-        def tracked_set(key, value, timeout=None, version=None):
-            return original_set(key, value, timeout, version)
-        
-        # Apply tracking
-        cache.get = tracked_get
-        cache.set = tracked_set
-        
-        try:
+        with track_cache_stats() as stats:
             response = self.get_response(request)
+        
+        total_operations = stats.total
+        if total_operations > 0:
+            efficiency = (stats.hits / total_operations) * 100
             
-            # Calculate cache efficiency
-            total_operations = cache_hits + cache_misses
-            if total_operations > 0:
-                efficiency = (cache_hits / total_operations) * 100
-                
-                # Add cache headers for debugging
-                if settings.DEBUG:
-                    response['X-Cache-Hits'] = str(cache_hits)
-                    response['X-Cache-Misses'] = str(cache_misses)
-                    response['X-Cache-Efficiency'] = f"{efficiency:.1f}%"
-                
-                # Log poor cache performance
-                if total_operations > 5 and efficiency < 50:
-                    logger.warning(
-                        f"LOW CACHE EFFICIENCY: {request.path} "
-                        f"- {efficiency:.1f}% ({cache_hits}/{total_operations})"
-                    )
+            # Add cache headers for debugging
+            if settings.DEBUG:
+                response['X-Cache-Hits'] = str(stats.hits)
+                response['X-Cache-Misses'] = str(stats.misses)
+                response['X-Cache-Efficiency'] = f"{efficiency:.1f}%"
             
-            return response
+            # Log poor cache performance
+            if total_operations > 5 and efficiency < 50:
+                logger.warning(
+                    f"LOW CACHE EFFICIENCY: {request.path} "
+                    f"- {efficiency:.1f}% ({stats.hits}/{total_operations})"
+                )
         
-        finally:
-            # Restore original methods
-            cache.get = original_get
-            cache.set = original_set
\ No newline at end of file
+        return response
@@ -0,0 +1,188 @@
+# query_budget.py - Per-endpoint query budgets and N+1 detection
+import hashlib
+import logging
+import os
+import random
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack
+from functools import wraps
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('crm.performance')
+
+# Raise instead of logging (enabled under the test runner)
+STRICT = getattr(settings, 'QUERY_BUDGET_STRICT', False)
+# Share of production requests inspected; the rest run uninstrumented
+SAMPLE_RATE = getattr(settings, 'QUERY_BUDGET_SAMPLE_RATE', 0.01)
+# Identical query shape from the same call site this many times is reported as N+1
+N_PLUS_ONE_THRESHOLD = getattr(settings, 'QUERY_BUDGET_N_PLUS_ONE_THRESHOLD', 3)
+
+STACK_DEPTH = 4
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+# Frameworks and request instrumentation never count as the call site
+_SKIPPED_MODULES = (
+    'django', 'rest_framework', 'crm.query_budget', 'crm.metrics',
+    'crm.performance_middleware', 'crm.cache_backends', 'crm.middleware', 'unittest',
+)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when an endpoint exceeds its budget or repeats a query"""
+
+
+def sql_shape(sql: str) -> str:
+    """Normalise SQL so queries differing only in IN-list length share a shape"""
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def _is_skipped(module: str) -> bool:
+    return any(module == name or module.startswith(name + '.') for name in _SKIPPED_MODULES)
+
+
+def stack_fingerprint() -> Tuple[str, ...]:
+    """The innermost application frames that issued the query"""
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None and len(frames) < STACK_DEPTH:
+        module = frame.f_globals.get('__name__', '')
+        filename = frame.f_code.co_filename
+        if not _is_skipped(module) and 'site-packages' not in filename:
+            frames.append(f"{os.path.basename(filename)}:{frame.f_lineno}")
+        frame = frame.f_back
+    return tuple(frames)
+
+
+def fingerprint_param(value) -> Tuple[str, bool]:
+    """
+    (digest, contains a LIKE wildcard) for a query parameter: enough for the
+    index advisor to tell constant from varying values without keeping them
+    """
+    text = str(value)
+    return hashlib.sha1(repr(value).encode()).hexdigest()[:16], '%' in text or '_' in text
+
+
+class QueryInspector:
+    """execute_wrapper hook recording each query's shape and call site"""
+
+    def __init__(self, keep_params: bool = False):
+        self.count = 0
+        self.shapes = Counter()
+        # Fingerprints of the last parameters per shape, for the index advisor's
+        # constant-predicate detection; the values themselves are not kept
+        self.keep_params = keep_params
+        self.params = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        shape = sql_shape(sql)
+        self.shapes[(shape, stack_fingerprint())] += 1
+        if self.keep_params and not many and shape == sql and params is not None:
+            self.params[shape] = tuple(fingerprint_param(value) for value in params)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+
+    def repeated(self, threshold: int = None) -> List[Tuple[str, Tuple[str, ...], int]]:
+        threshold = threshold or N_PLUS_ONE_THRESHOLD
+        return [
+            (shape, fingerprint, count)
+            for (shape, fingerprint), count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+    def problems(self, budget: Optional[int]) -> List[str]:
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f"{self.count} queries exceed the budget of {budget}")
+        for shape, fingerprint, count in self.repeated():
+            location = ' <- '.join(fingerprint) or 'library code'
+            problems.append(f"N+1: {count}x {shape[:200]} at {location}")
+        return problems
+
+
+def report(label: str, problems: List[str]):
+    if not problems:
+        return
+    message = f"Query budget violation in {label}: " + '; '.join(problems)
+    if STRICT:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def should_inspect() -> bool:
+    return STRICT or random.random() < SAMPLE_RATE
+
+
+def new_inspector() -> QueryInspector:
+    from . import index_advisor
+    return QueryInspector(keep_params=index_advisor.CAPTURE)
+
+
+def record(inspector: QueryInspector):
+    """Hand a sampled request's query shapes to the index advisor when capture is on"""
+    if inspector.keep_params:
+        from . import index_advisor
+        index_advisor.record_shapes(inspector)
+
+
+class QueryBudgetMixin:
+    """
+    Enforce a query budget on a DRF view.
+
+    Declare `query_budget` as an int for every action, or a dict keyed by
+    action name (`{'list': 3, 'retrieve': 2}`). Actions without a budget are
+    still checked for N+1 patterns. Counting starts after authentication and
+    permission checks, so budgets don't depend on the auth backend.
+    """
+
+    query_budget = None
+    _query_inspector = None
+
+    def get_query_budget(self) -> Optional[int]:
+        budget = self.query_budget
+        if isinstance(budget, dict):
+            return budget.get(getattr(self, 'action', None))
+        return budget
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if should_inspect():
+            self._query_inspector = new_inspector().__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        inspector, self._query_inspector = self._query_inspector, None
+        if inspector is not None:
+            inspector.__exit__(None, None, None)
+            label = f"{type(self).__name__}.{getattr(self, 'action', None) or request.method.lower()}"
+            record(inspector)
+            report(label, inspector.problems(self.get_query_budget()))
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def query_budget(max_queries: Optional[int] = None):
+    """Decorator applying the same checks to a plain function view"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not should_inspect():
+                return func(*args, **kwargs)
+            with new_inspector() as inspector:
+                result = func(*args, **kwargs)
+            record(inspector)
+            report(func.__qualname__, inspector.problems(max_queries))
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,127 @@
+# rate_limit.py - Atomic GCRA rate limiting backed by Redis, with an in-process fallback
+import logging
+import math
+import threading
+import time
+from typing import NamedTuple, Optional
+
+
+logger = logging.getLogger('crm.security')
+
+KEY_PREFIX = 'crm:rate_limit'
+
+# GCRA: one key per client holding its theoretical arrival time (TAT).
+# Evaluated server-side so check-and-update is atomic and costs one round-trip;
+# the key expires exactly when the client is back to a full allowance. The
+# server clock (TIME) is used so workers with skewed clocks agree.
+GCRA_SCRIPT = """
+if redis.replicate_commands then
+    redis.replicate_commands()
+end
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local interval = period / limit
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+
+if allow_at > now then
+    return {0, 0, tostring(allow_at - now), tostring(tat - now)}
+end
+
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, math.floor((now - allow_at) / interval), '0', tostring(new_tat - now)}
+"""
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # seconds until the next request is allowed (0 when allowed)
+    reset_after: float  # seconds until the full allowance is restored
+
+
+class LocalRateLimiter:
+    """
+    Same GCRA algorithm held in process memory.
+
+    Used for SQLite/dev setups without Redis (and while Redis is unreachable);
+    limits are then enforced per worker process rather than globally.
+    """
+
+    PRUNE_EVERY = 10000
+
+    def __init__(self):
+        self._tats = {}
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def hit(self, key: str, limit: int, period: int) -> RateLimitResult:
+        interval = period / limit
+        with self._lock:
+            now = time.monotonic()
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0:
+                self._tats = {k: tat for k, tat in self._tats.items() if tat > now}
+
+            tat = max(self._tats.get(key, now), now)
+            new_tat = tat + interval
+            allow_at = new_tat - period
+            if allow_at > now:
+                return RateLimitResult(False, limit, 0, allow_at - now, tat - now)
+            self._tats[key] = new_tat
+            return RateLimitResult(True, limit, math.floor((now - allow_at) / interval), 0.0, new_tat - now)
+
+
+class RedisRateLimiter:
+    """GCRA evaluated by a Lua script, shared by every worker"""
+
+    def __init__(self, connection):
+        self.script = connection.register_script(GCRA_SCRIPT)
+
+    def hit(self, key: str, limit: int, period: int) -> RateLimitResult:
+        allowed, remaining, retry_after, reset_after = self.script(keys=[key], args=[limit, period])
+        return RateLimitResult(bool(allowed), limit, int(remaining), float(retry_after), float(reset_after))
+
+
+class RateLimiter:
+    """Uses Redis when the default cache is django_redis, otherwise the in-process limiter"""
+
+    def __init__(self):
+        self.local = LocalRateLimiter()
+        self._redis = None
+
+    @property
+    def redis(self) -> Optional[RedisRateLimiter]:
+        if self._redis is None:
+            from .cache_backends import uses_redis
+            if not uses_redis():
+                return None
+            try:
+                from django_redis import get_redis_connection
+                self._redis = RedisRateLimiter(get_redis_connection('default'))
+            except Exception as e:
+                logger.warning(f"Redis rate limiter unavailable: {e}")
+                return None
+        return self._redis
+
+    def hit(self, key: str, limit: int, period: int) -> RateLimitResult:
+        """Count one request against key; at most `limit` requests per `period` seconds"""
+        key = f"{KEY_PREFIX}:{key}"
+        backend = self.redis
+        if backend is not None:
+            try:
+                return backend.hit(key, limit, period)
+            except Exception as e:
+                logger.error(f"Redis rate limit check failed, using local limiter: {e}")
+        return self.local.hit(key, limit, period)
+
+
+rate_limiter = RateLimiter()
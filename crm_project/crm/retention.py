@@ -0,0 +1,75 @@
+# retention.py - Chunked, lock-friendly deletes for log table retention
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.deletion import Collector
+
+logger = logging.getLogger('crm.performance')
+
+DELETE_BATCH_SIZE = getattr(settings, 'RETENTION_DELETE_BATCH_SIZE', 1000)
+DELETE_SLEEP = getattr(settings, 'RETENTION_DELETE_SLEEP', 0.1)
+DELETE_TIME_BUDGET = getattr(settings, 'RETENTION_TIME_BUDGET', 300)
+
+
+def delete_in_batches(queryset, batch_size: int = None, sleep: float = None,
+                      time_budget: Optional[float] = None,
+                      progress: Optional[Callable[[int, int], None]] = None) -> Dict:
+    """
+    Delete the rows of a queryset in primary-key batches.
+
+    Each batch selects up to batch_size primary keys and removes them with one
+    DELETE ... WHERE pk IN (...), so locks are held per batch rather than for
+    the whole purge and no model instances are built. Models with cascades or
+    delete signals go through the regular collector, one batch at a time.
+    Sleeps between batches and stops once time_budget seconds have elapsed;
+    the next run carries on where this one stopped.
+    """
+    batch_size = batch_size or DELETE_BATCH_SIZE
+    sleep = DELETE_SLEEP if sleep is None else sleep
+    time_budget = DELETE_TIME_BUDGET if time_budget is None else time_budget
+
+    model = queryset.model
+    using = queryset.db
+    fast = Collector(using=using).can_fast_delete(queryset)
+    pending = queryset.order_by().values_list('pk', flat=True)
+
+    deleted = 0
+    batches = 0
+    complete = False
+    started = time.monotonic()
+
+    while True:
+        pks = list(pending[:batch_size])
+        if not pks:
+            complete = True
+            break
+
+        batch = model._base_manager.using(using).filter(pk__in=pks)
+        with transaction.atomic(using=using):
+            if fast:
+                deleted += batch._raw_delete(using)
+            else:
+                deleted += batch.delete()[1].get(model._meta.label, 0)
+        batches += 1
+
+        if progress:
+            progress(deleted, batches)
+        logger.debug(f"Retention purge of {model._meta.db_table}: {deleted} rows after {batches} batches")
+
+        if len(pks) < batch_size:
+            complete = True
+            break
+        if time_budget and time.monotonic() - started >= time_budget:
+            break
+        if sleep:
+            time.sleep(sleep)
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Retention purge of {model._meta.db_table}: deleted {deleted} rows in {batches} batches "
+        f"({elapsed:.1f}s{'' if complete else ', time budget reached'})"
+    )
+    return {'deleted': deleted, 'batches': batches, 'elapsed': elapsed, 'complete': complete}
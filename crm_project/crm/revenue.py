@@ -0,0 +1,154 @@
+# revenue.py - Incremental revenue rollups for Stripe payments
+import logging
+from datetime import date
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_DIMENSIONS = ('source_account', 'currency', 'plan_name', 'site')
+ROLLUP_MEASURES = ('payment_count', 'amount', 'converted_amount', 'amount_refunded', 'fee')
+
+
+def _decimal_sum(field):
+    return Coalesce(Sum(field), Value(0), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _default_models():
+    from .models import StripePayment, StripeRevenueRollup
+    return StripePayment, StripeRevenueRollup
+
+
+def refresh_revenue_rollups(days: Iterable[date], payment_model=None, rollup_model=None) -> int:
+    """
+    Recompute daily rollups for the given days and the monthly rollups containing them.
+
+    Only the touched days are re-aggregated from the payments table, so an
+    import of one week of payments never rescans earlier history. Returns the
+    number of daily rollup rows written.
+    """
+    if payment_model is None or rollup_model is None:
+        payment_model, rollup_model = _default_models()
+
+    days = sorted(set(days))
+    if not days:
+        return 0
+
+    daily_rows = (
+        payment_model.objects.filter(status='paid', payment_date__date__in=days)
+        .annotate(period_start=TruncDate('payment_date'))
+        .values('period_start', *ROLLUP_DIMENSIONS)
+        .annotate(
+            payment_count=Count('id'),
+            amount_total=_decimal_sum('amount'),
+            converted_total=_decimal_sum('converted_amount'),
+            refunded_total=_decimal_sum('amount_refunded'),
+            fee_total=_decimal_sum('fee'),
+        )
+        .order_by()
+    )
+    daily_rollups = [
+        rollup_model(
+            granularity='day',
+            period_start=row['period_start'],
+            payment_count=row['payment_count'],
+            amount=row['amount_total'],
+            converted_amount=row['converted_total'],
+            amount_refunded=row['refunded_total'],
+            fee=row['fee_total'],
+            **{dim: row[dim] or '' for dim in ROLLUP_DIMENSIONS},
+        )
+        for row in daily_rows
+    ]
+
+    months = sorted({_month_start(day) for day in days})
+
+    with transaction.atomic():
+        rollup_model.objects.filter(granularity='day', period_start__in=days).delete()
+        rollup_model.objects.bulk_create(daily_rollups)
+
+        monthly_rows = (
+            rollup_model.objects.filter(
+                granularity='day',
+                period_start__gte=months[0],
+            )
+            .annotate(month=TruncMonth('period_start'))
+            .filter(month__in=months)
+            .values('month', *ROLLUP_DIMENSIONS)
+            .annotate(
+                count_total=Sum('payment_count'),
+                amount_total=_decimal_sum('amount'),
+                converted_total=_decimal_sum('converted_amount'),
+                refunded_total=_decimal_sum('amount_refunded'),
+                fee_total=_decimal_sum('fee'),
+            )
+            .order_by()
+        )
+        monthly_rollups = [
+            rollup_model(
+                granularity='month',
+                period_start=row['month'],
+                payment_count=row['count_total'],
+                amount=row['amount_total'],
+                converted_amount=row['converted_total'],
+                amount_refunded=row['refunded_total'],
+                fee=row['fee_total'],
+                **{dim: row[dim] for dim in ROLLUP_DIMENSIONS},
+            )
+            for row in monthly_rows
+        ]
+        rollup_model.objects.filter(granularity='month', period_start__in=months).delete()
+        rollup_model.objects.bulk_create(monthly_rollups)
+
+    logger.info(f"Refreshed revenue rollups for {len(days)} days / {len(months)} months")
+    return len(daily_rollups)
+
+
+def rebuild_revenue_rollups(payment_model=None, rollup_model=None) -> int:
+    """Drop and rebuild every rollup from the payments table (backfill/repair)"""
+    if payment_model is None or rollup_model is None:
+        payment_model, rollup_model = _default_models()
+
+    days = (
+        payment_model.objects.filter(status='paid')
+        .annotate(day=TruncDate('payment_date'))
+        .values_list('day', flat=True)
+        .distinct()
+        .order_by()
+    )
+    with transaction.atomic():
+        rollup_model.objects.all().delete()
+        return refresh_revenue_rollups(list(days), payment_model, rollup_model)
+
+
+def revenue_totals(granularity: str = 'month', start: Optional[date] = None, end: Optional[date] = None, **filters):
+    """Sum rollups per period for charting, optionally restricted to a date range and dimensions"""
+    _, rollup_model = _default_models()
+
+    queryset = rollup_model.objects.filter(granularity=granularity)
+    if start:
+        queryset = queryset.filter(period_start__gte=start)
+    if end:
+        queryset = queryset.filter(period_start__lte=end)
+    dimension_filters = {dim: value for dim, value in filters.items() if dim in ROLLUP_DIMENSIONS and value}
+    if dimension_filters:
+        queryset = queryset.filter(**dimension_filters)
+
+    return (
+        queryset.values('period_start')
+        .annotate(
+            payment_count=Sum('payment_count'),
+            amount=_decimal_sum('amount'),
+            converted_amount=_decimal_sum('converted_amount'),
+            amount_refunded=_decimal_sum('amount_refunded'),
+            fee=_decimal_sum('fee'),
+        )
+        .order_by('period_start')
+    )
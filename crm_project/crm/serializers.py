@@ -1,23 +1,165 @@
 # serializers.py
+from functools import lru_cache
+
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import Customer, Course, Enrollment, Conference, ConferenceRegistration, CommunicationLog
+from .models import Customer, CustomerProfile, Course, Enrollment, Conference, ConferenceRegistration, CommunicationLog, StripeRevenueRollup
+
+
+class SparseFieldsetMixin:
+    """
+    Limit output to the fields named in `?fields=a,b,c`.
+
+    Unknown names are ignored; if none of them match, every field is kept.
+    The filtering is skipped for writes so validation still sees all fields.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get('request'))
+        if not requested:
+            return
+        kept = [name for name in self.fields if name in requested]
+        if kept:
+            for name in set(self.fields) - set(kept):
+                self.fields.pop(name)
+
+
+def requested_fields(request):
+    """Field names from a read request's `?fields=` parameter (empty when absent)"""
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return set()
+    raw = request.query_params.get('fields', '')
+    return {name.strip() for name in raw.split(',') if name.strip()}
+
+
+class CustomerProfileFieldsSerializer(serializers.ModelSerializer):
+    """Fields for the CustomerProfile columns, which CustomerSerializer exposes flat"""
 
-class CustomerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomerProfile
+        fields = Customer.PROFILE_FIELDS
+
+
+class CustomerSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = '__all__'
         read_only_fields = ('id', 'created_at', 'updated_at')
 
+    def get_fields(self):
+        # Read and written through the same-named Customer properties
+        fields = super().get_fields()
+        fields.update(CustomerProfileFieldsSerializer().get_fields())
+        return fields
+
+    def save(self, **kwargs):
+        """Duplicate emails/handles are caught by the database, not a lookup before every write"""
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError as e:
+            errors = Customer.unique_violation(e)
+            if errors is None:
+                raise
+            raise serializers.ValidationError(errors)
+
+
+class CustomerListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Compact representation for list pages (the detail view returns every field)"""
+
+    customer_type_display = serializers.CharField(source='get_customer_type_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = Customer
+        fields = (
+            'id', 'first_name', 'last_name', 'preferred_name', 'email_primary', 'phone_primary',
+            'company_primary', 'customer_type', 'customer_type_display', 'status', 'status_display',
+            'country_region', 'created_at', 'updated_at',
+        )
+        read_only_fields = fields
+
+
+# DRF fields whose representation of a values() column is the value itself
+_PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.ChoiceField, serializers.BooleanField, serializers.IntegerField,
+)
+
+
+@lru_cache(maxsize=256)
+def _values_plan(serializer_class, field_names):
+    """
+    (columns, [(name, column, convert, missing)]) for serialising values()
+    rows, or None when a field needs a model instance (relations, method
+    fields...). `missing` replaces NULL, e.g. for a customer without a profile.
+
+    Built once per serializer/field combination: the choice-display map and
+    the converter for each column are looked up here, not per row.
+    """
+    serializer = serializer_class()
+    model = serializer.Meta.model
+    concrete = {f.name: f for f in model._meta.concrete_fields if not f.is_relation}
+    profile_fields = getattr(model, 'PROFILE_FIELDS', ())
+    columns, plan = [], []
+    for name in field_names:
+        field = serializer.fields[name]
+        source = field.source
+        missing = None
+        if source in concrete:
+            if isinstance(field, _PASSTHROUGH_FIELDS) and not isinstance(field, serializers.MultipleChoiceField):
+                convert = None
+            else:
+                convert = field.to_representation
+            column = source
+        elif source.startswith('get_') and source.endswith('_display') and source[4:-8] in concrete:
+            column = source[4:-8]
+            displays = {value: str(label) for value, label in concrete[column].flatchoices}
+            convert = lambda value, displays=displays: displays.get(value, value)
+        elif source in profile_fields:
+            # Joined from the one-to-one profile; NULL when the customer has no profile row
+            column, convert, missing = f'profile__{source}', None, ''
+        else:
+            return None
+        if column not in columns:
+            columns.append(column)
+        plan.append((name, column, convert, missing))
+    return tuple(columns), tuple(plan)
+
+
+def values_plan(serializer):
+    """The values() fast-path plan for a (possibly sparse) serializer instance"""
+    return _values_plan(type(serializer), tuple(serializer.fields))
+
+
+def serialize_values(rows, plan):
+    """Render values() dicts as the serializer would, without building model instances"""
+    _, fields = plan
+    data = []
+    for row in rows:
+        item = {}
+        for name, column, convert, missing in fields:
+            value = row[column]
+            if value is None:
+                item[name] = missing
+            else:
+                item[name] = value if convert is None else convert(value)
+        data.append(item)
+    return data
+
+
 class CourseSerializer(serializers.ModelSerializer):
     enrolled_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Course
-        fields = '__all__'
+        # The enrollment_count counter is served as enrolled_count
+        exclude = ('enrollment_count',)
         read_only_fields = ('id', 'created_at')
     
     def get_enrolled_count(self, obj):
-        return obj.enrollment_set.filter(status__in=['registered', 'confirmed']).count()
+        # Annotated by CourseViewSet; otherwise the signal-maintained counter
+        return getattr(obj, 'active_enrollments', obj.enrollment_count)
 
 class EnrollmentSerializer(serializers.ModelSerializer):
     customer_name = serializers.CharField(source='customer.first_name', read_only=True)
@@ -33,11 +175,13 @@ class ConferenceSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Conference
-        fields = '__all__'
+        # The registration_count counter is served as registered_count
+        exclude = ('registration_count',)
         read_only_fields = ('id', 'created_at')
     
     def get_registered_count(self, obj):
-        return obj.conferenceregistration_set.count()
+        # Annotated by ConferenceViewSet; otherwise the signal-maintained counter
+        return getattr(obj, 'registrations', obj.registration_count)
 
 class CommunicationLogSerializer(serializers.ModelSerializer):
     customer_name = serializers.CharField(source='customer.first_name', read_only=True)
@@ -46,3 +190,8 @@ class CommunicationLogSerializer(serializers.ModelSerializer):
         model = CommunicationLog
         fields = '__all__'
         read_only_fields = ('id', 'sent_at')
+
+class StripeRevenueRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StripeRevenueRollup
+        exclude = ('id',)
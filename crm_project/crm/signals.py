@@ -0,0 +1,71 @@
+# signals.py - Keep denormalised participant counters and collection versions in sync
+import logging
+
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache_utils import run_or_defer
+from .conditional import bump_collection_version
+
+logger = logging.getLogger(__name__)
+
+
+def _count_subquery(queryset, field):
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def refresh_enrollment_counts(course_ids=None, course_model=None, enrollment_model=None):
+    """Recount active enrollments in one UPDATE (all courses when course_ids is None)"""
+    from .models import Course, Enrollment
+    course_model = course_model or Course
+    enrollment_model = enrollment_model or Enrollment
+
+    courses = course_model.objects.all()
+    if course_ids is not None:
+        courses = courses.filter(pk__in=course_ids)
+    active = enrollment_model.objects.filter(status__in=Enrollment.ACTIVE_STATUSES)
+    return courses.update(enrollment_count=_count_subquery(active, 'course'))
+
+
+def refresh_registration_counts(conference_ids=None, conference_model=None, registration_model=None):
+    """Recount conference registrations in one UPDATE (all conferences when conference_ids is None)"""
+    from .models import Conference, ConferenceRegistration
+    conference_model = conference_model or Conference
+    registration_model = registration_model or ConferenceRegistration
+
+    conferences = conference_model.objects.all()
+    if conference_ids is not None:
+        conferences = conferences.filter(pk__in=conference_ids)
+    return conferences.update(registration_count=_count_subquery(registration_model.objects.all(), 'conference'))
+
+
+@receiver([post_save, post_delete], sender='crm.Enrollment')
+def update_enrollment_count(sender, instance, **kwargs):
+    """Recount the course's active enrollments (status changes move the count too)"""
+    refresh_enrollment_counts([instance.course_id])
+    bump_collection_version('courses')
+
+
+@receiver([post_save, post_delete], sender='crm.ConferenceRegistration')
+def update_registration_count(sender, instance, **kwargs):
+    refresh_registration_counts([instance.conference_id])
+
+
+@receiver([post_save, post_delete], sender='crm.Customer')
+def bump_customer_version(sender, **kwargs):
+    run_or_defer('customer_version', lambda: bump_collection_version('customers'))
+
+
+@receiver(post_delete, sender='crm.Customer')
+def record_customer_tombstone(sender, instance, **kwargs):
+    """Deletions are published by the change feed (changes.py)"""
+    from .models import CustomerTombstone
+    CustomerTombstone.objects.create(customer_id=instance.pk)
+
+
+@receiver([post_save, post_delete], sender='crm.Course')
+def bump_course_version(sender, **kwargs):
+    bump_collection_version('courses')
@@ -0,0 +1,204 @@
+# stripe_import.py - Batched importer for Stripe payment CSV exports
+import csv
+import logging
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List
+
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from .models import Activity, Customer, StripePayment
+from .revenue import refresh_revenue_rollups
+from .uploads import open_text
+
+logger = logging.getLogger(__name__)
+
+
+class StripePaymentImporter:
+    """
+    Import Stripe payment exports in chunks.
+
+    Each chunk costs two lookup queries (existing payment IDs and matching
+    customer emails) plus one bulk INSERT, instead of three queries per row.
+    The upload is decoded as a stream so large exports are never held in
+    memory as both bytes and text. Revenue rollups are refreshed for the
+    days that received new paid payments.
+    """
+
+    CHUNK_SIZE = 1000
+
+    STATUS_MAP = {
+        'Paid': 'paid',
+        'Failed': 'failed',
+        'canceled': 'canceled',
+        'Refunded': 'refunded',
+    }
+
+    def __init__(self, source_account: str = 'unknown', chunk_size: int = None):
+        self.source_account = source_account
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.imported = 0
+        self.skipped = 0
+        self.errors = []
+        self.touched_days = set()
+
+    def open_reader(self, uploaded_file, encoding: str = None) -> csv.DictReader:
+        """Wrap the binary upload in a streaming text reader (encoding detected incrementally)"""
+        return csv.DictReader(open_text(uploaded_file, encoding))
+
+    def parse_row(self, row: Dict[str, str]) -> StripePayment:
+        """Build an unsaved StripePayment from a CSV row (customer is resolved later)"""
+        amount = Decimal(row.get('Amount', '0') or '0')
+        amount_refunded = Decimal(row.get('Amount Refunded', '0') or '0')
+        converted_amount = Decimal(row.get('Converted Amount', '0') or '0') if row.get('Converted Amount') else None
+        fee = Decimal(row.get('Fee', '0') or '0')
+
+        # payment_date is NOT NULL: a row without one is a row error, not a silently dropped INSERT
+        date_str = (row.get('Created date (UTC)') or '').strip()
+        if not date_str:
+            raise ValueError(f"Missing payment date for {row.get('id', '').strip()}")
+        payment_date = datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S').replace(tzinfo=dt_timezone.utc)
+
+        raw_status = row.get('Status', 'pending')
+
+        return StripePayment(
+            stripe_id=row.get('id', '').strip(),
+            amount=amount,
+            amount_refunded=amount_refunded,
+            currency=row.get('Currency', 'usd').lower(),
+            converted_amount=converted_amount,
+            converted_currency=row.get('Converted Currency', '').lower(),
+            status=self.STATUS_MAP.get(raw_status, 'pending'),
+            customer_email=row.get('Customer Email', ''),
+            stripe_customer_id=row.get('Customer ID', ''),
+            site=row.get('1. Site (metadata)', '') or row.get('site (metadata)', ''),
+            plan_name=row.get('stripe_plan (metadata)', ''),
+            plan_days=int(row.get('plan_days (metadata)', 0) or 0) if row.get('plan_days (metadata)') else None,
+            user_name=row.get('3. User name (metadata)', '') or row.get('2. User email (metadata)', ''),
+            fee=fee,
+            payment_date=payment_date,
+            source_account=self.source_account,
+            raw_data=dict(row),
+        )
+
+    def import_rows(self, rows: Iterable[Dict[str, str]]) -> Dict[str, Any]:
+        """Import an iterable of CSV rows chunk by chunk"""
+        seen_ids = set()
+        chunk = []
+
+        for row in rows:
+            stripe_id = (row.get('id') or '').strip()
+            if not stripe_id or stripe_id in seen_ids:
+                self.skipped += 1
+                continue
+            seen_ids.add(stripe_id)
+            chunk.append(row)
+
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+
+        if chunk:
+            self._import_chunk(chunk)
+
+        if self.touched_days:
+            refresh_revenue_rollups(self.touched_days)
+
+        return self.get_stats()
+
+    def import_file(self, uploaded_file, performed_by: str = 'system') -> Dict[str, Any]:
+        """Import an uploaded CSV file and record a single summary activity"""
+        reader = self.open_reader(uploaded_file)
+        stats = self.import_rows(reader)
+
+        Activity.log(
+            activity_type='import_completed',
+            title=f'Stripe Import: {self.imported} payments',
+            description=f'Imported {self.imported} payments from {self.source_account}, skipped {self.skipped}',
+            metadata={
+                'source_account': self.source_account,
+                'imported': self.imported,
+                'skipped': self.skipped,
+                'errors': len(self.errors),
+            },
+            performed_by=performed_by,
+        )
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'imported': self.imported,
+            'skipped': self.skipped,
+            'errors': self.errors,
+        }
+
+    def _import_chunk(self, rows: List[Dict[str, str]]):
+        """Dedupe a chunk against the database, match customers and bulk insert it"""
+        stripe_ids = [row['id'].strip() for row in rows]
+        existing_ids = set(
+            StripePayment.objects.filter(stripe_id__in=stripe_ids).values_list('stripe_id', flat=True)
+        )
+
+        emails = {
+            (row.get('Customer Email') or '').strip().lower()
+            for row in rows
+        }
+        emails.discard('')
+        customers_by_email = self._customer_ids_by_email(emails)
+
+        payments = []
+        for row in rows:
+            if row['id'].strip() in existing_ids:
+                self.skipped += 1
+                continue
+            try:
+                payment = self.parse_row(row)
+            except Exception as e:
+                self.errors.append(f"Row error: {str(e)}")
+                continue
+            payment.customer_id = customers_by_email.get(payment.customer_email.strip().lower())
+            payments.append(payment)
+            if payment.status == 'paid':
+                self.touched_days.add(payment.payment_date.date())
+
+        if not payments:
+            return
+
+        try:
+            with transaction.atomic():
+                StripePayment.objects.bulk_create(payments, batch_size=self.chunk_size)
+        except IntegrityError:
+            # A concurrent import inserted some of these IDs since the lookup
+            # above: retry row by row so exactly those are skipped
+            self._insert_row_by_row(payments)
+        else:
+            self.imported += len(payments)
+
+    def _insert_row_by_row(self, payments: List[StripePayment]):
+        for payment in payments:
+            try:
+                with transaction.atomic():
+                    payment.save(force_insert=True)
+            except IntegrityError:
+                if not StripePayment.objects.filter(stripe_id=payment.stripe_id).exists():
+                    raise
+                self.skipped += 1
+            else:
+                self.imported += 1
+
+    def _customer_ids_by_email(self, emails) -> Dict[str, Any]:
+        """Map lower-cased emails to customer IDs, newest customer first (as .first() did)"""
+        if not emails:
+            return {}
+
+        matches = (
+            Customer.objects.annotate(email_lower=Lower('email_primary'))
+            .filter(email_lower__in=emails)
+            .order_by('-created_at')
+            .values_list('email_lower', 'id')
+        )
+        customers_by_email = {}
+        for email, customer_id in matches:
+            customers_by_email.setdefault(email, customer_id)
+        return customers_by_email
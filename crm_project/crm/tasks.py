@@ -1,9 +1,14 @@
 # tasks.py
 # from celery import shared_task  # Temporarily disabled
+from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
-from .models import Customer, Course, Enrollment, CommunicationLog
+from .models import Customer, Course, Enrollment, CommunicationLog, Activity
 from .communication_services import CommunicationManager
+from .partitioning import archive_partitions, ensure_partitions
+from .retention import delete_in_batches
+from .changes import purge_tombstones
+from .monitoring import refresh_diagnostics
 import logging
 
 logger = logging.getLogger(__name__)
@@ -86,13 +91,51 @@ def send_weekly_newsletter():
 
 # @shared_task  # Temporarily disabled
 def cleanup_old_communication_logs():
-    """Clean up communication logs older than 6 months"""
-    cutoff_date = timezone.now() - timedelta(days=180)
-    deleted_count = CommunicationLog.objects.filter(
-        sent_at__lt=cutoff_date
-    ).delete()[0]
-    
-    return f"Deleted {deleted_count} old communication logs"
+    """Clean up communication logs older than the retention period (6 months)"""
+    archived, result = _purge_log_table(CommunicationLog, 'sent_at')
+    return f"Archived {len(archived)} partitions, deleted {result['deleted']} old communication logs"
+
+# @shared_task  # Temporarily disabled
+def cleanup_old_activities():
+    """Clean up activity entries older than the retention period"""
+    archived, result = _purge_log_table(Activity, 'created_at')
+    return f"Archived {len(archived)} partitions, deleted {result['deleted']} old activities"
+
+def _purge_log_table(model, date_field):
+    """Archive cold partitions, then delete the remaining expired rows in batches"""
+    cutoff_date = timezone.now() - timedelta(days=settings.LOG_RETENTION_DAYS)
+
+    # Whole cold months are exported and dropped as partitions; without
+    # partitioning (SQLite, older PostgreSQL) every expired row goes through
+    # the batched delete instead
+    archived = archive_partitions(
+        cutoff_date,
+        export_dir=settings.LOG_ARCHIVE_DIR,
+        tables=[model._meta.db_table],
+    )
+
+    result = delete_in_batches(model.objects.filter(**{f'{date_field}__lt': cutoff_date}))
+    if not result['complete']:
+        logger.warning(f"{model._meta.db_table} retention stopped at its time budget; the next run will continue")
+    return archived, result
+
+# @shared_task  # Temporarily disabled
+def cleanup_customer_tombstones():
+    """Drop change-feed tombstones past CHANGE_FEED_TOMBSTONE_DAYS"""
+    result = purge_tombstones()
+    return f"Deleted {result['deleted']} customer tombstones"
+
+# @shared_task  # Temporarily disabled
+def refresh_health_diagnostics():
+    """Recompute the cached /health/ diagnostics (schedule at HEALTH_DIAGNOSTICS_MAX_AGE)"""
+    results = refresh_diagnostics()
+    return f"Health diagnostics refreshed: {results['overall_status']}"
+
+# @shared_task  # Temporarily disabled
+def ensure_log_partitions():
+    """Create upcoming monthly partitions for the log tables (run monthly)"""
+    created = ensure_partitions()
+    return f"Created {len(created)} log partitions"
 
 # @shared_task  # Temporarily disabled
 def send_welcome_message_task(customer_id):
@@ -464,3 +464,1575 @@ class IntegrationTest(TestCase):
         content = response.content.decode('utf-8')
         self.assertIn('Integration', content)
         self.assertIn('integration@example.com', content)
+
+
+class StripeImportTest(TestCase):
+    """Test batched Stripe CSV import"""
+    
+    CSV_HEADER = 'id,Created date (UTC),Amount,Currency,Converted Amount,Converted Currency,Fee,Status,Customer Email\n'
+    
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name='Stripe',
+            last_name='Payer',
+            email_primary='payer@example.com',
+            customer_type='individual'
+        )
+    
+    def _upload(self, rows):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        content = self.CSV_HEADER + ''.join(rows)
+        return SimpleUploadedFile('payments.csv', content.encode('utf-8'), content_type='text/csv')
+    
+    def test_import_dedupes_and_matches_customers(self):
+        """Existing and repeated IDs are skipped; emails match case-insensitively"""
+        from .models import StripePayment, Activity
+        from .stripe_import import StripePaymentImporter
+        
+        StripePayment.objects.create(
+            stripe_id='ch_existing', amount=1, currency='usd',
+            payment_date=timezone.now()
+        )
+        upload = self._upload([
+            'ch_1,2025-04-15 13:26:22,90.00,cny,93.52,hkd,6.00,Paid,PAYER@example.com\n',
+            'ch_1,2025-04-15 13:26:22,90.00,cny,93.52,hkd,6.00,Paid,PAYER@example.com\n',
+            'ch_existing,2025-04-15 13:26:22,10.00,usd,,,0,Paid,\n',
+            ',2025-04-15 13:26:22,10.00,usd,,,0,Paid,\n',
+            'ch_2,2025-04-16 09:00:00,15.00,usd,,,0,Failed,unknown@example.com\n',
+        ])
+        
+        importer = StripePaymentImporter(source_account='ki', chunk_size=2)
+        stats = importer.import_file(upload, performed_by='tester')
+        
+        self.assertEqual(stats['imported'], 2)
+        self.assertEqual(stats['skipped'], 3)
+        self.assertEqual(stats['errors'], [])
+        self.assertEqual(StripePayment.objects.get(stripe_id='ch_1').customer, self.customer)
+        self.assertIsNone(StripePayment.objects.get(stripe_id='ch_2').customer)
+        self.assertEqual(StripePayment.objects.get(stripe_id='ch_2').status, 'failed')
+        self.assertEqual(Activity.objects.filter(activity_type='import_completed').count(), 1)
+    
+    def test_rows_without_a_valid_date_are_row_errors(self):
+        """payment_date is required: blank or malformed dates are reported, never counted as imported"""
+        from .models import StripePayment
+        from .stripe_import import StripePaymentImporter
+        
+        upload = self._upload([
+            'ch_ok,2025-04-15 13:26:22,90.00,cny,93.52,hkd,6.00,Paid,\n',
+            'ch_blank,,10.00,usd,,,0,Paid,\n',
+            'ch_bad,15/04/2025,10.00,usd,,,0,Paid,\n',
+        ])
+        stats = StripePaymentImporter(source_account='ki').import_file(upload)
+        
+        self.assertEqual(stats['imported'], 1)
+        self.assertEqual(len(stats['errors']), 2)
+        self.assertIn('ch_blank', stats['errors'][0])
+        self.assertEqual(list(StripePayment.objects.values_list('stripe_id', flat=True)), ['ch_ok'])
+
+    def test_ids_inserted_concurrently_are_skipped_not_counted(self):
+        """A payment another import writes after the duplicate lookup is skipped; the rest are counted exactly"""
+        from .models import StripePayment
+        from .stripe_import import StripePaymentImporter
+
+        def race(emails):
+            StripePayment.objects.create(stripe_id='ch_race', amount=1, currency='usd', payment_date=timezone.now())
+            return {}
+
+        upload = self._upload([
+            'ch_race,2025-04-15 13:26:22,90.00,cny,93.52,hkd,6.00,Paid,\n',
+            'ch_mine,2025-04-15 13:26:22,10.00,usd,,,0,Paid,\n',
+        ])
+        importer = StripePaymentImporter(source_account='ki')
+        with patch.object(importer, '_customer_ids_by_email', side_effect=race):
+            stats = importer.import_file(upload)
+
+        self.assertEqual((stats['imported'], stats['skipped']), (1, 1))
+        self.assertEqual(StripePayment.objects.filter(stripe_id='ch_mine').count(), 1)
+
+    def test_import_refreshes_revenue_rollups(self):
+        """Paid payments are rolled up per day and month on import"""
+        from .models import StripeRevenueRollup
+        from .stripe_import import StripePaymentImporter
+        
+        upload = self._upload([
+            'ch_a,2025-04-15 13:26:22,90.00,cny,93.52,hkd,6.00,Paid,\n',
+            'ch_b,2025-04-15 18:00:00,10.00,cny,10.40,hkd,1.00,Paid,\n',
+            'ch_c,2025-04-20 09:00:00,50.00,cny,52.00,hkd,2.00,Paid,\n',
+            'ch_d,2025-04-21 09:00:00,50.00,cny,52.00,hkd,2.00,Failed,\n',
+        ])
+        StripePaymentImporter(source_account='ki').import_file(upload)
+        
+        daily = StripeRevenueRollup.objects.get(granularity='day', period_start='2025-04-15')
+        self.assertEqual(daily.payment_count, 2)
+        self.assertEqual(str(daily.converted_amount), '103.92')
+        monthly = StripeRevenueRollup.objects.get(granularity='month', period_start='2025-04-01')
+        self.assertEqual(monthly.payment_count, 3)
+        self.assertEqual(str(monthly.converted_amount), '155.92')
+        self.assertEqual(monthly.source_account, 'ki')
+
+
+class RevenueAPITest(TestCase):
+    """Test revenue rollup API"""
+    
+    def setUp(self):
+        from rest_framework.test import APIClient
+        from .models import StripeRevenueRollup
+        self.user = User.objects.create_user(username='revenue', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        for month, amount in [('2025-01-01', 100), ('2025-02-01', 200), ('2025-03-01', 300)]:
+            for account in ('ki', 'kt'):
+                StripeRevenueRollup.objects.create(
+                    granularity='month', period_start=month, source_account=account,
+                    currency='usd', payment_count=1, amount=amount, converted_amount=amount
+                )
+    
+    def test_totals_date_range(self):
+        """Totals are summed per period within the requested range"""
+        response = self.client.get('/api/v1/revenue/totals/', {'start': '2025-02-01', 'end': '2025-03-31'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['period_start'].isoformat() for row in response.data], ['2025-02-01', '2025-03-01'])
+        self.assertEqual(response.data[0]['payment_count'], 2)
+        self.assertEqual(response.data[0]['converted_amount'], 400)
+    
+    def test_invalid_date_rejected(self):
+        """Malformed dates return 400"""
+        response = self.client.get('/api/v1/revenue/', {'start': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TimelineTest(TestCase):
+    """Test activity timeline batching and incremental feed"""
+    
+    def setUp(self):
+        from rest_framework.test import APIClient
+        self.user = User.objects.create_user(username='timeline', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.customer = Customer.objects.create(
+            first_name='Time', last_name='Line',
+            email_primary='timeline@example.com', customer_type='individual'
+        )
+    
+    def test_activity_batch_defers_inserts(self):
+        """Activity.log inside activity_batch writes nothing until the batch exits"""
+        from .models import Activity
+        from .timeline import activity_batch
+        
+        with activity_batch():
+            for i in range(5):
+                Activity.log('note_added', f'Note {i}', customer=self.customer)
+            self.assertEqual(Activity.objects.count(), 0)
+        self.assertEqual(Activity.objects.count(), 5)
+    
+    def test_since_cursor_returns_only_new_entries(self):
+        """Polling with the returned cursor yields only activities logged afterwards"""
+        from .models import Activity
+        
+        Activity.log('note_added', 'First', customer=self.customer)
+        response = self.client.get('/api/v1/timeline/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([e['title'] for e in response.data['results']], ['First'])
+        self.assertEqual(response.data['results'][0]['customer']['first_name'], 'Time')
+        cursor = response.data['cursor']
+        
+        response = self.client.get('/api/v1/timeline/', {'since': cursor})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['cursor'], cursor)
+        
+        Activity.log('note_added', 'Second')
+        response = self.client.get('/api/v1/timeline/', {'since': cursor})
+        self.assertEqual([e['title'] for e in response.data['results']], ['Second'])
+    
+    def test_invalid_cursor_rejected(self):
+        response = self.client.get('/api/v1/timeline/', {'since': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_limit_is_clamped(self):
+        """Zero and negative limits return one entry rather than everything or a 500"""
+        from .models import Activity
+        
+        for i in range(3):
+            Activity.log('note_added', f'Note {i}', customer=self.customer)
+        for limit in ('0', '-5'):
+            response = self.client.get('/api/v1/timeline/', {'limit': limit})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data['results']), 1)
+            
+            response = self.client.get('/api/v1/timeline/', {'limit': limit, 'since': response.data['cursor']})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_since_falls_back_when_redis_set_cannot_answer(self):
+        """An evicted set, or one trimmed past the cursor, is read from the database and re-warmed"""
+        import json
+        from .models import Activity
+        from .timeline import ActivityTimeline, RedisTimelineBackend, make_cursor
+        
+        Activity.log('note_added', 'First', customer=self.customer)
+        Activity.log('note_added', 'Second', customer=self.customer)
+        timeline = ActivityTimeline()
+        connection = MagicMock()
+        timeline._redis = RedisTimelineBackend(connection)
+        cursor = make_cursor(timeline.database.latest(limit=2)[1])
+        newest = timeline.database.latest(limit=1)[0]
+        
+        for oldest in ([], [(json.dumps(newest), newest['score'])]):  # evicted, then trimmed past the cursor
+            connection.reset_mock()
+            connection.zrange.return_value = oldest
+            self.assertEqual([e['title'] for e in timeline.since(cursor)], ['Second'])
+            connection.zrangebyscore.assert_not_called()
+            connection.zadd.assert_called_once()
+        
+        connection.reset_mock()
+        connection.zrange.return_value = [(json.dumps(newest), newest['score'] - 10 ** 9)]
+        connection.zrangebyscore.return_value = [json.dumps(newest)]
+        self.assertEqual([e['title'] for e in timeline.since(cursor)], ['Second'])
+        connection.zadd.assert_not_called()
+
+    def test_latest_rewarms_set_recreated_after_eviction(self):
+        """A publish into an evicted key leaves a short set; latest refills it from the database"""
+        import json
+        from .models import Activity
+        from .timeline import ActivityTimeline, RedisTimelineBackend
+        
+        for i in range(3):
+            Activity.log('note_added', f'Note {i}', customer=self.customer)
+        timeline = ActivityTimeline()
+        connection = MagicMock()
+        timeline._redis = RedisTimelineBackend(connection)
+        entries = timeline.database.latest(limit=3)
+        connection.zrevrange.side_effect = [
+            [json.dumps(entries[0])],  # only the entry published after the eviction
+            [json.dumps(entry) for entry in entries],
+        ]
+        self.assertEqual([e['title'] for e in timeline.latest(limit=3)], ['Note 2', 'Note 1', 'Note 0'])
+        connection.zadd.assert_called_once()
+        
+        connection.reset_mock()
+        connection.zrevrange.side_effect = None
+        connection.zrevrange.return_value = [json.dumps(entry) for entry in entries]
+        self.assertEqual(len(timeline.latest(limit=10)), 3)
+        connection.zadd.assert_not_called()
+
+    def test_since_pages_ties_in_cursor_order(self):
+        """Entries sharing a timestamp come back ordered by id, from Redis and the database alike"""
+        import json
+        from .models import Activity
+        from .timeline import ActivityTimeline, RedisTimelineBackend, make_cursor
+
+        for i in range(4):
+            Activity.log('note_added', f'Note {i}', customer=self.customer)
+        Activity.objects.update(created_at=timezone.now())
+        timeline = ActivityTimeline()
+        entries = sorted(timeline.database.latest(limit=4), key=lambda e: e['id'])
+        cursor = make_cursor(entries[0])
+        expected = [entry['id'] for entry in entries[1:3]]
+
+        self.assertEqual([e['id'] for e in timeline.since(cursor, limit=2)], expected)
+
+        connection = MagicMock()
+        timeline._redis = RedisTimelineBackend(connection)
+        connection.zrange.return_value = [(json.dumps(entries[0]), entries[0]['score'])]
+        connection.zrangebyscore.return_value = [json.dumps(entry) for entry in reversed(entries)]
+        self.assertEqual([e['id'] for e in timeline.since(cursor, limit=2)], expected)
+
+
+class LogPartitioningTest(TestCase):
+    """Test monthly partition bookkeeping and log retention"""
+    
+    def test_cold_partitions_respect_cutoff(self):
+        """Only partitions whose whole month precedes the cutoff are archived"""
+        from datetime import date, timezone as dt_timezone
+        from .partitioning import cold_partitions, parse_partition, partition_name
+        
+        partitions = [
+            parse_partition(partition_name('crm_communicationlog', date(2025, month, 1)))
+            for month in (1, 2, 3)
+        ]
+        self.assertEqual(partitions[1].end, date(2025, 3, 1))
+        self.assertIsNone(parse_partition('crm_communicationlog_default'))
+        
+        cutoff = datetime(2025, 3, 15, tzinfo=dt_timezone.utc)
+        self.assertEqual(
+            [p.name for p in cold_partitions(partitions, cutoff)],
+            ['crm_communicationlog_y2025m01', 'crm_communicationlog_y2025m02']
+        )
+    
+    def test_cleanup_without_partitioning_deletes_old_rows(self):
+        """On databases without partitioning the retention task falls back to deleting rows"""
+        from .tasks import cleanup_old_communication_logs
+        
+        customer = Customer.objects.create(
+            first_name='Old', last_name='Log',
+            email_primary='oldlog@example.com', customer_type='individual'
+        )
+        old_log = CommunicationLog.objects.create(customer=customer, channel='email', subject='Old', content='x')
+        CommunicationLog.objects.create(customer=customer, channel='email', subject='New', content='x')
+        CommunicationLog.objects.filter(pk=old_log.pk).update(sent_at=timezone.now() - timedelta(days=365))
+        
+        result = cleanup_old_communication_logs()
+        self.assertIn('deleted 1', result)
+        self.assertEqual(list(CommunicationLog.objects.values_list('subject', flat=True)), ['New'])
+    
+    def test_delete_in_batches_honours_batch_size(self):
+        """Batched deletes remove only matching rows, one batch at a time"""
+        from .retention import delete_in_batches
+        
+        customer = Customer.objects.create(
+            first_name='Batch', last_name='Delete',
+            email_primary='batchdelete@example.com', customer_type='individual'
+        )
+        CommunicationLog.objects.bulk_create([
+            CommunicationLog(customer=customer, channel='email', subject=f'Old {i}', content='x')
+            for i in range(5)
+        ])
+        CommunicationLog.objects.create(customer=customer, channel='whatsapp', subject='Keep', content='x')
+        
+        batches = []
+        result = delete_in_batches(
+            CommunicationLog.objects.filter(channel='email'), batch_size=2, sleep=0,
+            progress=lambda deleted, count: batches.append(deleted)
+        )
+        self.assertEqual(result['deleted'], 5)
+        self.assertTrue(result['complete'])
+        self.assertEqual(batches, [2, 4, 5])
+        self.assertEqual(list(CommunicationLog.objects.values_list('subject', flat=True)), ['Keep'])
+
+
+class RateLimitTest(TestCase):
+    """Test GCRA rate limiting and rate limit headers"""
+    
+    def setUp(self):
+        from .rate_limit import LocalRateLimiter, rate_limiter
+        rate_limiter.local = LocalRateLimiter()
+        self.user = User.objects.create_user(username='limited', password='testpass123')
+        self.other_user = User.objects.create_user(username='unlimited', password='testpass123')
+    
+    def test_local_limiter_blocks_after_burst(self):
+        """A burst of `limit` requests is allowed, the next one must wait one interval"""
+        from .rate_limit import LocalRateLimiter
+        
+        limiter = LocalRateLimiter()
+        results = [limiter.hit('client', 3, 60) for _ in range(4)]
+        self.assertEqual([r.allowed for r in results], [True, True, True, False])
+        self.assertEqual([r.remaining for r in results], [2, 1, 0, 0])
+        self.assertAlmostEqual(results[3].retry_after, 20, delta=1)
+    
+    def test_middleware_limits_per_user_with_headers(self):
+        """Each user has their own allowance and responses carry X-RateLimit headers"""
+        from .middleware.security import RateLimitMiddleware
+        
+        limits = dict(RateLimitMiddleware.RATE_LIMITS, api={'requests': 2, 'window': 60})
+        with patch.object(RateLimitMiddleware, 'RATE_LIMITS', limits):
+            self.client.force_login(self.user)
+            responses = [self.client.get('/api/v1/timeline/') for _ in range(3)]
+            self.assertEqual([r.status_code for r in responses], [200, 200, 429])
+            self.assertEqual(responses[0]['X-RateLimit-Limit'], '2')
+            self.assertEqual([r['X-RateLimit-Remaining'] for r in responses], ['1', '0', '0'])
+            self.assertEqual(responses[2]['Retry-After'], '30')
+            
+            self.client.force_login(self.other_user)
+            self.assertEqual(self.client.get('/api/v1/timeline/').status_code, 200)
+    
+    def test_token_clients_are_limited_per_user(self):
+        """Valid API tokens are resolved to their user; unknown tokens count against the IP"""
+        from django.contrib.auth.models import AnonymousUser
+        from django.test import RequestFactory
+        from .middleware.security import RateLimitMiddleware
+        
+        middleware = RateLimitMiddleware(lambda request: None)
+        token = Token.objects.create(user=self.user)
+        
+        def token_request(key, ip):
+            request = RequestFactory().get('/api/v1/timeline/', HTTP_AUTHORIZATION=f'Token {key}', REMOTE_ADDR=ip)
+            request.user = AnonymousUser()
+            return middleware.process_request(request), request
+        
+        limits = dict(RateLimitMiddleware.RATE_LIMITS, api={'requests': 2, 'window': 60})
+        with patch.object(RateLimitMiddleware, 'RATE_LIMITS', limits):
+            responses = [token_request(token.key, ip)[0] for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3')]
+            self.assertEqual(responses[:2], [None, None])
+            self.assertEqual(responses[2].status_code, 429)
+            self.assertEqual(middleware.get_client_key(token_request(token.key, '10.0.0.4')[1]), f'user:{self.user.pk}')
+            
+            # Random tokens cannot buy fresh allowances: they share the IP's bucket
+            responses = [token_request(f'random-{i}', '10.0.0.9')[0] for i in range(3)]
+            self.assertEqual(responses[:2], [None, None])
+            self.assertEqual(responses[2].status_code, 429)
+        
+        # The token is a real API credential end to end
+        self.assertEqual(
+            self.client.get('/api/v1/timeline/', HTTP_AUTHORIZATION=f'Token {token.key}').status_code,
+            status.HTTP_200_OK
+        )
+
+
+class RequestMetricsTest(TestCase):
+    """Test per-view request metrics and the Prometheus endpoint"""
+    
+    def setUp(self):
+        from .metrics import registry
+        registry.reset()
+        self.staff = User.objects.create_user(username='metrics', password='testpass123', is_staff=True)
+    
+    def test_histogram_quantiles(self):
+        """Quantiles are interpolated inside the containing bucket"""
+        from .metrics import Histogram
+        
+        histogram = Histogram((0.1, 0.2, 0.5))
+        for value in [0.05] * 50 + [0.15] * 45 + [0.4] * 5:
+            histogram.observe(value)
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.1)
+        self.assertAlmostEqual(histogram.quantile(0.95), 0.2)
+        self.assertAlmostEqual(histogram.quantile(0.99), 0.44)
+    
+    def test_metrics_endpoint_reports_queries_per_view(self):
+        """Queries are counted without DEBUG and exported per view"""
+        self.client.force_login(self.staff)
+        Customer.objects.create(
+            first_name='Metric', last_name='Customer',
+            email_primary='metric@example.com', customer_type='individual'
+        )
+        self.assertEqual(self.client.get('/api/v1/timeline/').status_code, 200)
+        
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('crm_http_request_duration_seconds_count{view="crm:timeline-list"} 1', body)
+        self.assertIn('crm_http_responses_total{view="crm:timeline-list",status="2xx"} 1', body)
+        self.assertNotIn('crm_db_queries_per_request_bucket{view="crm:timeline-list",le="0.0"} 1', body)
+        self.assertIn('quantile="0.99"', body)
+    
+    def test_metrics_endpoint_requires_staff(self):
+        user = User.objects.create_user(username='nostaff', password='testpass123')
+        self.client.force_login(user)
+        response = self.client.get('/metrics/', REMOTE_ADDR='10.0.0.5')
+        self.assertEqual(response.status_code, 403)
+
+
+class InstrumentedCacheTest(TestCase):
+    """Test cache hit/miss instrumentation"""
+    
+    def setUp(self):
+        from .cache_backends import InstrumentedLocMemCache
+        from .metrics import registry
+        registry.reset()
+        self.cache = InstrumentedLocMemCache('instrumented-test', {})
+    
+    def test_falsy_values_count_as_hits(self):
+        """Cached 0/''/False are hits; only absent keys are misses"""
+        from .cache_backends import track_cache_stats
+        
+        self.cache.set('customer_stats_total', 0)
+        self.cache.set('customer_stats_active', False)
+        with track_cache_stats() as stats:
+            self.assertEqual(self.cache.get('customer_stats_total'), 0)
+            self.assertIs(self.cache.get('customer_stats_active', 'fallback'), False)
+            self.assertEqual(self.cache.get('customer_stats_missing', 'fallback'), 'fallback')
+            self.assertEqual(self.cache.get_many(['queryset:a', 'queryset:b']), {})
+        self.assertEqual((stats.hits, stats.misses), (2, 3))
+    
+    def test_hit_ratio_exported_per_prefix(self):
+        """The metrics endpoint reports hit ratios grouped by key prefix"""
+        from .metrics import registry, render_prometheus
+        
+        self.cache.set('queryset:get_queryset:abc', [1])
+        self.cache.get('queryset:get_queryset:abc')
+        self.cache.get('queryset:get_queryset:def')
+        self.cache.get('queryset:get_queryset:ghi')
+        body = render_prometheus(*registry.snapshot())
+        self.assertIn('crm_cache_operations_total{prefix="queryset",result="hit"} 1', body)
+        self.assertIn('crm_cache_operations_total{prefix="queryset",result="miss"} 2', body)
+        self.assertIn('crm_cache_hit_ratio{prefix="queryset"} 0.3333', body)
+        self.assertIn('crm_cache_operation_duration_seconds_count{prefix="queryset"} 4', body)
+
+
+class QueryBudgetTest(TestCase):
+    """Test query budgets and N+1 detection"""
+    
+    def setUp(self):
+        from rest_framework.test import APIClient
+        self.user = User.objects.create_user(username='budget', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.course = Course.objects.create(
+            title='Budget Course', description='Test', course_type='online',
+            duration_hours=10, price=10, max_participants=50,
+            start_date=timezone.now(), end_date=timezone.now() + timedelta(days=1),
+            registration_deadline=timezone.now()
+        )
+        self.customers = [
+            Customer.objects.create(
+                first_name=f'Budget{i}', last_name='Customer',
+                email_primary=f'budget{i}@example.com', customer_type='individual'
+            )
+            for i in range(4)
+        ]
+    
+    def test_repeated_queries_reported_as_n_plus_one(self):
+        """The same query shape from the same call site is flagged with its location"""
+        from .query_budget import QueryInspector
+        
+        with QueryInspector() as inspector:
+            for customer in self.customers:
+                Customer.objects.get(pk=customer.pk)
+        problems = inspector.problems(budget=10)
+        self.assertEqual(len(problems), 1)
+        self.assertIn('N+1: 4x', problems[0])
+        self.assertIn('tests.py', problems[0])
+        self.assertEqual(inspector.problems(budget=2)[0], '4 queries exceed the budget of 2')
+    
+    def test_enrollment_list_within_budget(self):
+        """Enrollment list joins customer and course instead of loading them per row"""
+        for customer in self.customers:
+            Enrollment.objects.create(customer=customer, course=self.course, status='registered')
+        
+        response = self.client.get('/api/v1/enrollments/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(response.data['results'][0]['course_title'], 'Budget Course')
+    
+    def test_strict_mode_raises(self):
+        from .query_budget import QueryBudgetExceeded, report
+        
+        with patch('crm.query_budget.STRICT', True):
+            with self.assertRaises(QueryBudgetExceeded):
+                report('View.list', ['5 queries exceed the budget of 2'])
+
+
+class ParticipantCountTest(TestCase):
+    """Test annotated course/conference counts and denormalised counters"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+        cache.clear()
+        self.user = User.objects.create_user(username='counts', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.customers = [
+            Customer.objects.create(
+                first_name=f'Count{i}', last_name='Customer',
+                email_primary=f'count{i}@example.com', customer_type='individual'
+            )
+            for i in range(3)
+        ]
+    
+    def create_course(self, title, max_participants=30):
+        return Course.objects.create(
+            title=title, description='Test', course_type='online',
+            duration_hours=10, price=10, max_participants=max_participants,
+            start_date=timezone.now(), end_date=timezone.now() + timedelta(days=1),
+            registration_deadline=timezone.now()
+        )
+    
+    def test_course_list_counts_in_one_query(self):
+        """Enrolled counts come from the list query itself, not one COUNT per course"""
+        courses = [self.create_course(f'Course {i}') for i in range(5)]
+        for customer in self.customers:
+            Enrollment.objects.create(customer=customer, course=courses[0], status='registered')
+        Enrollment.objects.filter(customer=self.customers[2]).update(status='cancelled')
+        
+        response = self.client.get('/api/v1/courses/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        counts = {course['title']: course['enrolled_count'] for course in response.data['results']}
+        self.assertEqual(counts['Course 0'], 2)
+        self.assertEqual(counts['Course 1'], 0)
+        self.assertNotIn('enrollment_count', response.data['results'][0])
+    
+    def test_enrollment_counter_enforces_capacity(self):
+        """The maintained counter follows enrollment writes and blocks overbooking"""
+        course = self.create_course('Small Course', max_participants=1)
+        url = f'/api/v1/courses/{course.id}/enroll_customer/'
+        
+        response = self.client.post(url, {'customer_id': str(self.customers[0].id)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        course.refresh_from_db()
+        self.assertEqual(course.enrollment_count, 1)
+        
+        response = self.client.post(url, {'customer_id': str(self.customers[1].id)})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Course is full')
+        
+        enrollment = Enrollment.objects.get(course=course)
+        enrollment.status = 'cancelled'
+        enrollment.save()
+        course.refresh_from_db()
+        self.assertEqual(course.enrollment_count, 0)
+    
+    def test_conference_registration_counter(self):
+        conference = Conference.objects.create(
+            name='Summit', description='Test', venue='Hall',
+            start_date=timezone.now(), end_date=timezone.now() + timedelta(days=1),
+            registration_fee=0, max_attendees=100
+        )
+        for customer in self.customers:
+            ConferenceRegistration.objects.create(customer=customer, conference=conference)
+        conference.refresh_from_db()
+        self.assertEqual(conference.registration_count, 3)
+        
+        response = self.client.get(f'/api/v1/conferences/{conference.id}/')
+        self.assertEqual(response.data['registered_count'], 3)
+        self.assertNotIn('registration_count', response.data)
+
+
+class CustomerListSerializationTest(TestCase):
+    """Test the compact customer list, sparse fieldsets and the values() fast path"""
+    
+    def setUp(self):
+        from rest_framework.test import APIClient
+        self.user = User.objects.create_user(username='lister', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.customer = Customer.objects.create(
+            first_name='Lean', last_name='List', email_primary='lean@example.com',
+            customer_type='corporate', status='prospect', internal_notes='not for lists'
+        )
+    
+    def test_list_is_compact(self):
+        response = self.client.get('/api/v1/customers/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        row = response.data['results'][0]
+        self.assertEqual(row['customer_type_display'], 'Corporate Client')
+        self.assertEqual(row['status_display'], 'Prospect')
+        self.assertNotIn('internal_notes', row)
+    
+    def test_fast_path_matches_serializer(self):
+        """values() rows render exactly like the DRF serializer output"""
+        from .serializers import CustomerListSerializer, serialize_values, values_plan
+        
+        serializer = CustomerListSerializer()
+        plan = values_plan(serializer)
+        rows = Customer.objects.filter(pk=self.customer.pk).values(*plan[0])
+        expected = CustomerListSerializer(Customer.objects.filter(pk=self.customer.pk), many=True).data
+        self.assertEqual(serialize_values(rows, plan), [dict(item) for item in expected])
+    
+    def test_sparse_fieldset(self):
+        response = self.client.get('/api/v1/customers/', {'fields': 'id,internal_notes,bogus'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'internal_notes'})
+        
+        response = self.client.get(f'/api/v1/customers/{self.customer.pk}/', {'fields': 'email_primary'})
+        self.assertEqual(response.data, {'email_primary': 'lean@example.com'})
+
+
+class ConditionalGetTest(TestCase):
+    """Test ETag / Last-Modified handling on customer and course resources"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+        cache.clear()
+        self.user = User.objects.create_user(username='poller', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.customer = Customer.objects.create(
+            first_name='Poll', last_name='Ed', email_primary='poll@example.com', customer_type='individual'
+        )
+    
+    def test_customer_detail_not_modified(self):
+        url = f'/api/v1/customers/{self.customer.pk}/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        self.customer.first_name = 'Changed'
+        self.customer.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['first_name'], 'Changed')
+    
+    def test_customer_list_changes_with_deletes(self):
+        """Deletes don't move MAX(updated_at); the collection version catches them"""
+        other = Customer.objects.create(first_name='Gone', email_primary='gone@example.com')
+        etag = self.client.get('/api/v1/customers/')['ETag']
+        
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/customers/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        other.delete()
+        response = self.client.get('/api/v1/customers/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+    
+    def test_course_list_tracks_enrollments(self):
+        course = Course.objects.create(
+            title='Polled Course', description='Test', course_type='online',
+            duration_hours=10, price=10, max_participants=50,
+            start_date=timezone.now(), end_date=timezone.now() + timedelta(days=1),
+            registration_deadline=timezone.now()
+        )
+        etag = self.client.get('/api/v1/courses/')['ETag']
+        
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/courses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        Enrollment.objects.create(customer=self.customer, course=course, status='registered')
+        response = self.client.get('/api/v1/courses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['enrolled_count'], 1)
+
+
+class CustomerBulkAPITest(TestCase):
+    """Test bulk customer create/update/delete"""
+    
+    def setUp(self):
+        from rest_framework.test import APIClient
+        self.user = User.objects.create_user(username='integrator', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.existing = Customer.objects.create(
+            first_name='Tube', last_name='Star', email_primary='tube@example.com',
+            customer_type='youtuber', youtube_handle='tubestar'
+        )
+    
+    def test_bulk_create_with_per_item_results(self):
+        items = [
+            {'first_name': f'Bulk{i}', 'last_name': 'Create', 'email_primary': f'bulk{i}@example.com',
+             'customer_type': 'individual', 'country_region': 'MY', 'phone_primary': '123456'}
+            for i in range(20)
+        ]
+        items.append({'first_name': 'Bad', 'email_primary': 'not-an-email', 'customer_type': 'individual'})
+        items.append({'first_name': 'Dup', 'customer_type': 'individual', 'youtube_handle': '@TubeStar'})
+        items.append({'customer_type': 'youtuber', 'youtube_handle': 'new_creator'})
+        items.append({'customer_type': 'youtuber', 'youtube_handle': 'NEW_CREATOR'})
+        
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/v1/customers/bulk/', items, format='json')
+        # One handle lookup and batched INSERTs, not a query per item
+        self.assertLessEqual(len(queries), 5)
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(response.data['succeeded'], 21)
+        results = response.data['results']
+        self.assertEqual(results[20]['errors'].keys(), {'email_primary'})
+        self.assertIn('already used', results[21]['errors']['youtube_handle'][0])
+        self.assertEqual(results[22]['status'], 'created')
+        self.assertIn('repeated', results[23]['errors']['youtube_handle'][0])
+        
+        creator = Customer.objects.get(pk=results[22]['id'])
+        self.assertEqual((creator.first_name, creator.last_name), ('New Creator', 'Creator'))
+        self.assertEqual(Customer.objects.get(email_primary='bulk0@example.com').phone_primary_country_code, '+60')
+    
+    def test_bulk_update_ndjson(self):
+        import json
+        other = Customer.objects.create(first_name='Other', email_primary='other@example.com')
+        lines = [
+            {'id': str(self.existing.pk), 'status': 'alumni'},
+            {'id': str(other.pk), 'last_name': 'Updated'},
+            {'id': 'not-a-uuid', 'status': 'alumni'},
+        ]
+        body = '\n'.join(json.dumps(line) for line in lines)
+        response = self.client.generic('PATCH', '/api/v1/customers/bulk/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([r['status'] for r in response.data['results']], ['updated', 'updated', 'error'])
+        
+        self.existing.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.existing.status, 'alumni')
+        self.assertEqual(self.existing.youtube_handle, 'tubestar')
+        self.assertEqual(other.last_name, 'Updated')
+        self.assertGreater(other.updated_at, other.created_at)
+    
+    def test_bulk_delete(self):
+        import uuid
+        response = self.client.post(
+            '/api/v1/customers/bulk/delete/', {'ids': [str(self.existing.pk), str(uuid.uuid4())]}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([r['status'] for r in response.data['results']], ['deleted', 'error'])
+        self.assertFalse(Customer.objects.filter(pk=self.existing.pk).exists())
+
+
+@patch('crm.changes.SETTLE_SECONDS', 0)
+class CustomerChangeFeedTest(TestCase):
+    """Test the incremental customer change feed"""
+    
+    def setUp(self):
+        from rest_framework.test import APIClient
+        self.user = User.objects.create_user(username='syncer', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.customers = [
+            Customer.objects.create(first_name=f'Feed{i}', email_primary=f'feed{i}@example.com', customer_type='individual')
+            for i in range(3)
+        ]
+    
+    def test_pages_deltas_and_tombstones(self):
+        response = self.client.get('/api/v1/customers/changes/', {'limit': 2, 'fields': 'first_name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['has_more'])
+        self.assertEqual([c['data'] for c in response.data['results']], [{'first_name': 'Feed0'}, {'first_name': 'Feed1'}])
+        
+        response = self.client.get('/api/v1/customers/changes/', {'since': response.data['cursor']})
+        self.assertEqual([c['id'] for c in response.data['results']], [str(self.customers[2].pk)])
+        self.assertFalse(response.data['has_more'])
+        cursor = response.data['cursor']
+        
+        self.customers[0].last_name = 'Changed'
+        self.customers[0].save()
+        deleted_id = str(self.customers[1].pk)
+        self.customers[1].delete()
+        
+        response = self.client.get('/api/v1/customers/changes/', {'since': cursor})
+        changes = [(c['type'], c['id']) for c in response.data['results']]
+        self.assertEqual(changes, [('upsert', str(self.customers[0].pk)), ('delete', deleted_id)])
+        self.assertEqual(response.data['results'][0]['data']['last_name'], 'Changed')
+        
+        response = self.client.get('/api/v1/customers/changes/', {'since': response.data['cursor']})
+        self.assertEqual(response.data['results'], [])
+    
+    def test_invalid_and_expired_cursors(self):
+        response = self.client.get('/api/v1/customers/changes/', {'since': 'garbage'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.get('/api/v1/customers/changes/', {'since': f'0_{self.customers[0].pk}'})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+
+class SegmentAggregateTest(TestCase):
+    """Test segment counts over grouping sets"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+        cache.clear()
+        self.user = User.objects.create_user(username='analyst', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        for i, (customer_type, status_value) in enumerate([
+            ('individual', 'active'), ('individual', 'active'), ('individual', 'prospect'), ('corporate', 'active'),
+        ]):
+            Customer.objects.create(
+                first_name=f'Seg{i}', email_primary=f'seg{i}@example.com',
+                customer_type=customer_type, status=status_value
+            )
+    
+    def test_grouping_sets_in_one_query(self):
+        from .aggregates import counts_for, segment_counts, total_for
+        
+        with self.assertNumQueries(1):
+            results = segment_counts([(), ('status',), ('status', 'customer_type')], use_cache=False)
+        self.assertEqual(total_for(results), 4)
+        self.assertEqual(total_for(results, status='active'), 3)
+        self.assertEqual(total_for(results, customer_type='individual', status='active'), 2)
+        self.assertEqual([row['values'] for row in counts_for(results, 'status')][0], {'status': 'active'})
+    
+    def test_postgresql_uses_grouping_sets(self):
+        from django.db import connection
+        from .aggregates import _build_sql
+        
+        with patch('crm.aggregates.supports_grouping_sets', return_value=True):
+            sql, repeat = _build_sql('SELECT 1', ['customer_type', 'status'], [(), ('status',)], connection)
+        self.assertIn('GROUPING SETS ((), ("status"))', sql)
+        self.assertIn('GROUPING("customer_type", "status")', sql)
+        self.assertEqual(repeat, 1)
+    
+    def test_aggregate_endpoint_filters_and_caches(self):
+        params = {'group_by': ['', 'customer_type'], 'status': 'active'}
+        response = self.client.get('/api/v1/customers/aggregate/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual(results[0], {'group': [], 'values': {}, 'count': 3, 'labels': {}})
+        self.assertEqual(results[1]['labels'], {'customer_type': 'Individual Learner'})
+        self.assertEqual(results[1]['count'], 2)
+        
+        with self.assertNumQueries(0):
+            self.client.get('/api/v1/customers/aggregate/', params)
+        
+        Customer.objects.create(first_name='New', customer_type='corporate', status='active')
+        response = self.client.get('/api/v1/customers/aggregate/', params)
+        self.assertEqual(response.data['results'][0]['count'], 4)
+        
+        response = self.client.get('/api/v1/customers/aggregate/', {'group_by': 'password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        for value in ('last-week', '2024-02-30'):
+            response = self.client.get('/api/v1/customers/aggregate/', {'created_after': value})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data, {'error': 'Invalid created_after'})
+
+
+class HealthProbeTest(TestCase):
+    """Test liveness/readiness probes and cached diagnostics"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+    
+    def test_livez_does_no_io(self):
+        with self.assertNumQueries(0), patch('crm.rate_limit.rate_limiter.hit') as hit:
+            response = self.client.get('/livez')
+        self.assertEqual(response.status_code, 200)
+        hit.assert_not_called()
+    
+    def test_readyz_runs_only_select_one(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['checks']['cache']['status'], 'ok')
+        
+        with patch('crm.monitoring._probe_database', side_effect=Exception('down')):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+    
+    def test_diagnostics_served_from_cache(self):
+        from .monitoring import cached_diagnostics, refresh_diagnostics
+        
+        with patch('crm.monitoring.start_refresh') as start:
+            self.assertEqual(cached_diagnostics()['overall_status'], 'pending')
+            start.assert_called_once()
+        
+        Customer.objects.create(first_name='Health', customer_type='individual')
+        refresh_diagnostics()
+        with patch('crm.monitoring.start_refresh') as start, self.assertNumQueries(0):
+            results = cached_diagnostics()
+        start.assert_not_called()
+        self.assertFalse(results['stale'])
+        self.assertEqual(results['checks']['models']['details']['total_customers'], 1)
+        self.assertEqual(results['metrics']['customers']['total'], 1)
+
+
+class CustomerProfileSplitTest(TestCase):
+    """Test the rarely-read customer columns stored on CustomerProfile"""
+    
+    def setUp(self):
+        from rest_framework.test import APIClient
+        self.user = User.objects.create_user(username='profiler', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+    
+    def test_attributes_proxy_to_profile(self):
+        from django.db import connection
+        from .models import CustomerProfile
+        
+        customer = Customer.objects.create(
+            first_name='Cold', last_name='Columns', email_primary='cold@example.com',
+            customer_type='individual', internal_notes='VIP', twitter_handle='cold'
+        )
+        profile = CustomerProfile.objects.get(customer=customer)
+        self.assertEqual((profile.internal_notes, profile.twitter_handle), ('VIP', 'cold'))
+        customer_columns = {column.name for column in connection.introspection.get_table_description(
+            connection.cursor(), Customer._meta.db_table)}
+        self.assertNotIn('internal_notes', customer_columns)
+        
+        # Lazily loaded with one query, none when joined up front
+        customer = Customer.objects.get(pk=customer.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(customer.internal_notes, 'VIP')
+            self.assertEqual(customer.twitter_handle, 'cold')
+        customer = Customer.objects.select_related('profile').get(pk=customer.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(customer.internal_notes, 'VIP')
+        
+        customer.internal_notes = 'Regular'
+        customer.save()
+        self.assertEqual(CustomerProfile.objects.get(pk=customer.pk).internal_notes, 'Regular')
+    
+    def test_customer_without_profile(self):
+        from .models import CustomerProfile
+        
+        customer = Customer.objects.create(first_name='Hot', last_name='Only', customer_type='individual')
+        self.assertFalse(CustomerProfile.objects.filter(pk=customer.pk).exists())
+        self.assertEqual(Customer.objects.get(pk=customer.pk).special_requirements, '')
+        
+        response = self.client.get('/api/v1/customers/', {'fields': 'id,special_requirements'})
+        self.assertEqual(response.data['results'][0]['special_requirements'], '')
+    
+    def test_api_reads_and_writes_profile(self):
+        customer = Customer.objects.create(
+            first_name='Api', last_name='Profile', customer_type='individual', address_secondary='PO Box 1'
+        )
+        response = self.client.get(f'/api/v1/customers/{customer.pk}/')
+        self.assertEqual(response.data['address_secondary'], 'PO Box 1')
+        
+        response = self.client.patch(
+            f'/api/v1/customers/{customer.pk}/', {'emergency_contact_name': 'Kin'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        customer = Customer.objects.get(pk=customer.pk)
+        self.assertEqual((customer.emergency_contact_name, customer.address_secondary), ('Kin', 'PO Box 1'))
+        
+        response = self.client.patch(
+            f'/api/v1/customers/{customer.pk}/', {'linkedin_profile': 'not a url'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_bulk_writes_profiles(self):
+        response = self.client.post('/api/v1/customers/bulk/', [
+            {'first_name': 'Bulk', 'last_name': 'One', 'customer_type': 'individual', 'internal_notes': 'first'},
+            {'first_name': 'Bulk', 'last_name': 'Two', 'customer_type': 'individual'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        first, second = (Customer.objects.get(pk=result['id']) for result in response.data['results'])
+        self.assertEqual(first.internal_notes, 'first')
+        
+        response = self.client.patch('/api/v1/customers/bulk/', [
+            {'id': str(first.pk), 'internal_notes': 'updated'},
+            {'id': str(second.pk), 'instagram_handle': 'two'},
+        ], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Customer.objects.get(pk=first.pk).internal_notes, 'updated')
+        self.assertEqual(Customer.objects.get(pk=second.pk).instagram_handle, 'two')
+    
+    def test_form_saves_profile(self):
+        form = CustomerForm(data={
+            'first_name': 'Form', 'last_name': 'Profile', 'email_primary': 'form@example.com',
+            'country_region': 'MY', 'special_requirements': 'Wheelchair access',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        customer = form.save()
+        self.assertEqual(Customer.objects.get(pk=customer.pk).special_requirements, 'Wheelchair access')
+        
+        form = CustomerForm(instance=Customer.objects.get(pk=customer.pk))
+        self.assertEqual(form.initial['special_requirements'], 'Wheelchair access')
+
+    def test_profile_only_update_fields_touch_customer(self):
+        """save(update_fields=[profile field]) bumps updated_at and still sends post_save"""
+        from django.db.models.signals import post_save
+
+        customer = Customer.objects.create(
+            first_name='Notes', last_name='Only', email_primary='notes@example.com',
+        )
+        stale = timezone.now() - timedelta(days=1)
+        Customer.objects.filter(pk=customer.pk).update(updated_at=stale)
+        customer = Customer.objects.get(pk=customer.pk)
+
+        received = []
+
+        def handler(sender, instance, **kwargs):
+            received.append(kwargs['update_fields'])
+
+        post_save.connect(handler, sender=Customer)
+        try:
+            customer.internal_notes = 'Prefers phone calls'
+            customer.save(update_fields=['internal_notes'])
+        finally:
+            post_save.disconnect(handler, sender=Customer)
+
+        customer = Customer.objects.get(pk=customer.pk)
+        self.assertEqual(customer.internal_notes, 'Prefers phone calls')
+        self.assertGreater(customer.updated_at, stale)
+        self.assertEqual(received, [frozenset({'updated_at'})])
+
+
+class PrimaryKeyGenerationTest(TestCase):
+    """Test time-ordered UUIDv7 primary keys and the key benchmark command"""
+    
+    def test_uuid7_layout_and_order(self):
+        from .ids import uuid7, uuid7_datetime
+        
+        values = [uuid7() for _ in range(5000)]
+        self.assertEqual({value.version for value in values}, {7})
+        self.assertEqual({value.variant for value in values}, {uuid.RFC_4122})
+        self.assertEqual(values, sorted(values))
+        self.assertEqual(len(set(values)), len(values))
+        self.assertLess(abs(uuid7_datetime(values[0]) - timezone.now()), timedelta(seconds=5))
+        self.assertIsNone(uuid7_datetime(uuid.uuid4()))
+    
+    def test_new_rows_get_uuid7_keys(self):
+        first = Customer.objects.create(first_name='Seq', last_name='One', customer_type='individual')
+        second = Customer.objects.create(first_name='Seq', last_name='Two', customer_type='individual')
+        self.assertEqual(first.pk.version, 7)
+        self.assertLess(first.pk, second.pk)
+        
+        with patch('crm.ids.PRIMARY_KEY_UUID_VERSION', 4):
+            legacy = Customer.objects.create(first_name='Seq', last_name='Old', customer_type='individual')
+        self.assertEqual(legacy.pk.version, 4)
+    
+    def test_benchmark_command(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from django.db import connection
+        
+        out = StringIO()
+        call_command('benchmark_primary_keys', parents=50, children_per_parent=2, repeat=1, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split()[0] for line in lines[-3:]], ['uuid4', 'uuid7', 'bigint'])
+        self.assertNotIn('crm_pkbench_parent', connection.introspection.table_names())
+
+
+class IndexAdvisorTest(TestCase):
+    """Test index proposals from captured query shapes"""
+    
+    def setUp(self):
+        from .index_advisor import clear_captured
+        clear_captured()
+        self.addCleanup(clear_captured)
+    
+    def capture(self, requests=12):
+        from .index_advisor import record_shapes
+        from .query_budget import QueryInspector
+        
+        for i in range(requests):
+            with QueryInspector(keep_params=True) as inspector:
+                list(Customer.objects.filter(email_primary__iexact=f'user{i}@example.com'))
+                list(Customer.objects.filter(marketing_consent=True, status='active'))
+                list(
+                    Customer.objects.exclude(customer_centre='')
+                    .filter(customer_type='individual' if i % 2 else 'business')
+                    .values_list('id', 'first_name')
+                )
+                list(Customer.objects.filter(status='lead' if i % 2 else 'active'))
+            record_shapes(inspector)
+    
+    def test_proposals_from_captured_shapes(self):
+        from django.db.models import Q
+        from .index_advisor import captured_shapes, propose_indexes
+        
+        self.capture()
+        proposals = {proposal.kind: proposal for proposal in propose_indexes(captured_shapes())}
+        
+        expression = proposals['expression'].index()
+        self.assertEqual([str(e) for e in expression.expressions], ["Upper(F(email_primary))"])
+        
+        partial = proposals['partial']
+        self.assertEqual(partial.condition, Q(marketing_consent=True) & Q(status='active'))
+        self.assertEqual(partial.fields, ('-created_at',))
+        
+        covering = proposals['partial+covering']
+        self.assertEqual(covering.condition, ~Q(customer_centre=''))
+        self.assertEqual(covering.include, ('id', 'first_name'))
+        
+        # status is already indexed, so the varying status filter needs nothing new
+        self.assertEqual(len(proposals), 3)
+        self.assertTrue(all(len(p.name) <= 30 for p in proposals.values()))
+
+    def test_parameter_values_are_not_cached(self):
+        from django.core.cache import cache
+        from .index_advisor import SHAPES_KEY
+
+        self.capture(requests=2)
+        stored = repr(cache.get(SHAPES_KEY))
+        self.assertIn('"crm_customer"', stored)
+        self.assertNotIn('user1@example.com', stored)
+        self.assertNotIn("'active'", stored)
+
+    def test_rare_shapes_are_ignored(self):
+        from .index_advisor import captured_shapes, propose_indexes
+        
+        self.capture(requests=3)
+        self.assertEqual(propose_indexes(captured_shapes(), min_calls=10), [])
+    
+    def test_write_migration(self):
+        import os
+        from .index_advisor import advise, write_migration
+        
+        self.capture()
+        path = write_migration(advise(source='captured'), concurrently=True)
+        self.addCleanup(os.remove, path)
+        with open(path) as handle:
+            source = handle.read()
+        self.assertIn('AddIndexConcurrently', source)
+        self.assertIn('atomic = False', source)
+        self.assertIn("Upper('email_primary')", source)
+    
+    def test_sampled_requests_are_captured(self):
+        from rest_framework.test import APIClient
+        from .index_advisor import captured_shapes
+        
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('advisor', password='x'))
+        with patch('crm.index_advisor.CAPTURE', True):
+            client.get('/api/v1/customers/?status=active')
+        self.assertTrue(any('"crm_customer"' in shape.sql for shape in captured_shapes()))
+
+
+class CaseInsensitiveUniqueTest(TestCase):
+    """Test the lower() unique constraints on email and YouTube handle"""
+    
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            first_name='Case', last_name='Test', email_primary='  Case@Example.com ',
+            customer_type='youtuber', youtube_handle='@CaseTube'
+        )
+    
+    def test_values_are_normalised_on_write(self):
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.email_primary, self.customer.youtube_handle), ('Case@Example.com', 'CaseTube'))
+        
+        blank = [Customer.objects.create(first_name='No', last_name=f'Email{i}', email_primary='') for i in range(2)]
+        self.assertEqual({customer.email_primary for customer in blank}, {None})
+        self.assertEqual(Customer.objects.with_email('CASE@example.com').get(), self.customer)
+        self.assertEqual(Customer.objects.with_youtube_handle('@casetube').get(), self.customer)
+    
+    def test_database_rejects_duplicates(self):
+        from django.core.exceptions import ValidationError
+        from django.db import IntegrityError, transaction
+        
+        with self.assertRaises(IntegrityError) as raised, transaction.atomic():
+            Customer.objects.create(first_name='Dup', last_name='Email', email_primary='case@example.COM')
+        self.assertEqual(Customer.unique_violation(raised.exception), {
+            'email_primary': ['A customer with this email address already exists.'],
+        })
+        
+        duplicate = Customer(first_name='Dup', last_name='Handle', customer_type='youtuber', youtube_handle='casetube')
+        with self.assertRaises(ValidationError) as invalid:
+            duplicate.full_clean()
+        self.assertIn('youtube_handle', invalid.exception.message_dict)
+    
+    def test_api_reports_duplicate_email(self):
+        from rest_framework.test import APIClient
+        
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='unique', password='x'))
+        response = client.post('/api/v1/customers/', {
+            'first_name': 'Api', 'last_name': 'Dup', 'email_primary': 'CASE@example.com', 'customer_type': 'individual',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email_primary', response.data['details'])
+    
+    def test_csv_import_skips_existing_emails_without_per_row_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .csv_import_handler import CSVImportHandler
+        
+        rows = ['first_name,last_name,email'] + [f'Row,{i},row{i}@example.com' for i in range(20)]
+        rows += ['Old,Customer,CASE@EXAMPLE.COM', 'Twice,Listed,ROW1@example.com']
+        with CaptureQueriesContext(connection) as queries:
+            result = CSVImportHandler().import_csv('\n'.join(rows))
+        self.assertLess(len(queries), 10)
+        self.assertEqual(result['stats']['success'], 20)
+        self.assertEqual(len([w for w in result['warnings'] if 'already exists' in w or 'Duplicate' in w]), 2)
+
+
+class CustomerBulkWriterTest(TestCase):
+    """Test batched customer writes with coalesced cache invalidation"""
+    
+    def test_batched_inserts_apply_save_derivations(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .bulk import CustomerBulkWriter
+        
+        with patch('crm.cache_utils.cache.delete_many') as delete_many, CaptureQueriesContext(connection) as queries:
+            with CustomerBulkWriter(batch_size=50) as writer:
+                for i in range(120):
+                    writer.add(Customer(
+                        first_name='Bulk', last_name=f'Writer{i}', email_primary=f' writer{i}@example.com ',
+                        country_region='MY', phone_primary='123456',
+                    ))
+                # Plain saves inside the block are coalesced too
+                Customer.objects.create(first_name='Plain', last_name='Save', email_primary='plain@example.com')
+        
+        self.assertEqual(writer.created, 120)
+        self.assertEqual(delete_many.call_count, 1)
+        self.assertLess(len(queries), 20)
+        saved = Customer.objects.get(email_primary='writer7@example.com')
+        self.assertEqual(saved.phone_primary_country_code, '+60')
+    
+    def test_duplicates_fall_back_to_row_by_row(self):
+        from .bulk import CustomerBulkWriter
+        
+        Customer.objects.create(first_name='Taken', last_name='Email', email_primary='taken@example.com')
+        flushed = []
+        with CustomerBulkWriter(on_flush=lambda customers, failures: flushed.append((customers, failures))) as writer:
+            writer.add(Customer(first_name='New', last_name='One', email_primary='new@example.com'))
+            writer.add(Customer(first_name='Dup', last_name='One', email_primary='TAKEN@example.com'))
+        
+        self.assertEqual(writer.created, 1)
+        self.assertEqual(writer.failed[0][1], {'email_primary': ['A customer with this email address already exists.']})
+        self.assertEqual(len(flushed), 1)
+        customers, failures = flushed[0]
+        self.assertEqual([c.first_name for c in customers], ['New', 'Dup'])
+        self.assertEqual(failures, writer.failed)
+        self.assertTrue(Customer.objects.with_email('new@example.com').exists())
+    
+    def test_updates_set_country_codes_and_profile_fields(self):
+        from .bulk import CustomerBulkWriter
+        
+        customer = Customer.objects.create(first_name='Up', last_name='Date', phone_primary='98765')
+        customer.country_region = 'SG'
+        customer.internal_notes = 'Moved'
+        with CustomerBulkWriter() as writer:
+            writer.update(customer, ['country_region', 'internal_notes'])
+        
+        customer = Customer.objects.select_related('profile').get(pk=customer.pk)
+        self.assertEqual(customer.phone_primary_country_code, '+65')
+        self.assertEqual(customer.internal_notes, 'Moved')
+
+
+class ParallelCSVValidationTest(TestCase):
+    """Process-pool row validation must produce the same import as the serial path"""
+    
+    CSV = 'first_name,last_name,email,phone\n' + ''.join(
+        f'Row{i},PERSON{i},row{i}@example.com,+1 (555) {i:04d}x\n' for i in range(7)
+    ) + 'Dup,Person,ROW3@example.com,1\nBad,Row,not-an-email,2\nNo,Email,,3\n'
+    
+    def run_import(self, workers):
+        from .csv_import_handler import CSVImportHandler
+        
+        handler = CSVImportHandler()
+        with self.settings(CSV_IMPORT_CHUNK_SIZE=3):
+            result = handler.import_csv(self.CSV, workers=workers)
+        return result
+    
+    def test_parallel_matches_serial(self):
+        serial = self.run_import(workers=1)
+        self.assertFalse(serial['success'])
+        self.assertEqual(Customer.objects.count(), 0)  # rows with errors abort the write
+        
+        parallel = self.run_import(workers=2)
+        self.assertEqual(parallel['errors'], serial['errors'])
+        self.assertEqual(parallel['warnings'], serial['warnings'])
+        self.assertEqual(parallel['stats'], serial['stats'])
+        self.assertEqual(parallel['stats']['total'], 10)
+    
+    def test_parallel_rows_are_written_in_file_order(self):
+        self.CSV = self.CSV.rsplit('Bad,Row', 1)[0]
+        result = self.run_import(workers=2)
+        
+        self.assertTrue(result['success'])
+        self.assertEqual(result['stats']['success'], 7)
+        self.assertIn('Row 9: Duplicate email row3@example.com found within CSV, skipping', result['warnings'])
+        customer = Customer.objects.get(email_primary='row5@example.com')
+        self.assertEqual((customer.last_name, customer.phone_primary), ('Person5', '+1 (555) 0005'))
+
+
+class BoundedCSVSampleTest(TestCase):
+    """Previews and diagnostics only parse the head of large files"""
+    
+    def make_csv(self, rows):
+        return 'first_name;last_name;email\n' + ''.join(
+            f'First{i:05d};Last{i:05d};person{i:05d}@example.com\n' for i in range(rows)
+        )
+    
+    def test_preview_estimates_rows_from_the_sample(self):
+        from .csv_import_handler import CSVImportHandler
+        
+        content = self.make_csv(20000)
+        with self.settings(CSV_SAMPLE_BYTES=4096):
+            handler = CSVImportHandler()
+            preview = handler.preview_import(content)
+            exact = handler.preview_import(content, exact_count=True)
+        
+        self.assertEqual(preview['delimiter_detected'], ';')
+        self.assertEqual(len(preview['sample_rows']), 5)
+        self.assertTrue(preview['total_rows_estimated'])
+        self.assertAlmostEqual(preview['total_rows_detected'], 20000, delta=400)
+        self.assertFalse(exact['total_rows_estimated'])
+        self.assertEqual(exact['total_rows_detected'], 20000)
+    
+    def test_small_files_are_counted_exactly(self):
+        from .csv_import_handler import CSVImportHandler
+        
+        preview = CSVImportHandler().preview_import(self.make_csv(3) + '\n')
+        self.assertEqual(preview['total_rows_detected'], 3)
+        self.assertFalse(preview['total_rows_estimated'])
+
+    def test_upload_preview_reads_only_the_head(self):
+        """Uploads are previewed from the sample and estimated from their size; exact counts stream"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .csv_import_handler import CSVImportHandler
+
+        content = self.make_csv(20000).encode('utf-8')
+        handler = CSVImportHandler()
+        with self.settings(CSV_SAMPLE_BYTES=4096), patch.object(handler, 'preview_import', wraps=handler.preview_import) as preview_import:
+            preview = handler.preview_upload(SimpleUploadedFile('big.csv', content))
+            exact = handler.preview_upload(SimpleUploadedFile('big.csv', content), exact_count=True)
+
+        self.assertLessEqual(len(preview_import.call_args.args[0]), 4096)
+        self.assertEqual(len(preview['sample_rows']), 5)
+        self.assertTrue(preview['total_rows_estimated'])
+        self.assertAlmostEqual(preview['total_rows_detected'], 20000, delta=400)
+        self.assertFalse(exact['total_rows_estimated'])
+        self.assertEqual(exact['total_rows_detected'], 20000)
+
+        small = handler.preview_upload(SimpleUploadedFile('small.csv', self.make_csv(3).encode('utf-8')))
+        self.assertEqual(small['total_rows_detected'], 3)
+        self.assertFalse(small['total_rows_estimated'])
+
+    def test_header_mapping_is_cached_by_headers(self):
+        from unittest import mock
+        from .csv_import_handler import CSVImportHandler
+        
+        headers = ['Given Name', 'Surname', 'E-mail', 'Notes']
+        with mock.patch.object(CSVImportHandler, '_map_headers', wraps=CSVImportHandler()._map_headers) as map_headers:
+            first = CSVImportHandler().analyze_headers(headers)
+            second = CSVImportHandler().analyze_headers(list(headers))
+            CSVImportHandler().analyze_headers(headers + ['Phone'])
+        
+        self.assertEqual(first, second)
+        self.assertEqual(map_headers.call_count, 2)
+    
+    def test_diagnostic_reads_only_the_sample(self):
+        import os
+        import tempfile
+        from .csv_diagnostic import CSVDiagnostic
+        
+        content = self.make_csv(5000)
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(content)
+        self.addCleanup(os.remove, handle.name)
+        
+        result = CSVDiagnostic().analyze_file(handle.name, sample_bytes=2048)
+        
+        self.assertTrue(result['sampled'])
+        self.assertEqual(result['delimiter_analysis']['recommended_delimiter'], ';')
+        self.assertLessEqual(len(result['content_sample']), 503)
+        self.assertIn(f'File size: {len(content)} bytes', result['info'])
+        self.assertTrue(any(line.startswith('Number of lines: ~') for line in result['info']))
+
+
+class UploadDecoderTest(TestCase):
+    """Uploads are decoded through one incremental detector and streaming wrapper"""
+    
+    def upload(self, content, encoding):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        return SimpleUploadedFile('customers.csv', content.encode(encoding), content_type='text/csv')
+    
+    def test_detects_boms_and_legacy_encodings(self):
+        from .uploads import detect_encoding, read_text
+        
+        content = 'first_name,last_name,email\nJosé,Müller,jose@example.com\n'
+        for encoding, expected in (('utf-8-sig', 'utf-8-sig'), ('utf-16', 'utf-16')):
+            upload = self.upload(content, encoding)
+            self.assertEqual(detect_encoding(upload), (expected, 1.0))
+            self.assertEqual(read_text(upload), content)
+        
+        upload = self.upload(content * 50, 'latin-1')
+        self.assertEqual(read_text(upload), content * 50)
+        self.assertEqual(upload.tell(), upload.size)
+        self.assertFalse(upload.closed)
+    
+    def test_ascii_head_is_widened_to_utf8(self):
+        from .uploads import detect_encoding, read_text
+        
+        content = 'first_name,last_name,email\n' + 'Ann,Lee,ann@example.com\n' * 2000 + 'Zoë,Ng,zoe@example.com\n'
+        upload = self.upload(content, 'utf-8')
+        
+        encoding, _ = detect_encoding(upload, max_bytes=4096)
+        self.assertEqual(encoding, 'utf-8-sig')
+        self.assertEqual(upload.tell(), 0)
+        self.assertTrue(read_text(upload).endswith('Zoë,Ng,zoe@example.com\n'))
+    
+    def test_api_import_reads_latin1_uploads(self):
+        from rest_framework.test import APIClient
+        
+        client = APIClient()
+        client.force_authenticate(user=User.objects.create_user(username='uploader', password='testpass123'))
+        content = 'first_name,last_name,email\n' + ''.join(
+            f'Renée{i},Lefèvre{i},renee{i}@example.com\n' for i in range(20)
+        )
+        
+        response = client.post(
+            '/api/v1/customers/import_csv/', {'csv_file': self.upload(content, 'latin-1')}, format='multipart'
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(Customer.objects.get(email_primary='renee3@example.com').last_name, 'Lefèvre3')
+
+
+class CustomerImportPipelineTest(TestCase):
+    """Every importer runs through the shared staged pipeline"""
+    
+    def write_csv(self, content, encoding='utf-8'):
+        import tempfile
+        
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', encoding=encoding, delete=False)
+        with handle:
+            handle.write(content)
+        self.addCleanup(lambda: __import__('os').remove(handle.name))
+        return handle.name
+    
+    def test_duplicates_are_found_per_batch_not_per_row(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .importers import CleanImport
+        
+        Customer.objects.create(first_name='Old', last_name='Timer', email_primary='old@example.com')
+        Customer.objects.create(first_name='Same', last_name='Name', email_primary='same@example.com')
+        content = 'first_name,last_name,email\n' + ''.join(
+            f'Person,{chr(65 + i)}lpha,person{i}@example.com\n' for i in range(20)
+        ) + 'Again,Old,OLD@example.com\nSAME,name,other@example.com\nDup,Row,PERSON3@example.com\nNo,Email,\n'
+        
+        with CaptureQueriesContext(connection) as queries:
+            stats = CleanImport(batch_size=8).run(self.write_csv(content))
+        
+        self.assertEqual((stats.total, stats.imported, stats.skipped, stats.failed), (24, 20, 4, 0))
+        self.assertLess(len(queries), 40)
+        self.assertIn('Row 22: Customer with email old@example.com already exists in database, skipping', stats.warnings)
+        self.assertIn('Row 23: Customer with name SAME name already exists in database, skipping', stats.warnings)
+        self.assertIn('Row 24: Duplicate email person3@example.com found within CSV, skipping', stats.warnings)
+        self.assertIn('Row 25: Skipping - insufficient data', stats.warnings)
+
+    def test_write_conflicts_are_reported_per_batch(self):
+        """Rows lost to a concurrent insert are reported as skipped when their batch is written"""
+        from .importers import CleanImport
+
+        content = 'first_name,last_name,email\n' + ''.join(
+            f'Person,{chr(65 + i)}lpha,person{i}@example.com\n' for i in range(6)
+        )
+        pipeline = CleanImport(batch_size=4)
+        # Simulate another writer inserting person4 after the duplicate lookup
+        Customer.objects.create(first_name='Racing', last_name='Writer', email_primary='person4@example.com')
+        with patch.object(CleanImport, 'existing_keys', return_value=set()):
+            stats = pipeline.run(self.write_csv(content))
+
+        self.assertEqual((stats.total, stats.imported, stats.skipped, stats.failed), (6, 5, 1, 0))
+        self.assertIn('Row 6: Customer with email person4@example.com already exists in database, skipping', stats.warnings)
+
+    def test_dry_run_counts_without_writing(self):
+        from .importers import MasterListImport
+        
+        messages = []
+        content = 'first_name,last_name,primary_email\nAnn,Lee,ann@example.com\n,,nobody@example.com\n'
+        stats = MasterListImport(dry_run=True, log=lambda message, level: messages.append(message)).run(
+            self.write_csv(content, encoding='latin-1')
+        )
+        
+        self.assertEqual((stats.imported, stats.skipped), (1, 1))
+        self.assertEqual(Customer.objects.count(), 0)
+        self.assertIn('Row 2: Would create Ann Lee (ann@example.com)', messages)
+        self.assertTrue(messages[-1].startswith('Import complete: 1 imported, 1 skipped, 0 errors'))
+    
+    def test_commands_are_pipeline_configurations(self):
+        from io import StringIO
+        from django.core.management import call_command
+        
+        existing = Customer.objects.create(first_name='Had', last_name='Id', email_primary='had@example.com')
+        full = self.write_csv(
+            'ID,First Name,Last Name,Primary Email,Country/Region,Customer Type\n'
+            f'{existing.pk},Had,Id,had.again@example.com,,\n'
+            ',Ann,Lee,ann@example.com,Hong Kong SAR,Corporate Client\n'
+        )
+        out = StringIO()
+        call_command('import_customers_csv', file=full, stdout=out)
+        self.assertIn(f'Row 2: Customer with id {existing.pk} already exists in database, skipping', out.getvalue())
+        ann = Customer.objects.get(email_primary='ann@example.com')
+        self.assertEqual((ann.country_region, ann.customer_type), ('HK', 'corporate'))
+        
+        countries = self.write_csv(
+            'first_name,last_name,email_primary,country_region,website\n'
+            'Zed,Kim,zed@example.com,south korea,acme.com\nYo,Ng,yo@example.com,Atlantis,\n'
+        )
+        out = StringIO()
+        call_command('import_with_country_fix', countries, stdout=out)
+        self.assertIn("Row 3: Unknown country 'Atlantis', left empty", out.getvalue())
+        zed = Customer.objects.get(email_primary='zed@example.com')
+        self.assertEqual((zed.country_region, zed.company_website), ('KR', 'https://acme.com'))
+    
+    def test_parallel_preparation_matches_serial(self):
+        from .importers import YouTubeCreatorImport
+        
+        content = 'first_name,last_name,primary_email,company_primary\n' + ''.join(
+            f'Cara{i},Vlogs,,CaraChannel{i}\n' for i in range(6)
+        ) + 'Ann,Lee,ann@example.com,Big Corp Ltd.\nCara1,Vlogs,,CaraChannel1\n'
+        path = self.write_csv(content)
+        
+        with self.settings(CSV_IMPORT_CHUNK_SIZE=3):
+            serial = YouTubeCreatorImport(dry_run=True).run(path)
+            parallel = YouTubeCreatorImport(workers=2).run(path)
+        
+        self.assertEqual(parallel.warnings, serial.warnings)
+        self.assertEqual((parallel.total, parallel.imported, parallel.skipped), (8, 6, 1))
+        self.assertEqual(Customer.objects.with_youtube_handle('CaraChannel4').get().first_name, 'Cara4')
@@ -0,0 +1,296 @@
+# timeline.py - Activity timeline with batched writes and fan-out caching
+import contextvars
+import json
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_CAP = getattr(settings, 'TIMELINE_GLOBAL_CAP', 500)
+CUSTOMER_CAP = getattr(settings, 'TIMELINE_CUSTOMER_CAP', 100)
+KEY_PREFIX = 'crm:timeline'
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Extra members fetched past a cursor so entries sharing its timestamp can be skipped
+TIE_SLACK = 20
+
+_active_batch = contextvars.ContextVar('activity_batch', default=None)
+
+
+def _score(created_at: datetime) -> int:
+    """Microsecond timestamp used as sorted-set score and cursor prefix"""
+    # Exact integer arithmetic: a float timestamp can be off by a microsecond
+    return (created_at - EPOCH) // timedelta(microseconds=1)
+
+
+def make_cursor(entry: Dict[str, Any]) -> str:
+    return f"{entry['score']}_{entry['id']}"
+
+
+def parse_cursor(cursor: str) -> Tuple[int, str]:
+    """Split a cursor into (score, activity id); raises ValueError when malformed"""
+    score, _, activity_id = cursor.partition('_')
+    return int(score), activity_id
+
+
+def activity_to_entry(activity, customer_names: Optional[Dict[Any, Tuple[str, str]]] = None) -> Dict[str, Any]:
+    """Serialize an Activity into the compact dict stored in the timeline"""
+    customer = None
+    if activity.customer_id:
+        names = (customer_names or {}).get(activity.customer_id)
+        if names is None and type(activity).customer.is_cached(activity):
+            names = (activity.customer.first_name, activity.customer.last_name)
+        first_name, last_name = names or ('', '')
+        customer = {'id': str(activity.customer_id), 'first_name': first_name, 'last_name': last_name}
+
+    return {
+        'id': str(activity.id),
+        'score': _score(activity.created_at),
+        'activity_type': activity.activity_type,
+        'title': activity.title,
+        'description': activity.description,
+        'performed_by': activity.performed_by,
+        'created_at': activity.created_at.isoformat(),
+        'customer': customer,
+    }
+
+
+def entry_for_display(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of an entry with created_at parsed back into a datetime (for templates)"""
+    display = dict(entry)
+    display['created_at'] = parse_datetime(entry['created_at'])
+    return display
+
+
+class DatabaseTimelineBackend:
+    """Timeline reads served straight from the Activity table (created_at index)"""
+
+    def _queryset(self, customer_id=None):
+        from .models import Activity
+
+        queryset = Activity.objects.select_related('customer').only(
+            'id', 'activity_type', 'title', 'description', 'performed_by', 'created_at', 'customer_id',
+            'customer__id', 'customer__first_name', 'customer__last_name',
+        )
+        if customer_id:
+            queryset = queryset.filter(customer_id=customer_id)
+        return queryset
+
+    def latest(self, customer_id=None, limit=20) -> List[Dict[str, Any]]:
+        activities = self._queryset(customer_id).order_by('-created_at')[:limit]
+        return [activity_to_entry(activity) for activity in activities]
+
+    def exceeds(self, count: int, customer_id=None) -> bool:
+        """Whether more than `count` activities exist, without counting them all"""
+        return self._queryset(customer_id).order_by()[count:count + 1].exists()
+
+    def since(self, score: int, customer_id=None, limit=20) -> List[Dict[str, Any]]:
+        after = EPOCH + timedelta(microseconds=score)
+        activities = self._queryset(customer_id).filter(created_at__gte=after).order_by('created_at', 'id')[:limit + TIE_SLACK]
+        return [activity_to_entry(activity) for activity in activities]
+
+
+class RedisTimelineBackend:
+    """Capped sorted sets (score = created_at in microseconds) per customer plus one global set"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def _key(self, customer_id=None):
+        return f"{KEY_PREFIX}:customer:{customer_id}" if customer_id else f"{KEY_PREFIX}:global"
+
+    def publish(self, entries: List[Dict[str, Any]]):
+        """Fan entries out to the global and per-customer sets in one pipeline round-trip"""
+        if not entries:
+            return
+        pipe = self.connection.pipeline(transaction=False)
+        touched = {self._key(): GLOBAL_CAP}
+        for entry in entries:
+            member = json.dumps(entry, sort_keys=True)
+            pipe.zadd(self._key(), {member: entry['score']})
+            if entry['customer']:
+                customer_key = self._key(entry['customer']['id'])
+                pipe.zadd(customer_key, {member: entry['score']})
+                touched[customer_key] = CUSTOMER_CAP
+        for key, cap in touched.items():
+            pipe.zremrangebyrank(key, 0, -(cap + 1))
+        pipe.execute()
+
+    def latest(self, customer_id=None, limit=20) -> List[Dict[str, Any]]:
+        members = self.connection.zrevrange(self._key(customer_id), 0, limit - 1)
+        return [json.loads(member) for member in members]
+
+    def since(self, score: int, customer_id=None, limit=20) -> Optional[List[Dict[str, Any]]]:
+        """
+        Entries from `score` on, or None when the set cannot answer without a
+        gap: the key was evicted, or trimming has dropped entries newer than
+        the cursor (it is older than the oldest member)
+        """
+        key = self._key(customer_id)
+        oldest = self.connection.zrange(key, 0, 0, withscores=True)
+        if not oldest or score < oldest[0][1]:
+            return None
+        members = self.connection.zrangebyscore(key, score, '+inf', start=0, num=limit + TIE_SLACK)
+        return [json.loads(member) for member in members]
+
+    def fill(self, entries: List[Dict[str, Any]], customer_id=None):
+        """Load entries into a single set (used when warming an evicted key)"""
+        if not entries:
+            return
+        key = self._key(customer_id)
+        self.connection.zadd(key, {json.dumps(entry, sort_keys=True): entry['score'] for entry in entries})
+
+
+class ActivityTimeline:
+    """
+    Recent-activity feed for the dashboard and the timeline API.
+
+    Reads cost O(page): with Redis they come from capped sorted sets, otherwise
+    from the Activity created_at index. Writes go through record(), which
+    buffers inside activity_batch() and fans out after the INSERT.
+    """
+
+    def __init__(self):
+        self.database = DatabaseTimelineBackend()
+        self._redis = None
+
+    @property
+    def redis(self) -> Optional[RedisTimelineBackend]:
+        if self._redis is None:
+            from .cache_backends import uses_redis
+            if not uses_redis():
+                return None
+            try:
+                from django_redis import get_redis_connection
+                self._redis = RedisTimelineBackend(get_redis_connection('default'))
+            except Exception as e:
+                logger.warning(f"Timeline Redis backend unavailable: {e}")
+                return None
+        return self._redis
+
+    def record(self, activity):
+        """Save an activity, or buffer it when an activity_batch() is open"""
+        batch = _active_batch.get()
+        if batch is not None:
+            batch.append(activity)
+            return activity
+        activity.save()
+        transaction.on_commit(lambda: self.publish([activity]))
+        return activity
+
+    def record_many(self, activities: Iterable):
+        """Insert activities in one statement and fan them out"""
+        from .models import Activity
+
+        activities = list(activities)
+        if not activities:
+            return []
+        Activity.objects.bulk_create(activities)
+        transaction.on_commit(lambda: self.publish(activities))
+        return activities
+
+    def publish(self, activities: List):
+        backend = self.redis
+        if backend is None:
+            return
+        try:
+            customer_names = self._customer_names(activities)
+            backend.publish([activity_to_entry(activity, customer_names) for activity in activities])
+        except Exception as e:
+            logger.error(f"Failed to publish activities to timeline: {e}")
+
+    def latest(self, customer_id=None, limit=20) -> List[Dict[str, Any]]:
+        """Newest entries first"""
+        backend = self.redis
+        if backend is not None:
+            try:
+                entries = backend.latest(customer_id, limit)
+                if len(entries) < limit and self.database.exceeds(len(entries), customer_id):
+                    # Evicted, or recreated by publish() after an eviction with
+                    # only the newest entries: refill before answering
+                    self.warm(customer_id)
+                    entries = backend.latest(customer_id, limit)
+                return entries
+            except Exception as e:
+                logger.error(f"Timeline read failed, falling back to database: {e}")
+        return self.database.latest(customer_id, limit)
+
+    def since(self, cursor: str, customer_id=None, limit=20) -> List[Dict[str, Any]]:
+        """Entries strictly newer than the cursor, oldest first"""
+        score, activity_id = parse_cursor(cursor)
+        entries = None
+        backend = self.redis
+        if backend is not None:
+            try:
+                entries = backend.since(score, customer_id, limit)
+                if entries is None:
+                    entries = self.database.since(score, customer_id, limit)
+                    self.warm(customer_id)
+            except Exception as e:
+                logger.error(f"Timeline read failed, falling back to database: {e}")
+        if entries is None:
+            entries = self.database.since(score, customer_id, limit)
+
+        entries = sorted(
+            (entry for entry in entries if (entry['score'], entry['id']) > (score, activity_id)),
+            key=lambda entry: (entry['score'], entry['id']),
+        )
+        return entries[:limit]
+
+    def warm(self, customer_id=None):
+        """Refill a (possibly evicted) sorted set from the database"""
+        backend = self.redis
+        if backend is None:
+            return []
+        cap = CUSTOMER_CAP if customer_id else GLOBAL_CAP
+        entries = self.database.latest(customer_id, cap)
+        backend.fill(entries, customer_id)
+        return entries
+
+    def _customer_names(self, activities) -> Dict[Any, Tuple[str, str]]:
+        """Load names for customers not already cached on the activities, in one query"""
+        from .models import Activity, Customer
+
+        missing = {
+            activity.customer_id for activity in activities
+            if activity.customer_id and not Activity.customer.is_cached(activity)
+        }
+        if not missing:
+            return {}
+        return {
+            row[0]: (row[1], row[2])
+            for row in Customer.objects.filter(id__in=missing).values_list('id', 'first_name', 'last_name')
+        }
+
+
+timeline = ActivityTimeline()
+
+
+@contextmanager
+def activity_batch():
+    """
+    Buffer Activity.log() calls and write them with a single bulk INSERT on exit.
+
+        with activity_batch():
+            for payment in payments:
+                Activity.log('payment_received', ...)
+    """
+    if _active_batch.get() is not None:
+        # Nested batch: the outermost one flushes
+        yield _active_batch.get()
+        return
+
+    buffer = []
+    token = _active_batch.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _active_batch.reset(token)
+    timeline.record_many(buffer)
@@ -0,0 +1,116 @@
+# uploads.py - Incremental encoding detection and streaming text decoding for uploaded files
+import codecs
+import io
+import logging
+from typing import BinaryIO, Optional, Tuple
+
+# Optional chardet import with fallback
+try:
+    from chardet.universaldetector import UniversalDetector
+except ImportError:
+    UniversalDetector = None
+
+logger = logging.getLogger(__name__)
+
+DETECT_CHUNK_SIZE = 16 * 1024
+DETECT_MAX_BYTES = 1024 * 1024  # give up and take the detector's best guess after this much
+READ_CHUNK_SIZE = 1024 * 1024
+
+# UTF-32 LE starts with the UTF-16 LE BOM, so it has to be checked first
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def normalize_encoding(encoding: Optional[str]) -> str:
+    """
+    Codec to decode with for a detected encoding. ASCII is widened to UTF-8
+    (a sample can be pure ASCII while later rows are not) and UTF-8 is read
+    as utf-8-sig so a BOM never ends up in the first header
+    """
+    if not encoding:
+        return 'utf-8-sig'
+    try:
+        name = codecs.lookup(encoding).name
+    except LookupError:
+        logger.warning(f"Unknown encoding {encoding!r} detected, decoding as UTF-8")
+        return 'utf-8-sig'
+    if name in ('ascii', 'utf-8'):
+        return 'utf-8-sig'
+    return name
+
+
+def detect_encoding(stream: BinaryIO, max_bytes: int = DETECT_MAX_BYTES) -> Tuple[str, float]:
+    """
+    Detect the encoding of a binary stream as (codec, confidence).
+
+    A BOM settles it straight away. Otherwise chunks are checked for UTF-8
+    validity and fed to chardet's UniversalDetector until the two agree or
+    `max_bytes` have been read, so a large upload is never loaded just to find
+    its encoding. Bytes that are valid UTF-8 win over chardet's guess, which
+    tends to call UTF-8 text with a few accented names ISO-8859-1. The stream
+    is rewound to where it started.
+    """
+    start = stream.tell()
+    try:
+        chunk = stream.read(DETECT_CHUNK_SIZE)
+        for bom, encoding in BOMS:
+            if chunk.startswith(bom):
+                return encoding, 1.0
+
+        detector = UniversalDetector() if UniversalDetector is not None else None
+        utf8 = codecs.getincrementaldecoder('utf-8')()
+        is_utf8 = True
+        fed = 0
+        while chunk:
+            if is_utf8:
+                try:
+                    # final=False: a character cut in half at a chunk boundary is completed by the next chunk
+                    utf8.decode(chunk, final=False)
+                except UnicodeDecodeError:
+                    is_utf8 = False
+            if detector is not None:
+                detector.feed(chunk)
+            fed += len(chunk)
+            # Valid UTF-8 so far keeps reading (a later byte may still rule it out)
+            if fed >= max_bytes or (not is_utf8 and (detector is None or detector.done)):
+                break
+            chunk = stream.read(DETECT_CHUNK_SIZE)
+    finally:
+        stream.seek(start)
+
+    if is_utf8:
+        return 'utf-8-sig', 1.0
+    if detector is None:
+        # Latin-1 decodes any byte sequence
+        return 'latin-1', 0.0
+    detector.close()
+    return normalize_encoding(detector.result['encoding']), detector.result['confidence'] or 0.0
+
+
+def open_text(stream: BinaryIO, encoding: Optional[str] = None, errors: str = 'replace') -> io.TextIOWrapper:
+    """
+    Decode a binary upload as a text stream, detecting the encoding when not
+    given. newline='' leaves line endings to the csv module. Call detach() on
+    the wrapper to hand the upload back without closing it
+    """
+    if encoding is None:
+        encoding, confidence = detect_encoding(stream)
+        logger.debug(f"Upload encoding: {encoding} (confidence: {confidence:.2f})")
+    return io.TextIOWrapper(stream, encoding=encoding, errors=errors, newline='')
+
+
+def read_text(stream: BinaryIO, encoding: Optional[str] = None, errors: str = 'replace') -> str:
+    """
+    The whole upload as text, decoded chunk by chunk through open_text so the
+    raw bytes are never held in memory next to the decoded string
+    """
+    text = open_text(stream, encoding, errors)
+    try:
+        return ''.join(iter(lambda: text.read(READ_CHUNK_SIZE), ''))
+    finally:
+        text.detach()
@@ -2,7 +2,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views, frontend_views
-# from .monitoring import health_check_view, metrics_view  # Temporarily disabled
+from .monitoring import health_check_view, livez, readyz
+from .metrics import metrics_view
 
 # API Routes
 router = DefaultRouter()
@@ -11,6 +12,8 @@ router.register(r'courses', views.CourseViewSet)
 router.register(r'enrollments', views.EnrollmentViewSet)
 router.register(r'conferences', views.ConferenceViewSet)
 router.register(r'communications', views.CommunicationLogViewSet)
+router.register(r'revenue', views.RevenueViewSet, basename='revenue')
+router.register(r'timeline', views.TimelineViewSet, basename='timeline')
 
 app_name = 'crm'
 
@@ -51,6 +54,8 @@ urlpatterns = [
     path('api-auth/', include('rest_framework.urls')),
 
     # Monitoring endpoints
-    # path('health/', health_check_view, name='health_check'),  # Temporarily disabled
-    # path('metrics/', metrics_view, name='metrics'),  # Temporarily disabled
+    path('livez', livez, name='livez'),
+    path('readyz', readyz, name='readyz'),
+    path('health/', health_check_view, name='health_check'),
+    path('metrics/', metrics_view, name='metrics'),
 ]
@@ -17,6 +17,8 @@ def generate_customer_csv_response(queryset=None):
     """
     if queryset is None:
         queryset = Customer.objects.all()
+    # Secondary address and social links live on CustomerProfile
+    queryset = queryset.select_related('profile')
     
     response = HttpResponse(content_type='text/csv')
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -2,32 +2,58 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action, throttle_classes
 from rest_framework.response import Response
+from rest_framework.parsers import JSONParser
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Count, Prefetch
+from django.db import transaction
+from django.db.models import Q, Count
+from django.db.models.functions import Lower
 from django.http import HttpResponse, HttpResponseForbidden
 from django.contrib import messages
 from django.shortcuts import render, redirect
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.cache import cache
-from django.views.decorators.cache import cache_page
-from django.utils.decorators import method_decorator
-from .cache_utils import cache_result, cache_queryset_result, CacheManager
+from .cache_utils import cache_result, CacheManager
 import csv
 import datetime
-from .models import Customer, Course, Enrollment, Conference, ConferenceRegistration, CommunicationLog
+from .models import Customer, Course, Enrollment, Conference, ConferenceRegistration, CommunicationLog, StripeRevenueRollup
 from .serializers import (
-    CustomerSerializer, CourseSerializer, EnrollmentSerializer, 
-    ConferenceSerializer, CommunicationLogSerializer
+    CustomerSerializer, CustomerListSerializer, CourseSerializer, EnrollmentSerializer, 
+    ConferenceSerializer, CommunicationLogSerializer, StripeRevenueRollupSerializer,
+    requested_fields, values_plan, serialize_values
 )
 from .communication_services import CommunicationManager
 from .forms import CustomerForm
 from .utils import generate_customer_csv_response, validate_uat_access
 from .csv_import_handler import CSVImportHandler
+from .uploads import read_text
 from .data_quality import DataQualityService
+from .revenue import ROLLUP_DIMENSIONS, revenue_totals
+from .timeline import timeline, make_cursor
+from .query_budget import QueryBudgetMixin
+from .conditional import ConditionalGetMixin
+from .bulk import CustomerBulkProcessor, NDJSONParser, bulk_items
+from .changes import CursorExpired, customer_changes
+from .aggregates import CUSTOMER_DIMENSIONS, label_results, segment_counts
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class ValuesListMixin:
+    """Render list pages straight from values() rows when the serializer allows it"""
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        plan = values_plan(serializer)
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.filter_queryset(self.get_queryset()).values(*plan[0])
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serialize_values(page, plan))
+        return Response(serialize_values(rows, plan))
+
+
+class CustomerViewSet(ConditionalGetMixin, QueryBudgetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -35,25 +61,109 @@ class CustomerViewSet(viewsets.ModelViewSet):
     search_fields = ['first_name', 'last_name', 'email_primary', 'company_primary']
     ordering_fields = ['created_at', 'last_name', 'first_name']
     ordering = ['-created_at']
+    query_budget = {'list': 3, 'retrieve': 2, 'changes': 2, 'aggregate': 1}
+    conditional_collection = 'customers'
+    last_modified_field = 'updated_at'
+    MAX_CHANGES_LIMIT = 1000
     
-    @cache_queryset_result(timeout=300, key_prefix='customer_viewset')
     def get_queryset(self):
-        """Optimized queryset with prefetch for related data and caching"""
-        return Customer.objects.select_related().prefetch_related(
-            Prefetch('enrollment_set', queryset=Enrollment.objects.select_related('course')),
-            Prefetch('communicationlog_set', queryset=CommunicationLog.objects.select_related()),
-            Prefetch('youtube_messages', queryset=self._get_youtube_messages_queryset())
-        ).only(
-            'id', 'first_name', 'last_name', 'email_primary', 'customer_type', 
-            'status', 'phone_primary', 'country_region', 'created_at', 'source'
-        )
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            # Full representations include the profile columns; join them instead of a lazy query
+            queryset = queryset.select_related('profile')
+        return queryset
     
-    def _get_youtube_messages_queryset(self):
-        """Optimized YouTube messages queryset"""
-        from .models import YouTubeMessage
-        return YouTubeMessage.objects.select_related().only(
-            'id', 'customer_id', 'status', 'subject', 'sent_at'
-        )
+    def get_serializer_class(self):
+        # The detail view, writes and `?fields=` requests use the full serializer
+        if self.action == 'list' and not requested_fields(self.request):
+            return CustomerListSerializer
+        return CustomerSerializer
+
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Incremental sync: changes and deletions after ?since=<cursor>, oldest first"""
+        try:
+            limit = min(int(request.query_params.get('limit', 100)), self.MAX_CHANGES_LIMIT)
+        except ValueError:
+            return Response({'error': 'Invalid limit'}, status=400)
+        
+        try:
+            page = customer_changes(self.get_serializer(), request.query_params.get('since'), max(limit, 1))
+        except CursorExpired:
+            return Response({'error': 'Cursor expired; resync without ?since='}, status=status.HTTP_410_GONE)
+        except ValueError:
+            return Response({'error': 'Invalid cursor'}, status=400)
+        return Response(page)
+    
+    @action(detail=False, methods=['get'])
+    def aggregate(self, request):
+        """
+        Segment counts in one query: ?group_by=status&group_by=customer_type,status
+        (repeat group_by per grouping set; an empty value is the grand total).
+        Filters: ?<dimension>=a,b and ?created_after= / ?created_before= (ISO dates).
+        """
+        from django.utils.dateparse import parse_date
+        
+        queryset = Customer.objects.all()
+        for dimension in CUSTOMER_DIMENSIONS:
+            value = request.query_params.get(dimension)
+            if value is not None:
+                queryset = queryset.filter(**{f'{dimension}__in': value.split(',')})
+        for param, lookup in (('created_after', 'created_at__date__gte'), ('created_before', 'created_at__date__lte')):
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    # None when malformed; ValueError for well-formed impossible dates (2024-02-30)
+                    day = parse_date(value)
+                except ValueError:
+                    day = None
+                if day is None:
+                    return Response({'error': f'Invalid {param}'}, status=400)
+                queryset = queryset.filter(**{lookup: day})
+        
+        grouping_sets = [
+            [dim.strip() for dim in value.split(',') if dim.strip()]
+            for value in request.query_params.getlist('group_by')
+        ] or [[]]
+        try:
+            results = segment_counts(grouping_sets, queryset)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        return Response({'results': label_results(results)})
+    
+    @action(detail=False, methods=['post', 'patch'], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """Create (POST) or partially update (PATCH) up to MAX_BULK_ITEMS customers in one request"""
+        items = bulk_items(request.data)
+        processor = CustomerBulkProcessor(CustomerSerializer, context=self.get_serializer_context())
+        if request.method == 'POST':
+            results = processor.create(items)
+        else:
+            results = processor.update(items)
+        return self._bulk_response(results, status.HTTP_201_CREATED if request.method == 'POST' else status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['post'], url_path='bulk/delete', parser_classes=[JSONParser, NDJSONParser])
+    def bulk_delete(self, request):
+        """Delete customers by id: {"ids": [...]} or a list of ids"""
+        data = request.data
+        ids = bulk_items(data.get('ids') if isinstance(data, dict) else data)
+        processor = CustomerBulkProcessor(CustomerSerializer, context=self.get_serializer_context())
+        return self._bulk_response(processor.delete(ids), status.HTTP_200_OK)
+    
+    def _bulk_response(self, results, success_status):
+        failed = sum(1 for result in results if result['status'] == 'error')
+        if results and failed == len(results):
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif failed:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = success_status
+        return Response({
+            'total': len(results),
+            'succeeded': len(results) - failed,
+            'failed': failed,
+            'results': results,
+        }, status=response_status)
     
     @action(detail=True, methods=['post'])
     @throttle_classes([UserRateThrottle])
@@ -82,14 +192,11 @@ class CustomerViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Contact parameter required'}, status=400)
         
         # Optimized query with indexes
-        customers = Customer.objects.filter(
-            Q(email_primary__iexact=contact) |  # Exact match first (faster)
+        customers = Customer.objects.select_related('profile').alias(email_lower=Lower('email_primary')).filter(
+            Q(email_lower=contact.strip().lower()) |  # Exact match first (lower(email_primary) index)
             Q(phone_primary__icontains=contact) |
             Q(whatsapp_number__icontains=contact) |
             Q(email_primary__icontains=contact)  # Partial match last
-        ).select_related().only(
-            'id', 'first_name', 'last_name', 'email_primary', 
-            'phone_primary', 'whatsapp_number', 'customer_type', 'status'
         )[:20]  # Limit results for performance
         
         serializer = self.get_serializer(customers, many=True)
@@ -111,16 +218,13 @@ class CustomerViewSet(viewsets.ModelViewSet):
             return Response({'error': 'No CSV file provided'}, status=400)
         
         csv_file = request.FILES['csv_file']
-        try:
-            csv_content = csv_file.read().decode('utf-8-sig')  # Handle BOM
-        except UnicodeDecodeError:
-            try:
-                csv_content = csv_file.read().decode('latin-1')
-            except UnicodeDecodeError:
-                return Response({'error': 'Unable to decode CSV file. Please ensure it is UTF-8 or Latin-1 encoded.'}, status=400)
+        
+        # Only the head of the file is read; the row total is estimated from its
+        # size unless an exact count is asked for, which streams the rest
+        exact_count = str(request.data.get('exact_count', '')).lower() == 'true'
         
         import_handler = CSVImportHandler()
-        preview_result = import_handler.preview_import(csv_content, max_rows=10)
+        preview_result = import_handler.preview_upload(csv_file, max_rows=10, exact_count=exact_count)
         
         return Response(preview_result)
     
@@ -134,13 +238,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
         csv_file = request.FILES['csv_file']
         field_mapping = request.data.get('field_mapping')  # Optional custom mapping
         
-        try:
-            csv_content = csv_file.read().decode('utf-8-sig')  # Handle BOM
-        except UnicodeDecodeError:
-            try:
-                csv_content = csv_file.read().decode('latin-1')
-            except UnicodeDecodeError:
-                return Response({'error': 'Unable to decode CSV file. Please ensure it is UTF-8 or Latin-1 encoded.'}, status=400)
+        csv_content = read_text(csv_file)
         
         # Parse field mapping if provided as JSON string
         if field_mapping and isinstance(field_mapping, str):
@@ -211,29 +309,22 @@ class CustomerViewSet(viewsets.ModelViewSet):
                     'error': 'Invalid action. Use "fix_all" or "report_only"'
                 }, status=400)
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(ConditionalGetMixin, QueryBudgetMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['course_type', 'is_active']
     search_fields = ['title', 'description']
+    query_budget = {'list': 2, 'retrieve': 1}
+    conditional_collection = 'courses'
+    # Replaces a URL-keyed page cache that served lists up to 10 minutes stale
+    conditional_cache_timeout = settings.CACHE_TTL['course_list']
     
-    @cache_queryset_result(timeout=600, key_prefix='course_viewset')
     def get_queryset(self):
-        """Optimized queryset with prefetch for enrollments and caching"""
-        return Course.objects.prefetch_related(
-            Prefetch('enrollment_set', queryset=Enrollment.objects.select_related('customer').only(
-                'id', 'customer_id', 'course_id', 'status', 'enrollment_date'
-            ))
-        ).only(
-            'id', 'title', 'course_type', 'is_active', 'start_date', 
-            'end_date', 'price', 'max_participants'
-        )
-    
-    @method_decorator(cache_page(settings.CACHE_TTL['course_list']))
-    def list(self, request, *args, **kwargs):
-        """Cached course list"""
-        return super().list(request, *args, **kwargs)
+        """Courses with active enrollment counts computed in the same query"""
+        return Course.objects.annotate(
+            active_enrollments=Count('enrollment', filter=Q(enrollment__status__in=Enrollment.ACTIVE_STATUSES))
+        ).order_by('start_date', 'id')
     
     @action(detail=True, methods=['post'])
     def enroll_customer(self, request, pk=None):
@@ -243,40 +334,127 @@ class CourseViewSet(viewsets.ModelViewSet):
         
         try:
             customer = Customer.objects.get(id=customer_id)
-            enrollment, created = Enrollment.objects.get_or_create(
-                customer=customer,
-                course=course,
-                defaults={'status': 'registered'}
-            )
-            
-            if created:
-                return Response({'status': 'Customer enrolled successfully'})
-            else:
-                return Response({'status': 'Customer already enrolled'}, status=400)
-                
         except Customer.DoesNotExist:
             return Response({'error': 'Customer not found'}, status=404)
+        
+        with transaction.atomic():
+            # Lock the course row so concurrent enrollments can't overbook it
+            course = Course.objects.select_for_update().get(pk=course.pk)
+            if Enrollment.objects.filter(customer=customer, course=course).exists():
+                return Response({'status': 'Customer already enrolled'}, status=400)
+            if course.enrollment_count >= course.max_participants:
+                return Response({'error': 'Course is full'}, status=400)
+            Enrollment.objects.create(customer=customer, course=course, status='registered')
+        
+        return Response({'status': 'Customer enrolled successfully'})
 
-class EnrollmentViewSet(viewsets.ModelViewSet):
-    queryset = Enrollment.objects.all()
+class EnrollmentViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+    queryset = Enrollment.objects.select_related('customer', 'course')
     serializer_class = EnrollmentSerializer
+    query_budget = {'list': 2, 'retrieve': 1}
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['status', 'payment_status', 'customer', 'course']
 
-class ConferenceViewSet(viewsets.ModelViewSet):
-    queryset = Conference.objects.all()
+class ConferenceViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+    queryset = Conference.objects.annotate(registrations=Count('conferenceregistration')).order_by('start_date', 'id')
     serializer_class = ConferenceSerializer
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['is_active']
     search_fields = ['name', 'description', 'venue']
+    query_budget = {'list': 2, 'retrieve': 1}
 
-class CommunicationLogViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = CommunicationLog.objects.all()
+class CommunicationLogViewSet(QueryBudgetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = CommunicationLog.objects.select_related('customer')
     serializer_class = CommunicationLogSerializer
+    query_budget = {'list': 2, 'retrieve': 1}
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['customer', 'channel', 'is_outbound']
     ordering = ['-sent_at']
 
+class RevenueViewSet(QueryBudgetMixin, viewsets.ReadOnlyModelViewSet):
+    """Stripe revenue rollups with date-range queries (?granularity=day|month&start=&end=)"""
+    queryset = StripeRevenueRollup.objects.all()
+    serializer_class = StripeRevenueRollupSerializer
+    query_budget = {'list': 2, 'retrieve': 1, 'totals': 1}
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = list(ROLLUP_DIMENSIONS)
+    
+    def get_date_range(self):
+        """Parse start/end query parameters into dates"""
+        from django.utils.dateparse import parse_date
+        from rest_framework.exceptions import ValidationError
+        
+        date_range = []
+        for param in ('start', 'end'):
+            value = self.request.query_params.get(param)
+            try:
+                parsed = parse_date(value) if value else None
+            except ValueError:
+                parsed = None
+            if value and parsed is None:
+                raise ValidationError({param: 'Use YYYY-MM-DD format'})
+            date_range.append(parsed)
+        return date_range
+    
+    def get_granularity(self):
+        from rest_framework.exceptions import ValidationError
+        
+        granularity = self.request.query_params.get('granularity', 'month')
+        if granularity not in dict(StripeRevenueRollup.GRANULARITY_CHOICES):
+            raise ValidationError({'granularity': 'Use "day" or "month"'})
+        return granularity
+    
+    def get_queryset(self):
+        start, end = self.get_date_range()
+        queryset = StripeRevenueRollup.objects.filter(granularity=self.get_granularity())
+        if start:
+            queryset = queryset.filter(period_start__gte=start)
+        if end:
+            queryset = queryset.filter(period_start__lte=end)
+        return queryset.order_by('period_start', 'source_account', 'currency', 'plan_name', 'site')
+    
+    @action(detail=False, methods=['get'])
+    def totals(self, request):
+        """Revenue per period summed across dimensions, for charts"""
+        start, end = self.get_date_range()
+        filters = {dim: request.query_params.get(dim) for dim in ROLLUP_DIMENSIONS}
+        rows = revenue_totals(self.get_granularity(), start, end, **filters)
+        return Response(list(rows))
+
+
+class TimelineViewSet(QueryBudgetMixin, viewsets.ViewSet):
+    """Activity timeline feed; poll with ?since=<cursor> to receive only new entries"""
+    MAX_LIMIT = 100
+    query_budget = {'list': 1}
+    
+    def list(self, request):
+        import uuid
+        
+        customer_id = request.query_params.get('customer') or None
+        if customer_id:
+            try:
+                customer_id = str(uuid.UUID(customer_id))
+            except ValueError:
+                return Response({'error': 'Invalid customer id'}, status=400)
+        
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), self.MAX_LIMIT))
+        except ValueError:
+            return Response({'error': 'Invalid limit'}, status=400)
+        
+        since = request.query_params.get('since')
+        if since:
+            try:
+                entries = timeline.since(since, customer_id, limit)
+            except ValueError:
+                return Response({'error': 'Invalid cursor'}, status=400)
+            cursor = make_cursor(entries[-1]) if entries else since
+        else:
+            entries = timeline.latest(customer_id, limit)
+            cursor = make_cursor(entries[0]) if entries else None
+        
+        return Response({'results': entries, 'cursor': cursor})
+
 
 # Traditional Django views for admin interface
 @login_required
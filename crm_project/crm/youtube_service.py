@@ -95,7 +95,7 @@ class YouTubeMessagingService:
         """Get or create customer based on YouTube handle"""
         try:
             # Try to find existing customer
-            customer = Customer.objects.get(youtube_handle__iexact=youtube_handle)
+            customer = Customer.objects.with_youtube_handle(youtube_handle).get()
             return customer
         except Customer.DoesNotExist:
             # Create new YouTuber customer
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from decouple import config
 from django.core.exceptions import ImproperlyConfigured
 
@@ -34,6 +35,7 @@ ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1', cast=lamb
 
 # Security Settings - Environment Aware
 SECURE_SSL_REDIRECT = config('SECURE_SSL_REDIRECT', default=not DEBUG, cast=bool)
+SECURE_REDIRECT_EXEMPT = [r'^livez$', r'^readyz$']  # plain-HTTP orchestrator probes
 SESSION_COOKIE_SECURE = config('SESSION_COOKIE_SECURE', default=not DEBUG, cast=bool)
 CSRF_COOKIE_SECURE = config('CSRF_COOKIE_SECURE', default=not DEBUG, cast=bool)
 
@@ -80,6 +82,7 @@ INSTALLED_APPS = [
     
     # Third party apps
     'rest_framework',
+    'rest_framework.authtoken',
     'django_filters',
     'corsheaders',
     
@@ -92,13 +95,14 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'crm.middleware.security.SecurityHeadersMiddleware',
-    'crm.middleware.security.RateLimitMiddleware',
     'crm.middleware.security.SecurityAuditMiddleware',
-    'crm.middleware.security.PerformanceMonitoringMiddleware',
+    'crm.performance_middleware.PerformanceMonitoringMiddleware',
+    'crm.performance_middleware.CachePerformanceMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'crm.middleware.security.RateLimitMiddleware',  # after auth so users get per-account limits
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -333,7 +337,8 @@ DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@learninginsti
 # Redis Caching Configuration
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        # django_redis RedisCache reporting hit ratios/latency per key prefix to /metrics
+        'BACKEND': 'crm.cache_backends.InstrumentedRedisCache',
         'LOCATION': config('REDIS_URL', default='redis://localhost:6379/1'),
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
@@ -352,8 +357,49 @@ CACHE_TTL = {
     'dashboard_stats': 60 * 5,  # 5 minutes (faster updates for UAT)
     'api_responses': 60 * 3,  # 3 minutes for API caching
     'query_cache': 60 * 1,    # 1 minute for query results
+    'csv_header_mapping': 60 * 60 * 24,  # 24 hours, keyed by header hash
+    'api_token_user': 60,  # 1 minute, rate limiter's API token -> user lookup
 }
 
+# Log retention - CommunicationLog/Activity are partitioned by month on PostgreSQL
+LOG_RETENTION_DAYS = config('LOG_RETENTION_DAYS', default=180, cast=int)
+LOG_ARCHIVE_DIR = config('LOG_ARCHIVE_DIR', default=str(BASE_DIR / 'archive'))
+
+# Batched retention deletes (used where partitions cannot be dropped)
+RETENTION_DELETE_BATCH_SIZE = config('RETENTION_DELETE_BATCH_SIZE', default=1000, cast=int)
+RETENTION_DELETE_SLEEP = config('RETENTION_DELETE_SLEEP', default=0.1, cast=float)
+RETENTION_TIME_BUDGET = config('RETENTION_TIME_BUDGET', default=300, cast=int)  # seconds per run
+
+# Request metrics (/metrics) - staff users and these scraper IPs may read them
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1', cast=lambda v: [s.strip() for s in v.split(',')])
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=10, cast=int)  # seconds between Redis pushes
+
+# Query budgets - raise on N+1/over-budget views under the test runner, sample in production
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default='test' in sys.argv, cast=bool)
+QUERY_BUDGET_SAMPLE_RATE = config('QUERY_BUDGET_SAMPLE_RATE', default=0.01, cast=float)
+QUERY_BUDGET_N_PLUS_ONE_THRESHOLD = config('QUERY_BUDGET_N_PLUS_ONE_THRESHOLD', default=3, cast=int)
+
+# Bulk customer API (/api/v1/customers/bulk/) - items accepted per request
+CUSTOMER_BULK_MAX_ITEMS = config('CUSTOMER_BULK_MAX_ITEMS', default=5000, cast=int)
+
+# Customer change feed (/api/v1/customers/changes/)
+CHANGE_FEED_SETTLE_SECONDS = config('CHANGE_FEED_SETTLE_SECONDS', default=5, cast=int)  # hold back rows this fresh
+CHANGE_FEED_TOMBSTONE_DAYS = config('CHANGE_FEED_TOMBSTONE_DAYS', default=90, cast=int)
+
+# Health checks - /livez and /readyz are cheap; /health/ serves diagnostics refreshed in the background
+HEALTH_DIAGNOSTICS_MAX_AGE = config('HEALTH_DIAGNOSTICS_MAX_AGE', default=60, cast=int)  # seconds
+
+# UUID version for new primary keys: 7 (time-ordered, index-friendly) or 4 (random)
+PRIMARY_KEY_UUID_VERSION = config('PRIMARY_KEY_UUID_VERSION', default=7, cast=int)
+
+# Index advisor - record query shapes of budget-sampled requests for `optimize_db --advise-indexes`
+INDEX_ADVISOR_CAPTURE = config('INDEX_ADVISOR_CAPTURE', default=False, cast=bool)
+
+# CSV import - row validation processes (0 = one per CPU) and rows per worker chunk
+CSV_IMPORT_WORKERS = config('CSV_IMPORT_WORKERS', default=1, cast=int)
+CSV_IMPORT_CHUNK_SIZE = config('CSV_IMPORT_CHUNK_SIZE', default=5000, cast=int)
+CSV_SAMPLE_BYTES = config('CSV_SAMPLE_BYTES', default=64 * 1024, cast=int)  # head of the file used for sniffing and previews
+
 # Celery Configuration
 CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
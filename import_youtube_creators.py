@@ -6,7 +6,6 @@ Safely imports YouTube creators without affecting existing data
 import os
 import sys
 import django
-import csv
 from pathlib import Path
 
 # Setup Django
@@ -14,8 +13,40 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crm_project.settings')
 sys.path.append('/Users/wongivan/ai_tools/business_tools/company_crm_system/crm_project')
 django.setup()
 
+from crm.import_pipeline import CustomerImportPipeline, SkipRow, clean_field, country_code
 from crm.models import Customer
 
+
+def print_log(message, level='info'):
+    print(message)
+
+
+class YouTubeExportImport(CustomerImportPipeline):
+    """youtube_creators_import.csv rows; creators already on file (by handle or email) are skipped"""
+    
+    def map_row(self, row):
+        youtube_handle = clean_field(row.get('YouTube Handle')).lstrip('@')
+        if not youtube_handle:
+            raise SkipRow('no YouTube handle provided')
+        
+        customer_data = {
+            'first_name': clean_field(row.get('First Name')) or youtube_handle.replace('_', ' ').replace('.', ' ').title(),
+            'last_name': clean_field(row.get('Last Name')) or 'Creator',
+            'email_primary': clean_field(row.get('Primary Email')),
+            'youtube_handle': youtube_handle,
+            'youtube_channel_url': clean_field(row.get('YouTube Channel URL')),
+            'company_primary': clean_field(row.get('Primary Company')),
+            'customer_type': clean_field(row.get('Customer Type')) or 'youtuber',
+            'status': clean_field(row.get('Status')) or 'prospect',
+            'source': clean_field(row.get('Source')) or 'youtube_import',
+            'preferred_communication_method': clean_field(row.get('Preferred Communication Method')) or 'email',
+            'country_region': country_code(row.get('Country/Region')),
+            'position_primary': clean_field(row.get('Primary Position')),
+        }
+        # Blank fields keep the model defaults; the channel URL is derived from the handle
+        return {field: value for field, value in customer_data.items() if value}
+
+
 def import_youtube_creators():
     """Import YouTube creators from CSV"""
     csv_path = Path("youtube_creators_import.csv")
@@ -24,90 +55,16 @@ def import_youtube_creators():
         print(f"File not found: {csv_path}")
         return
     
-    imported = 0
-    errors = 0
-    duplicates = 0
-    
     print("Starting YouTube creators import...")
     print("=" * 50)
     
-    with open(csv_path, 'r', encoding='utf-8') as file:
-        reader = csv.DictReader(file)
-        
-        for row in reader:
-            try:
-                # Extract data from CSV
-                first_name = row.get('First Name', '').strip()
-                last_name = row.get('Last Name', '').strip()
-                email = row.get('Primary Email', '').strip() or None
-                youtube_handle = row.get('YouTube Handle', '').strip()
-                youtube_channel_url = row.get('YouTube Channel URL', '').strip()
-                company = row.get('Primary Company', '').strip()
-                customer_type = row.get('Customer Type', 'youtuber').strip()
-                status = row.get('Status', 'prospect').strip()
-                source = row.get('Source', 'youtube_import').strip()
-                preferred_comm = row.get('Preferred Communication Method', 'email').strip()
-                country = row.get('Country/Region', '').strip()
-                position = row.get('Primary Position', '').strip()
-                
-                # Validate required data
-                if not youtube_handle:
-                    print(f"Skipping row: No YouTube handle provided")
-                    continue
-                
-                # Clean YouTube handle
-                youtube_handle = youtube_handle.lstrip('@')
-                
-                # Check for existing customer by YouTube handle
-                existing_by_handle = Customer.objects.filter(youtube_handle__iexact=youtube_handle).first()
-                if existing_by_handle:
-                    print(f"Duplicate YouTube handle: @{youtube_handle} (existing customer: {existing_by_handle.first_name} {existing_by_handle.last_name})")
-                    duplicates += 1
-                    continue
-                
-                # Check for existing customer by email (if provided)
-                if email:
-                    existing_by_email = Customer.objects.filter(email_primary=email).first()
-                    if existing_by_email:
-                        print(f"Duplicate email: {email} (existing customer: {existing_by_email.first_name} {existing_by_email.last_name})")
-                        duplicates += 1
-                        continue
-                
-                # Create customer
-                customer = Customer(
-                    first_name=first_name or youtube_handle.replace('_', ' ').replace('.', ' ').title(),
-                    last_name=last_name or 'Creator',
-                    email_primary=email,
-                    youtube_handle=youtube_handle,
-                    youtube_channel_url=youtube_channel_url,
-                    company_primary=company,
-                    customer_type=customer_type,
-                    status=status,
-                    source=source,
-                    preferred_communication_method=preferred_comm,
-                    country_region=country,
-                    position_primary=position,
-                )
-                
-                # Save and let the model handle validation and auto-generation
-                customer.save()
-                imported += 1
-                
-                print(f"✓ Imported: @{youtube_handle} - {customer.first_name} {customer.last_name}")
-                
-                if imported % 10 == 0:
-                    print(f"Progress: {imported} creators imported...")
-                    
-            except Exception as e:
-                errors += 1
-                print(f"✗ Error importing @{youtube_handle}: {e}")
-                continue
+    stats = YouTubeExportImport(log=print_log, progress_every=10).run(csv_path)
     
     print(f"\nImport Summary:")
     print(f"=" * 50)
-    print(f"✓ Successfully imported: {imported} YouTube creators")
-    print(f"⚠ Duplicates skipped: {duplicates}")
-    print(f"✗ Errors encountered: {errors}")
+    print(f"✓ Successfully imported: {stats.imported} YouTube creators")
+    print(f"⚠ Duplicates skipped: {stats.skipped}")
+    print(f"✗ Errors encountered: {stats.failed}")
     print(f"📊 Total YouTube creators in database: {Customer.objects.filter(customer_type='youtuber').count()}")
 
 def test_youtube_import():
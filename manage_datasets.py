@@ -17,11 +17,51 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crm_project.settings')
 try:
     import django
     django.setup()
+    from crm.import_pipeline import CustomerImportPipeline, SkipRow
     from crm.models import Customer
-    from django.db import transaction
 except ImportError as e:
     print(f"Warning: Django not available: {e}")
     Customer = None
+    CustomerImportPipeline = object
+
+LEVEL_ICONS = {'warning': '⚠️  ', 'error': '❌ ', 'success': '✅ '}
+
+
+class DatasetImport(CustomerImportPipeline):
+    """
+    Generic datasets: name, email, phone and company are taken from whichever
+    of their usual column names is present. Customers already on file (by
+    email) are skipped
+    """
+    
+    # Common field mappings - adjust based on your actual CSV structure
+    FIELD_MAPPINGS = {
+        'name': ['name', 'full_name', 'customer_name', 'Name'],
+        'email_primary': ['email', 'email_address', 'Email'],
+        'phone_primary': ['phone', 'phone_number', 'mobile', 'Phone'],
+        'company_primary': ['company', 'organization', 'Company'],
+    }
+    
+    def map_row(self, row):
+        customer_data = {}
+        for model_field, possible_csv_fields in self.FIELD_MAPPINGS.items():
+            for csv_field in possible_csv_fields:
+                if (row.get(csv_field) or '').strip():
+                    customer_data[model_field] = row[csv_field].strip()
+                    break
+        
+        # Skip if no email (assuming email is required)
+        if 'email_primary' not in customer_data:
+            raise SkipRow('no email address')
+        
+        first_name, _, last_name = customer_data.pop('name', '').rpartition(' ')
+        customer_data['first_name'] = first_name or last_name
+        customer_data['last_name'] = last_name if first_name else ''
+        return customer_data
+
+
+def print_log(message, level='info'):
+    print('      ' + LEVEL_ICONS.get(level, '') + message)
 
 def list_datasets():
     """List all available datasets"""
@@ -90,53 +130,13 @@ def import_dataset_to_django(csv_file):
     print(f"📥 Importing {csv_file.name} to Django CRM...")
     
     try:
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            
-            imported_count = 0
-            skipped_count = 0
-            
-            with transaction.atomic():
-                for row in reader:
-                    # Map CSV columns to Django model fields
-                    # This is a simplified mapping - adjust based on your actual CSV structure
-                    customer_data = {}
-                    
-                    # Common field mappings
-                    field_mappings = {
-                        'name': ['name', 'full_name', 'customer_name', 'Name'],
-                        'email': ['email', 'email_address', 'Email'],
-                        'phone': ['phone', 'phone_number', 'mobile', 'Phone'],
-                        'company': ['company', 'organization', 'Company'],
-                    }
-                    
-                    for model_field, possible_csv_fields in field_mappings.items():
-                        for csv_field in possible_csv_fields:
-                            if csv_field in row and row[csv_field]:
-                                customer_data[model_field] = row[csv_field]
-                                break
-                    
-                    # Skip if no email (assuming email is required)
-                    if 'email' not in customer_data:
-                        skipped_count += 1
-                        continue
-                    
-                    # Create or update customer
-                    customer, created = Customer.objects.get_or_create(
-                        email=customer_data['email'],
-                        defaults=customer_data
-                    )
-                    
-                    if created:
-                        imported_count += 1
-                    else:
-                        skipped_count += 1
-            
-            print(f"   ✅ Import complete:")
-            print(f"      📈 Imported: {imported_count}")
-            print(f"      ⏭️  Skipped: {skipped_count}")
-            return True
-            
+        stats = DatasetImport(log=print_log).run(csv_file)
+        print(f"   ✅ Import complete:")
+        print(f"      📈 Imported: {stats.imported}")
+        print(f"      ⏭️  Skipped: {stats.skipped}")
+        print(f"      ❌ Errors: {stats.failed}")
+        return True
+    
     except Exception as e:
         print(f"   ❌ Import failed: {e}")
         return False